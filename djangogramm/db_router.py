@@ -0,0 +1,116 @@
+"""
+Read replicas: the reads of web requests go to the replicas of settings.DATABASE_REPLICAS, every write to the
+primary ('default').
+
+A replica lags behind the primary, so a user who has just written would not see the change if the next reads went
+to a replica. Reads go to the primary instead:
+
+* for the rest of a request after its first write, and inside a transaction of the primary;
+* for settings.REPLICA_STICKY_SECONDS after a write by the same client, which ReplicaStickinessMiddleware remembers
+  with a cookie;
+* outside web requests (commands, the worker), which read the rows they are about to write.
+"""
+import contextlib
+import random
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+
+PRIMARY = 'default'
+STICKY_COOKIE = 'db_primary'
+
+
+class ReplicaState:
+    def __init__(self, pinned: bool = False):
+        # The client wrote within REPLICA_STICKY_SECONDS
+        self.pinned = pinned
+        # The request wrote
+        self.wrote = False
+        # The replica of the request, chosen by its first read: a request sees the data of a single point in time
+        self.replica: Optional[str] = None
+
+
+# The state of the current request; a mutable object, so that writes made in the thread of an async view are seen
+_state: ContextVar[Optional[ReplicaState]] = ContextVar('replica_state', default=None)
+
+
+@contextlib.contextmanager
+def replica_reads(pinned: bool = False) -> Iterator[ReplicaState]:
+    """
+    Send the reads of the block to the replicas until its first write, as for a web request.
+
+    Args:
+        pinned (bool): Send them to the primary anyway.
+    """
+    state = ReplicaState(pinned)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+class PrimaryReplicaRouter:
+    @staticmethod
+    def db_for_read(model, **hints) -> str:
+        state = _state.get()
+        replicas = settings.DATABASE_REPLICAS
+        if state is None or state.pinned or state.wrote or not replicas or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        if state.replica not in replicas:
+            state.replica = random.choice(replicas)
+        return state.replica
+
+    @staticmethod
+    def db_for_write(model, **hints) -> str:
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    @staticmethod
+    def allow_relation(obj1, obj2, **hints) -> bool:
+        # The replicas hold the same rows
+        return True
+
+    @staticmethod
+    def allow_migrate(db, app_label, model_name=None, **hints) -> Optional[bool]:
+        # Replicas copy the schema of the primary
+        return False if db in settings.DATABASE_REPLICAS else None
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Route the reads of a request with PrimaryReplicaRouter, and keep a client who wrote on the primary for
+    settings.REPLICA_STICKY_SECONDS, the longest replication lag expected.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with replica_reads(pinned=STICKY_COOKIE in request.COOKIES) as state:
+            response = self.get_response(request)
+        return self.remember_write(response, state)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        with replica_reads(pinned=STICKY_COOKIE in request.COOKIES) as state:
+            response = await self.get_response(request)
+        return self.remember_write(response, state)
+
+    @staticmethod
+    def remember_write(response: HttpResponse, state: ReplicaState) -> HttpResponse:
+        if state.wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(STICKY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS, httponly=True,
+                                samesite='Lax')
+        return response
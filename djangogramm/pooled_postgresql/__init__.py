@@ -0,0 +1,4 @@
+"""
+PostgreSQL database backend whose connections come from a pool of the process (see pool.py), enabled with
+DB_POOL=builtin. Options of the pool are set in DATABASES['default']['OPTIONS']['pool'].
+"""
@@ -0,0 +1,30 @@
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from djangogramm.pooled_postgresql.pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Borrow the connection of a thread from the pool when Django connects, and give it back when Django closes it:
+    after every request with CONN_MAX_AGE = 0.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict['OPTIONS']
+        key = (self.alias, *(f'{name}={conn_params.get(name)}' for name in ('host', 'port', 'dbname', 'user')))
+        self.pool = get_pool(key, f"{self.alias}:{conn_params.get('dbname')}", **options.get('pool', {}))
+        # Set by the parent when it opens a connection, which a borrowed connection skipped
+        self.isolation_level = IsolationLevel(options.get('isolation_level', IsolationLevel.READ_COMMITTED))
+        return self.pool.getconn(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                # Still used by the transaction block it was closed in, so it cannot be lent again
+                self.pool.putconn(self.connection, discard=self.in_atomic_block)
@@ -0,0 +1,194 @@
+"""
+Pool of open PostgreSQL connections, shared by the threads of a process.
+
+Django opens a connection per thread, and closes it after every request unless CONN_MAX_AGE keeps it. Under ASGI,
+or with many short requests, opening one costs more than the queries of the request. The pool keeps up to max_size
+connections open: a thread borrows one for a request and gives it back when Django closes it, waiting up to timeout
+seconds when all of them are borrowed.
+"""
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from psycopg2 import Error
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+
+class PoolTimeout(Error):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, name: str, max_size: int = 10, timeout: float = 30.0, max_lifetime: float = 3600.0,
+                 check: bool = False):
+        """
+        Args:
+            name (str): The name of the pool in the metrics.
+            max_size (int): The largest number of connections open at the same time.
+            timeout (float): Seconds to wait for a connection before PoolTimeout is raised.
+            max_lifetime (float): Seconds after which a given back connection is closed instead of reused.
+            check (bool): Check that an idle connection still works before lending it, see CONN_HEALTH_CHECKS.
+        """
+        self.name = name
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check = check
+        self._condition = threading.Condition()
+        # Idle connections and the time they were opened; the last given back is lent first
+        self._idle: List[Tuple[Any, float]] = []
+        self._opened_at: Dict[int, float] = {}
+        self._size = 0
+        self._counters: Counter = Counter()
+
+    def getconn(self, connect: Callable[[], Any]) -> Any:
+        """
+        Args:
+            connect (Callable[[], Any]): Opens a new connection.
+
+        Returns:
+            Any: An idle connection, or a new one while the pool is not full.
+
+        Raises:
+            PoolTimeout: No connection was given back within the timeout.
+        """
+        started = time.monotonic()
+        while True:
+            with self._condition:
+                connection = self._take_idle(started)
+            if connection is None:
+                return self._open(connect)
+            if not connection.closed and (not self.check or self._works(connection)):
+                return connection
+            self._close(connection)
+
+    def putconn(self, connection: Any, discard: bool = False) -> None:
+        """
+        Give back a connection lent by getconn.
+
+        Args:
+            connection (Any): The connection.
+            discard (bool): Close the connection instead of keeping it for the next thread.
+        """
+        if not discard and not connection.closed and connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except Error:
+                discard = True
+        opened_at = self._opened_at.get(id(connection), 0)
+        if discard or connection.closed or time.monotonic() - opened_at > self.max_lifetime:
+            self._close(connection)
+            return
+        with self._condition:
+            self._idle.append((connection, opened_at))
+            self._condition.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: The size of the pool and its counters since the process started.
+        """
+        with self._condition:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'connections_opened': self._counters['connections_opened'],
+                'connections_closed': self._counters['connections_closed'],
+                'checkouts': self._counters['checkouts'],
+                'waits': self._counters['waits'],
+                'wait_time_ms': round(self._counters['wait_time'] * 1000, 1),
+                'timeouts': self._counters['timeouts'],
+            }
+
+    def close_all(self) -> None:
+        with self._condition:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._close(connection)
+
+    def _take_idle(self, started: float) -> Optional[Any]:
+        # Called holding the condition; None means a slot was reserved for a new connection
+        waited = False
+        while not self._idle and self._size >= self.max_size:
+            remaining = self.timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                self._counters['timeouts'] += 1
+                raise PoolTimeout(f'No connection of the pool {self.name} was free within {self.timeout} seconds.')
+            if not waited:
+                self._counters['waits'] += 1
+                waited = True
+            self._condition.wait(remaining)
+        if waited:
+            self._counters['wait_time'] += time.monotonic() - started
+        self._counters['checkouts'] += 1
+        if self._idle:
+            connection, _ = self._idle.pop()
+            return connection
+        self._size += 1
+        return None
+
+    def _open(self, connect: Callable[[], Any]) -> Any:
+        try:
+            connection = connect()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._opened_at[id(connection)] = time.monotonic()
+            self._counters['connections_opened'] += 1
+        return connection
+
+    @staticmethod
+    def _works(connection: Any) -> bool:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except Error:
+            return False
+
+    def _close(self, connection: Any) -> None:
+        try:
+            connection.close()
+        except Error:
+            pass
+        with self._condition:
+            self._opened_at.pop(id(connection), None)
+            self._size -= 1
+            self._counters['connections_closed'] += 1
+            self._condition.notify()
+
+
+_pools: Dict[Tuple[str, ...], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key: Tuple[str, ...], name: str, **options) -> ConnectionPool:
+    """
+    Args:
+        key (Tuple[str, ...]): The database the connections are opened to; the test runner changes its name.
+        name (str): The name of the pool in the metrics.
+        **options: The options of ConnectionPool, used when the pool is created.
+
+    Returns:
+        ConnectionPool: The pool of the process for the database.
+    """
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(name, **options)
+        return _pools[key]
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Returns:
+        Dict[str, Dict[str, Any]]: The metrics of the pools of the process by name.
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.name: pool.stats() for pool in pools}
@@ -0,0 +1,12 @@
+import os
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpRequest, JsonResponse
+
+from djangogramm.pooled_postgresql.pool import pool_stats
+
+
+@staff_member_required
+def pool_metrics(request: HttpRequest) -> JsonResponse:
+    # The pools belong to the process: every worker answers with its own
+    return JsonResponse({'pid': os.getpid(), 'pools': pool_stats()})
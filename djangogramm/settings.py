@@ -42,15 +42,33 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'main_app.apps.MainAppConfig',
     'storages',
     'social_django',
+    'rest_framework',
+    'rest_framework.authtoken',
 ]
 
 SOCIAL_AUTH_JSONFIELD_ENABLED = True
 
+REST_FRAMEWORK = {
+    # A token is read with one query and needs neither the session nor a CSRF token; the session is for the site
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.TokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.IsAuthenticated'],
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+    'DEFAULT_PARSER_CLASSES': ['rest_framework.parsers.JSONParser'],
+    'DEFAULT_VERSIONING_CLASS': 'rest_framework.versioning.NamespaceVersioning',
+    'ALLOWED_VERSIONS': ['v1'],
+}
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Before every middleware reading the database, so that their reads are routed too
+    'djangogramm.db_router.ReplicaStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -81,22 +99,56 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'djangogramm.wsgi.application'
+ASGI_APPLICATION = 'djangogramm.asgi.application'
+# Serve the async variants of the hot views (main_app.async_views); on when running under ASGI (SERVER=asgi)
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', str(os.getenv('SERVER') == 'asgi')) == 'True'
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# How connections are reused (see the README): '' keeps one per thread for DB_CONN_MAX_AGE seconds, 'builtin'
+# lends them from a pool of the process, 'pgbouncer' connects through PgBouncer in transaction pooling mode
+DB_POOL = os.getenv('DB_POOL', '')
+# Under ASGI every request may run in a new thread, whose persistent connection would never be reused
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '0' if os.getenv('SERVER') == 'asgi' else '60'))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'djangogramm.pooled_postgresql' if DB_POOL == 'builtin' else 'django.db.backends.postgresql',
         'NAME': os.getenv('DB_NAME'),
         'USER': os.getenv('DB_USER'),
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
         'PORT': os.getenv('DB_PORT'),
+        # A pooled connection goes back to the pool at the end of every request
+        'CONN_MAX_AGE': 0 if DB_POOL == 'builtin' else DB_CONN_MAX_AGE,
+        # Check a reused connection before the first query of a request, so a dropped one is replaced
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+        # Server-side cursors do not survive the end of a transaction, when PgBouncer may switch connections
+        'DISABLE_SERVER_SIDE_CURSORS': DB_POOL == 'pgbouncer',
+        'OPTIONS': {
+            'pool': {
+                'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+                'timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+                'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', '3600')),
+                'check': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+            },
+        } if DB_POOL == 'builtin' else {},
     },
 
 }
 
+# Hosts of read replicas of the primary database, separated by commas (see the README); the reads of web requests
+# go to one of them, writes and the reads following a write to the primary
+DB_REPLICA_HOSTS = [host.strip() for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host.strip()]
+for number, host in enumerate(DB_REPLICA_HOSTS, start=1):
+    # Tests run against the primary only
+    DATABASES[f'replica{number}'] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+DATABASE_REPLICAS = [f'replica{number}' for number in range(1, len(DB_REPLICA_HOSTS) + 1)]
+DATABASE_ROUTERS = ['djangogramm.db_router.PrimaryReplicaRouter']
+# Seconds a client keeps reading from the primary after a write, longer than the replication lag
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -160,8 +212,43 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 AUTH_USER_MODEL = "main_app.CustomUser"
 
+# The default cache holds the pages of anonymous visitors (see main_app.page_cache), `fragments` the rendered post
+# cards (main_app.fragments). Processes share nothing with the in-memory backend: use a shared one in production,
+# e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache and CACHE_LOCATION=redis://host:6379, and the same
+# with FRAGMENT_CACHE_BACKEND and FRAGMENT_CACHE_LOCATION
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+        'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'djangogramm'),
+    },
+    'fragments': {
+        'BACKEND': os.getenv('FRAGMENT_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('FRAGMENT_CACHE_LOCATION', 'fragments'),
+        'TIMEOUT': int(os.getenv('FRAGMENT_CACHE_TIMEOUT', 24 * 60 * 60)),
+    },
+}
+FRAGMENT_CACHE_ALIAS = 'fragments'
+# Seconds a page is cached for anonymous visitors; a change of the posts replaces it before
+PAGE_CACHE_TIMEOUT = int(os.getenv('PAGE_CACHE_TIMEOUT', 60))
+# Seconds a user profile is cached (see main_app.profiles); a change of the user or its follows replaces it before
+PROFILE_CACHE_TIMEOUT = int(os.getenv('PROFILE_CACHE_TIMEOUT', 60 * 60))
+
 DEFAULT_FILE_STORAGE = os.getenv('DEFAULT_FILE_STORAGE')
+# Local folder the uploaded photos wait in until the worker (manage.py run_worker) stores them
+UPLOAD_STAGING_ROOT = os.getenv('UPLOAD_STAGING_ROOT', os.path.join(BASE_DIR, 'staging'))
+# Run background jobs in the web process right after the commit instead of the worker (tests, local runs)
+JOBS_EAGER = os.getenv('JOBS_EAGER') == 'True'
+
+# The photos of a new post are checked while they are received and streamed to the staging folder
+PHOTO_UPLOAD_MAX_FILE_SIZE = int(os.getenv('PHOTO_UPLOAD_MAX_FILE_SIZE', 10 * 1024 * 1024))
+# Total size of the photos of a post (of a request)
+PHOTO_UPLOAD_MAX_POST_SIZE = int(os.getenv('PHOTO_UPLOAD_MAX_POST_SIZE', 30 * 1024 * 1024))
+PHOTO_UPLOAD_MAX_PIXELS = int(os.getenv('PHOTO_UPLOAD_MAX_PIXELS', 40_000_000))
 GS_BUCKET_NAME = os.getenv('GS_BUCKET_NAME')
+# Stored files are never overwritten (photos are named after their content, avatars get a new name), so their
+# URLs can be cached forever
+GS_OBJECT_PARAMETERS = {'cache_control': os.getenv('GS_CACHE_CONTROL', 'public, max-age=31536000, immutable')}
 CREDENTIAL_PATH = os.getenv('CREDENTIAL_PATH')
 os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = 'credentials.json'
 
@@ -21,15 +21,18 @@ from django.contrib.auth.views import LoginView
 from django.urls import include, path
 from django.views.generic import RedirectView
 
+from djangogramm.pooled_postgresql.views import pool_metrics
 from main_app.forms import EmailAuthenticationForm
 
 urlpatterns = [
+    path('admin/db-pool/', pool_metrics, name='db_pool_metrics'),
     path('admin/', admin.site.urls),
 ]
 
 urlpatterns += [
     path('', RedirectView.as_view(url='/main_app/', permanent=True)),
     path('main_app/', include('main_app.urls')),
+    path('api/v1/', include('main_app.api_urls', namespace='v1')),
     # including custom form login (EmailAuthenticationForm)
     path('accounts/login/', LoginView.as_view(authentication_form=EmailAuthenticationForm), name='login'),
     # Basic URLs
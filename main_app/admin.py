@@ -2,12 +2,25 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
 from .forms import CustomUserChangeForm, CustomUserCreationForm
-from .models import Comment, CustomUser, Photo, Post, Tag
+from .models import Blob, Comment, CustomUser, Follow, Job, Photo, Post, Tag
 
 admin.site.register(Photo)
 admin.site.register(Post)
 admin.site.register(Comment)
 admin.site.register(Tag)
+admin.site.register(Follow)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ["task", "status", "attempts", "run_after", "updated_at"]
+    list_filter = ["status", "task"]
+
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ["name", "size", "ref_count", "created_at"]
+    readonly_fields = ["sha256", "name", "size", "ref_count", "created_at"]
 
 
 class CustomUserAdmin(UserAdmin):
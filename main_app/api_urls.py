@@ -0,0 +1,18 @@
+from django.urls import path
+from rest_framework.authtoken.views import obtain_auth_token
+
+from main_app import api_views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('token/', obtain_auth_token, name='token'),
+    path('posts/', api_views.PostListView.as_view(), name='posts'),
+    path('posts/<int:pk>/', api_views.PostView.as_view(), name='post'),
+    path('posts/<int:pk>/comments/', api_views.CommentListView.as_view(), name='post_comments'),
+    path('feed/', api_views.FeedView.as_view(), name='feed'),
+    path('users/<int:pk>/', api_views.UserView.as_view(), name='user'),
+    path('users/<int:pk>/posts/', api_views.UserPostListView.as_view(), name='user_posts'),
+    path('reactions/', api_views.ReactionsView.as_view(), name='reactions'),
+    path('follows/', api_views.FollowsView.as_view(), name='follows'),
+]
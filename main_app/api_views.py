@@ -0,0 +1,226 @@
+"""
+Versioned JSON API (/api/v1/): posts, feeds, comments and profiles to read, reactions and follows to set.
+
+The read views return the data of the pages without their templates. Lists are paginated by cursor like the
+pages (KeysetPaginator), the `fields` parameter narrows the objects to what the client shows and loads only the
+relations those fields need, and every response has an ETag, so a client revalidating a page it has already got
+receives an empty 304 Not Modified.
+
+Unlike the toggles of the site (AddLikeDislike, SubscribeView), a PUT sets the state of a batch of objects: sending
+the same request again changes nothing, so clients can retry it. A batch holds at most api_batch_limit objects and
+runs the same number of queries whatever its size. Clients authenticate with a token (`Authorization: Token <key>`,
+from /api/v1/token/), which takes one query and does not load the session.
+"""
+from typing import Any, Callable, List, Optional
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                set_response_etag)
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.generics import ListAPIView, RetrieveAPIView
+from rest_framework.pagination import BasePagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
+
+from main_app.constants import api_max_page_size, api_page_size, feed_window
+from main_app.models import CustomUser, Post
+from main_app.pagination import InvalidCursor, KeysetPage, KeysetPaginator
+from main_app.profiles import UserProfile, get_profile
+from main_app.repositories import (CommentRepository, FeedRepository,
+                                   LikeRepository, PostRepository,
+                                   SubscribeRepository)
+from main_app.serializers import (CommentSerializer, FollowBatchSerializer,
+                                  PostSerializer, ProfileSerializer,
+                                  ReactionBatchSerializer, requested_fields)
+from main_app.views import attach_author_profiles, check_post_visible
+
+
+class KeysetApiPagination(BasePagination):
+    """
+    Cursor pagination by KeysetPaginator: `{"next": <url>, "previous": <url>, "results": [...]}`, `page_size` objects
+    a page.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    # Views paginating by other fields set their own
+    cursor_fields = ('publish_date', 'id')
+
+    def get_page_size(self, request: Request) -> int:
+        try:
+            return min(max(int(request.query_params[self.page_size_query_param]), 1), api_max_page_size)
+        except (KeyError, ValueError):
+            return api_page_size
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view: Optional[APIView] = None) -> List[Any]:
+        fields = getattr(view, 'cursor_fields', self.cursor_fields)
+        paginator = KeysetPaginator(queryset, self.get_page_size(request), fields)
+        return self.paginate_with(paginator.get_page, request)
+
+    def paginate_with(self, get_page: Callable[[Optional[str]], KeysetPage], request: Request) -> List[Any]:
+        """
+        Args:
+            get_page (Callable[[Optional[str]], KeysetPage]): Returns the page of a cursor.
+            request (Request): The request, with the cursor or not.
+
+        Returns:
+            List[Any]: The objects of the page.
+        """
+        self.request = request
+        try:
+            self.page = get_page(request.query_params.get(self.cursor_query_param))
+        except InvalidCursor:
+            raise NotFound('Invalid cursor.')
+        return self.page.object_list
+
+    def get_link(self, cursor: Optional[str]) -> Optional[str]:
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data: List[Any]) -> Response:
+        return Response({'next': self.get_link(self.page.next_cursor),
+                         'previous': self.get_link(self.page.previous_cursor),
+                         'results': data})
+
+
+class ETagMixin:
+    """
+    Give the GET responses an ETag of their content and answer If-None-Match with 304 Not Modified.
+
+    The responses depend on the user, so only the client may cache them, and it revalidates them every time.
+    """
+
+    def finalize_response(self, request: Request, response: Response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+            return response
+        response.render()
+        set_response_etag(response)
+        patch_cache_control(response, private=True, no_cache=True)
+        return get_conditional_response(request, etag=response['ETag'], response=response)
+
+
+def post_queryset(queryset: QuerySet, request: Request) -> QuerySet:
+    # Only the relations of the fields asked for are loaded
+    fields = requested_fields(request, PostSerializer)
+    for field, builder in PostSerializer.relations.items():
+        if fields is None or field in fields:
+            queryset = getattr(queryset, builder)()
+    return queryset
+
+
+class PostListView(ETagMixin, ListAPIView):
+    serializer_class = PostSerializer
+    pagination_class = KeysetApiPagination
+
+    def get_queryset(self) -> QuerySet:
+        return post_queryset(PostRepository.get_all_posts(), self.request)
+
+
+class UserPostListView(PostListView):
+    def get_queryset(self) -> QuerySet:
+        author = get_object_or_404(CustomUser.objects.only('pk'), pk=self.kwargs['pk'])
+        posts = PostRepository.get_posts_by_author(author, include_unpublished=author.pk == self.request.user.pk)
+        return post_queryset(posts, self.request)
+
+
+class FeedView(ETagMixin, ListAPIView):
+    """
+    The posts of the subscriptions of the user of the last feed_window, newest first.
+    """
+    serializer_class = PostSerializer
+    pagination_class = KeysetApiPagination
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        queryset = post_queryset(Post.objects.all(), request)
+        per_page = self.paginator.get_page_size(request)
+        posts = self.paginator.paginate_with(
+            lambda cursor: FeedRepository.get_feed_page(request.user, per_page, cursor=cursor,
+                                                        since=timezone.now() - feed_window, queryset=queryset),
+            request)
+        return self.get_paginated_response(self.get_serializer(posts, many=True).data)
+
+
+class PostView(ETagMixin, RetrieveAPIView):
+    serializer_class = PostSerializer
+
+    def get_object(self) -> Post:
+        post = get_object_or_404(post_queryset(Post.objects.all(), self.request), pk=self.kwargs['pk'])
+        check_post_visible(post, self.request.user)
+        return post
+
+
+class CommentListView(ETagMixin, ListAPIView):
+    """
+    The top-level comments of a post, or the replies to one (`parent`), newest first like the page of the post.
+    """
+    serializer_class = CommentSerializer
+    pagination_class = KeysetApiPagination
+
+    def get_queryset(self) -> QuerySet:
+        post = get_object_or_404(Post.objects.only('author_id', 'is_published'), pk=self.kwargs['pk'])
+        check_post_visible(post, self.request.user)
+        parent = self.request.query_params.get('parent')
+        if parent is not None and not parent.isdigit():
+            raise Http404('No comment found matching the query')
+        return CommentRepository.get_comments(post.pk, parent_id=parent)
+
+    def paginate_queryset(self, queryset: QuerySet) -> List[Any]:
+        return attach_author_profiles(super().paginate_queryset(queryset))
+
+
+class UserView(ETagMixin, RetrieveAPIView):
+    serializer_class = ProfileSerializer
+
+    def get_object(self) -> UserProfile:
+        profile = get_profile(self.kwargs['pk'])
+        if profile is None:
+            raise Http404('No user found matching the query')
+        return profile
+
+
+def check_found(requested: List[int], found: List[int], name: str) -> None:
+    # Raised inside the transaction, so that a batch is applied in full or not at all
+    missing = sorted(set(requested) - set(found))
+    if missing:
+        raise NotFound(f'No {name} found with the ids {missing}.')
+
+
+class ReactionsView(APIView):
+    @staticmethod
+    def put(request: Request, **kwargs) -> Response:
+        serializer = ReactionBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        reactions = {item['post']: item['reaction'] for item in serializer.validated_data['reactions']}
+
+        with transaction.atomic():
+            counts = LikeRepository.set_reactions(request.user, reactions)
+            check_found(list(reactions), list(counts), 'posts')
+
+        return Response({'reactions': [
+            {'post': pk, 'reaction': reaction, 'likes_count': counts[pk][0], 'dislikes_count': counts[pk][1]}
+            for pk, reaction in reactions.items()
+        ]})
+
+
+class FollowsView(APIView):
+    @staticmethod
+    def put(request: Request, **kwargs) -> Response:
+        serializer = FollowBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        follows = {item['user']: item['following'] for item in serializer.validated_data['follows']}
+        if request.user.pk in follows:
+            raise ValidationError({'follows': ['Users cannot follow themselves.']})
+
+        with transaction.atomic():
+            following = SubscribeRepository.set_follows(request.user, follows)
+            check_found(list(follows), list(following), 'users')
+
+        return Response({'follows': [{'user': pk, 'following': is_following}
+                                     for pk, is_following in following.items()]})
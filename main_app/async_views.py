@@ -0,0 +1,167 @@
+"""
+Async variants of the hot views, served instead of the sync ones when settings.ASYNC_VIEWS is on (the ASGI
+deployment, see the README).
+
+Under ASGI a sync view holds a thread for the whole request. These views run on the event loop and only leave
+it for the database: queries go through the async ORM (aget, async for, ain_bulk, aaggregate), which on
+Django 4.2 runs each of them in the thread of the request. What the ORM cannot do asynchronously yet, a
+transaction or a prefetch, runs as a whole in that thread with sync_to_async, and so does the rendering of the
+post cards. Templates are rendered by Django in the same way.
+
+The views give the same pages and JSON as the sync ones and share their helpers.
+"""
+from typing import Any, Dict
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.cache import cache
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
+from django.template.response import TemplateResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.views import View
+
+from main_app.models import CustomUser, Post
+from main_app.page_cache import AnonymousPageCacheMixin, aposts_version
+from main_app.pagination import InvalidCursor, KeysetPaginator
+from main_app.repositories import (LikeRepository, PostRepository,
+                                   SubscribeRepository)
+from main_app.views import (IndexListView, PostDetailView, SearchResultsView,
+                            check_post_visible)
+
+
+async def aget_user(request: HttpRequest) -> CustomUser:
+    """
+    Load request.user, which the authentication middleware reads lazily from the session and the database,
+    so that it can be used in the event loop afterwards.
+    """
+    await sync_to_async(lambda: request.user.is_authenticated)()
+    return request.user
+
+
+class AsyncLoginRequiredMixin(LoginRequiredMixin):
+    async def dispatch(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return self.handle_no_permission()
+        return await super(LoginRequiredMixin, self).dispatch(request, *args, **kwargs)
+
+
+class AsyncAnonymousPageCacheMixin(AnonymousPageCacheMixin):
+    async def dispatch(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        await aget_user(request)
+        dispatch = super(AnonymousPageCacheMixin, self).dispatch
+        if not self.is_page_cached(request):
+            response = await dispatch(request, *args, **kwargs)
+            patch_vary_headers(response, ['Cookie'])
+            return response
+
+        last_modified, etag = await aposts_version() if self.page_shows_posts else (None, None)
+        not_modified = self.not_modified(request, last_modified, etag)
+        if not_modified is not None:
+            return not_modified
+
+        key = self.page_key(request, etag)
+        response = await cache.aget(key)
+        if response is not None:
+            return get_conditional_response(request, etag=response.get('ETag'), response=response)
+        return self.cache_response(await dispatch(request, *args, **kwargs), key, last_modified, etag)
+
+
+class AsyncIndexListView(AsyncAnonymousPageCacheMixin, View):
+    template_name = IndexListView.template_name
+    paginate_by = IndexListView.paginate_by
+
+    async def get(self, request: HttpRequest) -> HttpResponse:
+        try:
+            page = await KeysetPaginator(PostRepository.get_all_posts().card_versions(),
+                                         self.paginate_by).aget_page(request.GET.get('cursor'))
+            feed_page = await PostRepository.aget_last_posts_from_subscribe(
+                request, per_page=self.paginate_by, cursor=request.GET.get('feed_cursor'),
+                queryset=Post.objects.card_versions())
+        except InvalidCursor:
+            raise Http404('Invalid cursor.')
+
+        context = {
+            'view': self,
+            'object_list': page.object_list,
+            'page_obj': page,
+            'is_paginated': page.has_other_pages(),
+            'posts_with_photo': await sync_to_async(IndexListView.post_cards)(page.object_list, 'list'),
+            'posts_from_subscribe': await sync_to_async(IndexListView.post_cards)(feed_page.object_list, 'feed'),
+            'feed_page_obj': feed_page,
+        }
+        return TemplateResponse(request, self.template_name, context)
+
+
+class AsyncSearchResultsView(AsyncAnonymousPageCacheMixin, View):
+    template_name = SearchResultsView.template_name
+    paginate_by = SearchResultsView.paginate_by
+
+    async def get(self, request: HttpRequest) -> HttpResponse:
+        posts = SearchResultsView.search_results(request.GET.get('q'), self.paginate_by)
+        paginator = Paginator(posts, self.paginate_by)
+        # Counted here, so that the paginator does not query
+        paginator.count = await posts.acount()
+        page_number = request.GET.get('page') or 1
+        try:
+            page = paginator.page(paginator.num_pages if page_number == 'last' else page_number)
+        except InvalidPage as error:
+            raise Http404(f'Invalid page: {error}')
+        page.object_list = [post async for post in page.object_list]
+
+        context = {
+            'view': self,
+            'paginator': paginator,
+            'page_obj': page,
+            'is_paginated': page.has_other_pages(),
+            'object_list': page.object_list,
+            'posts': page.object_list,
+        }
+        return TemplateResponse(request, self.template_name, context)
+
+
+class AsyncPostDetailView(AsyncLoginRequiredMixin, View):
+    template_name = PostDetailView.template_name
+    comments_paginate_by = PostDetailView.comments_paginate_by
+
+    async def get(self, request: HttpRequest, pk: int) -> HttpResponse:
+        try:
+            # Async iteration does not prefetch the photos and the tags yet
+            details = await sync_to_async(PostRepository.get_post_with_details)(pk)
+        except Post.DoesNotExist:
+            raise Http404('No post found matching the query')
+        check_post_visible(details['post'], request.user)
+        try:
+            page = await KeysetPaginator(details['comments'], self.comments_paginate_by).aget_page(
+                request.GET.get('comments_cursor'))
+        except InvalidCursor:
+            raise Http404('Invalid cursor.')
+
+        context: Dict[str, Any] = {'view': self, 'object': details['post'], **details}
+        context.update(await sync_to_async(PostDetailView.comments_context)(page))
+        return TemplateResponse(request, self.template_name, context)
+
+
+class AsyncAddLikeDislike(AsyncLoginRequiredMixin, View):
+    async def post(self, request: HttpRequest, pk: int) -> JsonResponse:
+        try:
+            post = await Post.objects.only('author_id', 'is_published', 'likes_count', 'dislikes_count').aget(pk=pk)
+        except Post.DoesNotExist:
+            raise Http404('No post found matching the query')
+        check_post_visible(post, request.user)
+        # A transaction, which the async ORM does not support
+        await sync_to_async(LikeRepository.toggle_like)(request, post, is_like=request.POST.get('is_like') == 'true')
+
+        return JsonResponse({'likes_count': post.likes_count, 'dislikes_count': post.dislikes_count})
+
+
+class AsyncSubscribeView(AsyncLoginRequiredMixin, View):
+    async def post(self, request: HttpRequest, pk: int) -> JsonResponse:
+        try:
+            subscribed_to = await CustomUser.objects.aget(pk=pk)
+        except CustomUser.DoesNotExist:
+            raise Http404('No user found matching the query')
+        is_subscribed = await sync_to_async(SubscribeRepository.update_subscribe)(request.user, subscribed_to)
+
+        return JsonResponse({'is_subscribed': is_subscribed})
@@ -0,0 +1,278 @@
+import contextlib
+import io
+import json
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from main_app import create_fake_data
+from main_app import urls as main_app_urls
+from main_app.models import Comment, CustomUser, Follow, Post
+from main_app.repositories import FeedRepository
+
+BUDGETS_PATH = Path(__file__).resolve().parent / 'benchmark_budgets.json'
+
+FOLLOWER_USERNAME = 'benchmark_follower'
+FOLLOWER_PASSWORD = 'benchmark-password'
+
+# How every route of main_app.urls is requested: HTTP method and a factory of its url kwargs.
+# A route missing here makes the benchmark fail, so new urls get a budget as well.
+ROUTES: Dict[str, Dict[str, Any]] = {
+    'index': {'method': 'get'},
+    'explore': {'method': 'get'},
+    'signup': {'method': 'get'},
+    'self_profile': {'method': 'get'},
+    'someone_profile': {'method': 'get', 'kwargs': lambda data: {'pk': data['author'].pk}},
+    'edit_profile': {'method': 'get'},
+    'post_detail': {'method': 'get', 'kwargs': lambda data: {'pk': data['post'].pk}},
+    'post_create': {'method': 'get'},
+    'add_comment_to_post': {'method': 'get', 'kwargs': lambda data: {'post_pk': data['post'].pk}},
+    'post_comments': {'method': 'get', 'kwargs': lambda data: {'post_pk': data['post'].pk}},
+    'like-dislike': {'method': 'post', 'kwargs': lambda data: {'pk': data['post'].pk},
+                     'data': {'is_like': 'true'}},
+    'search_view': {'method': 'get', 'query': lambda data: {'q': data['post'].name}},
+    'tag_autocomplete': {'method': 'get', 'query': lambda data: {'q': data['tag'].tag[:2]}},
+    'tag_detail': {'method': 'get', 'kwargs': lambda data: {'tag': data['tag'].tag}},
+    'subscribe': {'method': 'post', 'kwargs': lambda data: {'pk': data['author'].pk}},
+    'last_news': {'method': 'get'},
+}
+
+USER_KINDS = ('anonymous', 'follower')
+
+# CONN_MAX_AGE of the ways to connect compared by benchmark_connections
+CONNECTION_MODES: Dict[str, Optional[int]] = {'per request': 0, 'persistent': None}
+# A light route, so that connecting weighs in its latency
+CONNECTION_ROUTE = 'tag_autocomplete'
+
+
+def seed_data(posts: int = 100, seed: int = 0) -> Dict[str, Any]:
+    """
+    Fill the database with the fake data generator and add a user who follows every author.
+
+    Args:
+        posts (int): The number of posts to generate; users and tags are derived from it.
+        seed (int): The seed of the generator, so runs are comparable.
+
+    Returns:
+        Dict[str, Any]: The objects the routes are requested with.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_fake_data.generate(users=max(10, posts // 10), tags=max(10, posts // 20), posts=posts,
+                                  follows_per_user=0, seed=seed)
+
+    # A slice of recent posts, so the subscription feed has something to show
+    recent = list(Post.objects.order_by('pk').values_list('pk', flat=True))[::10]
+    Post.objects.filter(pk__in=recent).update(publish_date=timezone.now())
+
+    follower = CustomUser.objects.create_user(username=FOLLOWER_USERNAME, email='benchmark@example.com',
+                                              password=FOLLOWER_PASSWORD)
+    authors = CustomUser.objects.exclude(pk=follower.pk)
+    Follow.objects.bulk_create([Follow(follower=follower, followee=author) for author in authors])
+    FeedRepository.rebuild_feed(follower)
+
+    post = Post.objects.order_by('-publish_date', '-id').first()
+    # A thread on the post, so that it has replies as well
+    comment = Comment.objects.create(post=post, author=follower, text='Benchmark comment')
+    Comment.objects.create(post=post, author=post.author, text='Benchmark reply', parent=comment)
+    return {'follower': follower, 'author': post.author, 'post': post, 'tag': post.tag.first(), 'comment': comment}
+
+
+def benchmark_routes(data: Dict[str, Any], iterations: int = 20,
+                     routes: Optional[List[URLPattern]] = None) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Request every route of main_app.urls as an anonymous user and as a user with many follows.
+
+    Args:
+        data (Dict[str, Any]): The objects returned by seed_data.
+        iterations (int): The number of measured requests per route and user kind.
+        routes (Optional[List[URLPattern]]): The url patterns to request, all of main_app.urls by default.
+
+    Returns:
+        Dict[str, Dict[str, Dict[str, float]]]: Queries, p50/p95 latency (ms) and peak memory (KiB)
+        per route name and user kind.
+    """
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for pattern in routes or main_app_urls.urlpatterns:
+        spec = ROUTES.get(pattern.name)
+        if spec is None:
+            raise KeyError(f"No benchmark spec for the route '{pattern.name}'.")
+        url = reverse(pattern.name, kwargs=spec.get('kwargs', lambda _: {})(data))
+        query = spec.get('query', lambda _: {})(data)
+        results[pattern.name] = {}
+
+        for kind in USER_KINDS:
+            client = Client()
+            if kind == 'follower':
+                client.force_login(data['follower'])
+
+            def request() -> Any:
+                if spec['method'] == 'post':
+                    return client.post(url, spec.get('data', {}))
+                return client.get(url, query)
+
+            results[pattern.name][kind] = _measure(request, iterations)
+    return results
+
+
+def _measure(request: Callable[[], Any], iterations: int) -> Dict[str, float]:
+    # Warm up caches of templates, urls and the ORM before measuring
+    request()
+
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        request()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    # Toggling routes (likes, subscribes) alternate between two states, so the worst of two requests is kept
+    query_counts = []
+    tracemalloc.start()
+    for _ in range(2):
+        with CaptureQueriesContext(connection) as queries:
+            request()
+        query_counts.append(len(queries))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'queries': max(query_counts),
+        **_percentiles(latencies),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def _percentiles(latencies: List[float]) -> Dict[str, float]:
+    latencies = sorted(latencies)
+    return {
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+    }
+
+
+def benchmark_connections(data: Dict[str, Any], concurrency: Sequence[int] = (1, 8), requests: int = 200,
+                          connects: int = 50) -> Dict[str, Any]:
+    """
+    Measure how long connecting to the database takes, and the latency of requests served by concurrent threads
+    when every request connects (CONN_MAX_AGE = 0) and when the threads keep their connection. With the pooled
+    backend (DB_POOL=builtin) connecting borrows a connection from the pool.
+
+    Args:
+        data (Dict[str, Any]): The objects returned by seed_data.
+        concurrency (Sequence[int]): The numbers of threads sending requests at the same time.
+        requests (int): The number of requests per mode and number of threads.
+        connects (int): The number of measured connections.
+
+    Returns:
+        Dict[str, Any]: p50/p95 (ms) of connecting under 'connect', and p50/p95 (ms) and requests per second by
+        mode and number of threads under 'requests'.
+    """
+    spec = ROUTES[CONNECTION_ROUTE]
+    url = reverse(CONNECTION_ROUTE)
+    query = spec['query'](data)
+
+    connect_latencies = []
+    for _ in range(connects):
+        connection.close()
+        start = time.perf_counter()
+        connection.ensure_connection()
+        connect_latencies.append((time.perf_counter() - start) * 1000)
+
+    results: Dict[str, Any] = {'connect': _percentiles(connect_latencies), 'requests': {}}
+    conn_max_age = connection.settings_dict['CONN_MAX_AGE']
+    try:
+        for mode, max_age in CONNECTION_MODES.items():
+            # Read by every thread when it connects
+            connection.settings_dict['CONN_MAX_AGE'] = max_age
+            results['requests'][mode] = {threads: _run_concurrently(url, query, threads, requests)
+                                         for threads in concurrency}
+    finally:
+        connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+    return results
+
+
+def _run_concurrently(url: str, query: Dict[str, Any], threads: int, requests: int) -> Dict[str, float]:
+    def send(count: int) -> List[float]:
+        # The test client closes the connection after a request like a server, unless CONN_MAX_AGE keeps it
+        client = Client()
+        latencies = []
+        try:
+            for _ in range(count):
+                start = time.perf_counter()
+                client.get(url, query)
+                latencies.append((time.perf_counter() - start) * 1000)
+        finally:
+            connections.close_all()
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        latencies = [latency for result in executor.map(send, [max(requests // threads, 1)] * threads)
+                     for latency in result]
+    elapsed = time.perf_counter() - start
+    return {**_percentiles(latencies), 'requests_per_s': round(len(latencies) / elapsed, 1)}
+
+
+def check_budgets(results: Dict[str, Dict[str, Dict[str, float]]],
+                  budgets: Dict[str, Dict[str, Dict[str, float]]]) -> List[str]:
+    """
+    Compare the results of benchmark_routes with the budgets.
+
+    Returns:
+        List[str]: A message per exceeded or missing budget.
+    """
+    failures = []
+    for route, kinds in results.items():
+        for kind, metrics in kinds.items():
+            budget = budgets.get(route, {}).get(kind)
+            if budget is None:
+                failures.append(f'{route} [{kind}]: no budget')
+                continue
+            for metric, value in metrics.items():
+                if metric in budget and value > budget[metric]:
+                    failures.append(f'{route} [{kind}]: {metric} {value} > budget {budget[metric]}')
+    return failures
+
+
+def make_budgets(results: Dict[str, Dict[str, Dict[str, float]]]) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Derive budgets from measured results: exact query counts and headroom for machine-dependent metrics.
+    """
+    return {
+        route: {
+            kind: {
+                'queries': metrics['queries'],
+                'p50_ms': round(max(metrics['p50_ms'] * 3, 100), 1),
+                'p95_ms': round(max(metrics['p95_ms'] * 4, 250), 1),
+                'peak_kib': round(max(metrics['peak_kib'] * 2, 1024), 1),
+            } for kind, metrics in kinds.items()
+        } for route, kinds in results.items()
+    }
+
+
+def load_budgets(path: Path = BUDGETS_PATH) -> Dict[str, Dict[str, Dict[str, float]]]:
+    with open(path) as budgets_file:
+        return json.load(budgets_file)
+
+
+@contextlib.contextmanager
+def isolated_media():
+    """
+    Store the photos of the seeded data in a temporary folder instead of the configured storage.
+    """
+    with tempfile.TemporaryDirectory() as media_root:
+        with override_settings(MEDIA_ROOT=media_root, UPLOAD_STAGING_ROOT=os.path.join(media_root, 'staging'),
+                               STORAGES={'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                                         'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.'
+                                                                    'StaticFilesStorage'}}):
+            yield media_root
@@ -0,0 +1,133 @@
+"""
+Content-addressed storage of the photos.
+
+A photo is stored under the SHA-256 of its bytes (helping_func.content_file_path), so the same image posted many
+times is stored and served once, and the content of a URL never changes: CDNs and browsers may cache the files
+forever (settings.GS_OBJECT_PARAMETERS). The renditions are named after their photo, so they are shared too.
+
+The Blob table counts the photos using every file. Photo rows saved with a new file are counted by the signals;
+code creating photos in bulk calls add_references itself. When the last photo of a file is deleted, the file and
+its renditions are deleted after the commit. Files stored before the table existed have no Blob and are kept.
+
+A new photo is counted before its file is written, and whether the file is written or found already stored is
+decided with its Blob row locked; the files of a released Blob are deleted with the row locked too, after checking
+that no photo uses it again (delete_released). So an upload never skips writing a file which is being deleted.
+"""
+from collections import Counter, defaultdict
+from typing import Callable, Collection, Dict, List, Sequence, Tuple
+
+from django.core.files.base import File
+from django.db import transaction
+from django.db.models import F
+
+from main_app.helping_func import content_digest
+from main_app.models import Blob, Photo
+from main_app.storage_writer import WriteBatch
+
+
+class BlobWriteBatch(WriteBatch):
+    """
+    A WriteBatch of content-addressed files: a file already stored is not written again.
+
+    Write and roll back in the transaction which counted the files (add_references): their Blob rows are locked
+    until it ends, so no other photo can have used a file written by the batch when rollback() deletes it.
+    """
+
+    def save(self, name: str, content: File) -> str:
+        if self.storage.exists(name):
+            return name
+        saved = self.storage.save(name, content)
+        if saved != name:
+            # The same bytes were written under the same name at the same time, the storage renamed this copy
+            self.storage.delete(saved)
+        else:
+            self.names.append(name)
+        return name
+
+
+def save(name: str, content: File) -> str:
+    """
+    Save a content-addressed file to the default storage unless it is already there.
+    """
+    return BlobWriteBatch().save(name, content)
+
+
+def store_photo_file(photo: Photo) -> None:
+    """
+    Count a photo with a new (uncommitted) file, save the file under the name of its content unless it is already
+    stored, and point the photo to it.
+
+    Args:
+        photo (Photo): The photo, not saved yet.
+    """
+    name = photo.image.field.generate_filename(photo, photo.image.name)
+    with transaction.atomic():
+        add_references([(name, photo.image.size)])
+        save(name, photo.image.file)
+    photo.image = name
+
+
+@transaction.atomic
+def add_references(references: Sequence[Tuple[str, int]]) -> None:
+    """
+    Count new photos using content-addressed files, creating the missing Blob rows. The rows stay locked until
+    the end of the transaction, call it before checking whether the files are stored.
+
+    Args:
+        references (Sequence[Tuple[str, int]]): The storage name and the size of the file of every new photo.
+    """
+    counts = Counter(name for name, _ in references)
+    if not counts:
+        return
+    sizes = dict(references)
+    # Waits for the deletion of released files (delete_released), whose rows are then gone and created again
+    list(Blob.objects.select_for_update().filter(name__in=counts).values_list('pk', flat=True))
+    Blob.objects.bulk_create([Blob(sha256=content_digest(name), name=name, size=sizes[name]) for name in counts],
+                             ignore_conflicts=True)
+    for increment, names in _group_by_count(counts).items():
+        Blob.objects.filter(name__in=names).update(ref_count=F('ref_count') + increment)
+
+
+def release(names: Sequence[str]) -> List[str]:
+    """
+    Uncount deleted photos.
+
+    Args:
+        names (Sequence[str]): The storage name of the file of every deleted photo.
+
+    Returns:
+        List[str]: The names of the files no photo uses anymore, to delete with delete_released once the
+            transaction is committed.
+    """
+    counts = Counter(names)
+    updated = 0
+    for decrement, group in _group_by_count(counts).items():
+        updated += Blob.objects.filter(name__in=group).update(ref_count=F('ref_count') - decrement)
+    if not updated:
+        return []
+    return list(Blob.objects.filter(name__in=counts, ref_count=0).values_list('name', flat=True))
+
+
+@transaction.atomic
+def delete_released(names: Collection[str], delete: Callable[[str], None]) -> None:
+    """
+    Delete the released files (see release) which no new photo uses, and their Blob rows. The rows are locked
+    while the files are deleted: a photo counted meanwhile waits, then writes its file again.
+
+    Args:
+        names (Collection[str]): The storage names of the released files.
+        delete (Callable[[str], None]): The function deleting a file and what was derived from it.
+    """
+    unused = Blob.objects.select_for_update().filter(name__in=names, ref_count=0)
+    released = list(unused.values_list('name', flat=True))
+    for name in released:
+        delete(name)
+    Blob.objects.filter(name__in=released).delete()
+
+
+def _group_by_count(counts: Counter) -> Dict[int, List[str]]:
+    # One UPDATE per distinct count, a single one in the usual case
+    groups = defaultdict(list)
+    for name, count in counts.items():
+        groups[count].append(name)
+    return groups
@@ -1 +1,35 @@
+import datetime
+
 allowed_photos_extensions = ['.jpg', '.jpeg', '.png', '.gif']
+
+# How far back the "Last News" feed of subscriptions reaches
+feed_window = datetime.timedelta(days=1)
+# Number of an author's latest posts copied into a follower's feed on subscribe
+feed_backfill_limit = 100
+
+# Longest side in pixels of every photo rendition, smallest first
+rendition_sizes = {'thumb': 150, 'feed': 600, 'full': 1600}
+# Encoder quality of the WebP and AVIF renditions
+rendition_quality = 80
+
+# Number of runs of a background job before it is marked as failed
+job_max_attempts = 5
+# Delay before a failed job is retried, multiplied by the number of attempts
+job_retry_delay = datetime.timedelta(seconds=30)
+# A running job not finished within this time is considered abandoned by a dead worker
+job_timeout = datetime.timedelta(minutes=15)
+
+# Number of files of a post written to the storage at the same time
+storage_write_workers = 5
+
+# Number of comments, and of replies to a comment, per page of a post
+comments_per_page = 10
+
+# Number of pages of search results served, the best matches are on the first ones
+search_max_pages = 10
+
+# Largest number of posts or users changed by one call of the JSON API
+api_batch_limit = 100
+# Default and largest number of objects of a page of the JSON API (`page_size` parameter)
+api_page_size = 20
+api_max_page_size = 100
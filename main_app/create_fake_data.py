@@ -1,5 +1,18 @@
+"""
+Generate fake data and save it to the database in batches.
+
+Rows are generated in chunks by a pool of processes; every chunk has its own seed, so the same seed produces
+the same data whatever the number of workers. The main process saves the chunks with bulk_create.
+"""
+
+import contextlib
 import os
 import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import (Any, Callable, Dict, Iterator, List, Optional, Sequence,
+                    Tuple)
 
 import django
 from django.conf import settings
@@ -7,101 +20,269 @@ from django.conf import settings
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", 'djangogramm.settings')
 django.setup()
 
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.utils import timezone
 from faker import Faker
 
-from main_app.models import Comment, CustomUser, Photo, Post, Tag
+from main_app import blobs, storage_writer
+from main_app.blobs import BlobWriteBatch
+from main_app.helping_func import (content_file_path, file_digest,
+                                   image_extension)
+from main_app.images import store_renditions, stored_renditions
+from main_app.models import (Comment, CustomUser, Follow, Photo,
+                             PhotoRendition, Post, Tag)
+from main_app.repositories import FeedRepository, TagRepository
+from main_app.search import build_search_document
 
-fake = Faker()
 fake_photo_directory = os.path.join(settings.MEDIA_ROOT, 'fake_photos/')
 
-"""
-Generate fake datas and save them to the database.
+# Every fake user can log in with this password
+FAKE_PASSWORD = 'fake-password'
 
-Args:
-    num_tags (int, optional): The number of objects to generate. Defaults to 10.
+PRESETS: Dict[str, Dict[str, int]] = {
+    'small': {'users': 50, 'tags': 30, 'posts': 500, 'follows_per_user': 10, 'likes_per_post': 5,
+              'max_photos': 3, 'max_comments': 5},
+    'medium': {'users': 5_000, 'tags': 1_000, 'posts': 100_000, 'follows_per_user': 50, 'likes_per_post': 20,
+               'max_photos': 3, 'max_comments': 5},
+    'large': {'users': 50_000, 'tags': 10_000, 'posts': 1_000_000, 'follows_per_user': 150, 'likes_per_post': 50,
+              'max_photos': 3, 'max_comments': 5},
+}
 
-Returns:
-    None
-"""
+CHUNK_SIZE = 5_000
 
 
-def create_fake_tags(num_tags: int = 10) -> None:
-    for _ in range(num_tags):
-        tag = Tag()
-        tag.tag = fake.word()  # Generate random word
-        tag.save()
-    print(f"Successfully created {num_tags} tags.")
+def _seeded(seed: int, chunk_start: int) -> Tuple[Faker, random.Random]:
+    fake = Faker()
+    fake.seed_instance(f'{seed}-{chunk_start}')
+    return fake, random.Random(f'{seed}-{chunk_start}')
+
+
+def _chunks(total: int, size: int = CHUNK_SIZE) -> List[Tuple[int, int]]:
+    return [(start, min(size, total - start)) for start in range(0, total, size)]
+
+
+def _run_in_pool(func: Callable, tasks: Sequence[Tuple], workers: int) -> Iterator[Any]:
+    """
+    Yield func(*task) for every task in order, computing at most two tasks per worker ahead of the consumer.
+    """
+    if workers <= 1:
+        for task in tasks:
+            yield func(*task)
+        return
+
+    # Forked workers must not share the database connections of the main process
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        tasks = iter(tasks)
+        for task in tasks:
+            pending.append(pool.submit(func, *task))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            yield pending.popleft().result()
+            task = next(tasks, None)
+            if task is not None:
+                pending.append(pool.submit(func, *task))
+
 
+def _generate_users(seed: int, start: int, count: int) -> List[Dict[str, str]]:
+    fake, _ = _seeded(seed, start)
+    # The index keeps usernames and emails unique
+    return [{'username': f'{fake.user_name()}{index}', 'email': f'{index}.{fake.email()}',
+             'bio': fake.text(max_nb_chars=200)} for index in range(start, start + count)]
 
-def create_fake_users(num_users: int = 10) -> None:
-    for _ in range(num_users):
-        username = fake.user_name()
-        email = fake.email()
-        password = fake.password()
-        bio = fake.text(max_nb_chars=200)
-        user = CustomUser(username=username, email=email, password=password, bio=bio)
-        user.save()
+
+def _generate_tags(seed: int, start: int, count: int) -> List[str]:
+    fake, _ = _seeded(seed, start)
+    return [f'{fake.word()}{index}' for index in range(start, start + count)]
+
+
+def _generate_follows(seed: int, start: int, count: int, user_ids: Sequence[int],
+                      follows_per_user: int) -> List[Tuple[int, int]]:
+    _, rand = _seeded(seed, start)
+    follows = []
+    for follower_id in user_ids[start:start + count]:
+        followees = [followee_id for followee_id in rand.sample(user_ids, min(follows_per_user + 1, len(user_ids)))
+                     if followee_id != follower_id]
+        follows.extend((follower_id, followee_id) for followee_id in followees[:follows_per_user])
+    return follows
+
+
+def _generate_posts(seed: int, start: int, count: int, user_ids: Sequence[int], tags: Sequence[str],
+                    photo_names: Sequence[str], options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    fake, rand = _seeded(seed, start)
+    # The same for every chunk, whenever a worker generates it
+    now = options['now']
+    posts = []
+    for _ in range(count):
+        publish_date = fake.date_time_between(start_date=now - timedelta(days=365), end_date=now,
+                                              tzinfo=timezone.utc)
+        reactions = rand.sample(user_ids, min(rand.randint(0, options['likes_per_post'] * 2), len(user_ids)))
+        split = rand.randint(0, len(reactions))
+        posts.append({
+            'name': fake.word(),
+            'summary': fake.paragraph(nb_sentences=5),
+            'author_id': rand.choice(user_ids),
+            'publish_date': publish_date,
+            'tags': rand.sample(tags, min(rand.randint(1, 3), len(tags))),
+            'photos': [rand.choice(photo_names) for _ in range(rand.randint(1, options['max_photos']))]
+            if photo_names else [],
+            'comments': [(rand.choice(user_ids), fake.paragraph(nb_sentences=3),
+                          fake.date_time_between(start_date=publish_date, end_date=now, tzinfo=timezone.utc))
+                         for _ in range(rand.randint(0, options['max_comments']))],
+            'likers': reactions[:split],
+            'dislikers': reactions[split:],
+        })
+    return posts
+
+
+def create_fake_users(num_users: int = 10, seed: int = 0, workers: int = 1, batch_size: int = 1000) -> None:
+    password = make_password(FAKE_PASSWORD)
+    for rows in _run_in_pool(_generate_users, [(seed, *chunk) for chunk in _chunks(num_users)], workers):
+        CustomUser.objects.bulk_create([CustomUser(password=password, **row) for row in rows], batch_size=batch_size)
     print(f"Successfully created {num_users} users.")
 
 
-def create_fake_posts(num_posts: int = 10) -> None:
-    users = CustomUser.objects.all()
-    tags = Tag.objects.all()
+def create_fake_tags(num_tags: int = 10, seed: int = 0, workers: int = 1, batch_size: int = 1000) -> None:
+    for rows in _run_in_pool(_generate_tags, [(seed, *chunk) for chunk in _chunks(num_tags)], workers):
+        Tag.objects.bulk_create([Tag(tag=tag) for tag in rows], batch_size=batch_size, ignore_conflicts=True)
+    print(f"Successfully created {num_tags} tags.")
 
-    for _ in range(num_posts):
-        post = Post()
-        post.name = fake.word()
-        post.summary = fake.paragraph(nb_sentences=5)
-        post.author = random.choice(users)
 
-        post.publish_date = fake.date_between(start_date='-1y', end_date='today')
-        post.save()
-        post.tag.set(random.sample(list(tags), random.randint(1, 3)))
-    print(f"Successfully created {num_posts} posts.")
+def create_fake_follows(follows_per_user: int = 10, seed: int = 0, workers: int = 1, batch_size: int = 1000) -> None:
+    user_ids = list(CustomUser.objects.order_by('pk').values_list('pk', flat=True))
+    tasks = [(seed, *chunk, user_ids, follows_per_user) for chunk in _chunks(len(user_ids))]
+    created = 0
+    for rows in _run_in_pool(_generate_follows, tasks, workers):
+        Follow.objects.bulk_create([Follow(follower_id=follower_id, followee_id=followee_id)
+                                    for follower_id, followee_id in rows],
+                                   batch_size=batch_size, ignore_conflicts=True)
+        created += len(rows)
+    print(f"Successfully created {created} follows.")
+
 
+def store_fake_photos() -> Dict[str, int]:
+    """
+    Upload every file of the fake photo directory to the storage once, under the name of its content.
 
-def create_fake_photos() -> None:
-    posts = Post.objects.all()
+    Returns:
+        Dict[str, int]: The size of every storage name the fake Photo rows point to.
+    """
+    file_names = sorted(os.listdir(fake_photo_directory))
+    with contextlib.ExitStack() as stack:
+        files = [File(stack.enter_context(open(os.path.join(fake_photo_directory, file_name), 'rb')))
+                 for file_name in file_names]
+        names = storage_writer.run_concurrently(
+            [lambda batch, file=file, file_name=file_name: batch.save(
+                str(content_file_path(file_digest(file), image_extension(file, file_name))), file)
+             for file, file_name in zip(files, file_names)], BlobWriteBatch())
+        return {name: file.size for name, file in zip(names, files)}
 
-    for post in posts:
-        for _ in range(random.randint(1, 5)):
-            # create fake photo
-            fake_photo = Photo()
 
-            # Take the random file from photo`s list
-            random_photo_file = random.choice(os.listdir(fake_photo_directory))
+def store_fake_renditions(photo_names: Sequence[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Render every uploaded fake photo once; the renditions are shared by all the Photo rows of a file, also with
+    the photos of a previous run.
 
-            # Full path to the file
-            photo_path = os.path.join(fake_photo_directory, random_photo_file)
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: The PhotoRendition fields per storage name of the photo.
+    """
+    renditions = stored_renditions(photo_names)
+    for name in photo_names:
+        if name in renditions:
+            continue
+        with default_storage.open(name, 'rb') as photo_file:
+            renditions[name] = store_renditions(name, photo_file)
+    return renditions
 
-            # Mounting fake photo with current post
-            fake_photo.post = post
 
-            fake_photo.image.save(random_photo_file, open(photo_path, 'rb'))
+def create_fake_posts(num_posts: int = 10, seed: int = 0, workers: int = 1, batch_size: int = 1000,
+                      likes_per_post: int = 5, max_photos: int = 3, max_comments: int = 5,
+                      now: Optional[datetime] = None) -> None:
+    """
+    Create posts with their tags, photos and their renditions, comments, likes and dislikes, published during
+    the year before now (the current time by default).
+    """
+    user_ids = list(CustomUser.objects.order_by('pk').values_list('pk', flat=True))
+    tags = list(Tag.objects.order_by('tag').values_list('tag', flat=True))
+    photo_sizes = store_fake_photos()
+    photo_names = list(photo_sizes)
+    renditions = store_fake_renditions(photo_names)
+    options = {'likes_per_post': likes_per_post, 'max_photos': max_photos, 'max_comments': max_comments,
+               'now': now or timezone.now()}
+    tasks = [(seed, *chunk, user_ids, tags, photo_names, options) for chunk in _chunks(num_posts)]
+
+    for rows in _run_in_pool(_generate_posts, tasks, workers):
+        posts = Post.objects.bulk_create(
+            [Post(name=row['name'], summary=row['summary'], author_id=row['author_id'],
+                  publish_date=row['publish_date'], likes_count=len(row['likers']),
+                  dislikes_count=len(row['dislikers']), comments_count=len(row['comments']),
+                  search_document=build_search_document(row['name'], row['summary'], row['tags']))
+             for row in rows],
+            batch_size=batch_size)
+
+        # Also counts the posts of the tags
+        TagRepository.attach_tags_to_posts([(post, row['tags']) for post, row in zip(posts, rows)],
+                                           batch_size=batch_size)
+        photos = Photo.objects.bulk_create(
+            [Photo(post_id=post.pk, image=name) for post, row in zip(posts, rows) for name in row['photos']],
+            batch_size=batch_size)
+        blobs.add_references([(photo.image.name, photo_sizes[photo.image.name]) for photo in photos])
+        PhotoRendition.objects.bulk_create(
+            [PhotoRendition(photo_id=photo.pk, **rendition) for photo in photos
+             for rendition in renditions[photo.image.name]],
+            batch_size=batch_size)
+        Comment.objects.bulk_create(
+            [Comment(post_id=post.pk, author_id=author_id, text=text, publish_date=publish_date)
+             for post, row in zip(posts, rows) for author_id, text, publish_date in row['comments']],
+            batch_size=batch_size)
+        Post.likes.through.objects.bulk_create(
+            [Post.likes.through(post_id=post.pk, customuser_id=user_id)
+             for post, row in zip(posts, rows) for user_id in row['likers']],
+            batch_size=batch_size)
+        Post.dislikes.through.objects.bulk_create(
+            [Post.dislikes.through(post_id=post.pk, customuser_id=user_id)
+             for post, row in zip(posts, rows) for user_id in row['dislikers']],
+            batch_size=batch_size)
+    print(f"Successfully created {num_posts} posts.")
 
-    print("Fake photo successfully created.")
 
+def rebuild_feeds() -> None:
+    for user in CustomUser.objects.iterator():
+        FeedRepository.rebuild_feed(user)
+    print("Feeds successfully rebuilt.")
 
-def create_fake_comments() -> None:
-    posts = Post.objects.all()
-    users = CustomUser.objects.all()
 
-    for post in posts:
-        num_comments = random.randint(0, 5)
+def generate(users: int, tags: int, posts: int, follows_per_user: int = 10, likes_per_post: int = 5,
+             max_photos: int = 3, max_comments: int = 5, seed: int = 0, workers: int = 1, batch_size: int = 1000,
+             feeds: bool = True) -> None:
+    """
+    Generate a complete fake data set.
 
-        for _ in range(num_comments):
-            comment = Comment()
-            comment.post = post
-            for _ in range(random.randint(1, 3)):
-                comment.author = random.choice(users)
-                comment.text = fake.paragraph(nb_sentences=3)
-                comment.save()
-    print("Fake comments successfully created.")
+    Args:
+        users (int): The number of users.
+        tags (int): The number of tags.
+        posts (int): The number of posts; each gets 1-3 tags, 1-max_photos photos and 0-max_comments comments.
+        follows_per_user (int): The number of users every user subscribes to.
+        likes_per_post (int): The average number of likes and dislikes of a post.
+        seed (int): The seed; the same seed gives the same data on an empty database.
+        workers (int): The number of processes generating rows.
+        batch_size (int): The number of rows per INSERT.
+        feeds (bool): Fill the home feeds from the generated follows.
+    """
+    create_fake_users(users, seed=seed, workers=workers, batch_size=batch_size)
+    create_fake_tags(tags, seed=seed, workers=workers, batch_size=batch_size)
+    if follows_per_user:
+        create_fake_follows(follows_per_user, seed=seed, workers=workers, batch_size=batch_size)
+    create_fake_posts(posts, seed=seed, workers=workers, batch_size=batch_size, likes_per_post=likes_per_post,
+                      max_photos=max_photos, max_comments=max_comments, now=timezone.now())
+    if feeds and follows_per_user:
+        rebuild_feeds()
 
 
 if __name__ == '__main__':
-    create_fake_users()
-    create_fake_tags()
-    create_fake_posts(100)
-    create_fake_photos()
-    create_fake_comments()
+    generate(**PRESETS['small'])
@@ -0,0 +1,131 @@
+"""
+EXPLAIN of the repository queries that serve the pages, to check that each reads an index instead of a table.
+
+Every entry of QUERIES calls a repository the way a view does, against the data of benchmarks.seed_data.
+explain_queries() records the SELECTs each call runs, prefetches included, and reports the tables they scan
+sequentially. On PostgreSQL sequential scans are disabled while explaining: the seeded tables are small enough
+for the planner to prefer them, so a sequential scan left in the plan means no index can serve the query.
+
+Maintenance queries which read whole tables by design (the reconcile_* commands, rebuild_search_index) are not
+listed.
+"""
+import re
+from typing import Any, Callable, Dict, List
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from main_app.constants import feed_window
+from main_app.pagination import KeysetPaginator
+from main_app.repositories import (CommentRepository, FeedRepository,
+                                   LikeRepository, PostRepository,
+                                   SearchRepository, SubscribeRepository,
+                                   TagRepository)
+
+PER_PAGE = 10
+
+
+def _two_pages(queryset, fields=('publish_date', 'id')) -> None:
+    # The first page and the next one, whose cursor adds the keyset range condition
+    paginator = KeysetPaginator(queryset, PER_PAGE, fields)
+    paginator.get_page(paginator.get_page().next_cursor)
+
+
+# How every repository query of the request path is called, with the objects returned by seed_data.
+QUERIES: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    'PostRepository.get_all_posts': lambda data: _two_pages(PostRepository.get_all_posts().card_versions()),
+    'PostRepository.get_posts_by_author': lambda data: _two_pages(
+        PostRepository.get_posts_by_author(data['author'])),
+    'PostRepository.get_posts_by_author (own)': lambda data: _two_pages(
+        PostRepository.get_posts_by_author(data['author'], include_unpublished=True)),
+    'PostRepository.get_posts_for_cards': lambda data: PostRepository.get_posts_for_cards([data['post'].pk]),
+    'PostRepository.get_post_with_details': lambda data: PostRepository.get_post_with_details(data['post'].pk),
+    'CommentRepository.get_comments': lambda data: _two_pages(CommentRepository.get_comments(data['post'].pk)),
+    'CommentRepository.get_comments (replies)': lambda data: _two_pages(
+        CommentRepository.get_comments(data['post'].pk, parent_id=data['comment'].pk)),
+    'FeedRepository.get_feed_page': lambda data: FeedRepository.get_feed_page(
+        data['follower'], PER_PAGE, since=timezone.now() - feed_window),
+    'FeedRepository.get_latest_posts_of_following': lambda data: list(
+        FeedRepository.get_latest_posts_of_following(data['follower'])),
+    'TagRepository.get_posts_by_tag': lambda data: _two_pages(TagRepository.get_posts_by_tag(data['tag'])),
+    'TagRepository.autocomplete': lambda data: list(TagRepository.autocomplete(data['tag'].tag[:2])),
+    'SearchRepository.search_posts': lambda data: list(SearchRepository.search_posts(data['post'].name)[:PER_PAGE]),
+    'SubscribeRepository.is_subscribed': lambda data: SubscribeRepository.is_subscribed(data['follower'],
+                                                                                        data['author']),
+    # Explained for their SELECTs; the follow is already there, so the feed of the follower stays the same
+    'LikeRepository.set_reactions': lambda data: LikeRepository.set_reactions(data['follower'],
+                                                                              {data['post'].pk: 'like'}),
+    'SubscribeRepository.set_follows': lambda data: SubscribeRepository.set_follows(data['follower'],
+                                                                                    {data['author'].pk: True}),
+    'SubscribeRepository.get_users_with_follow_counts': lambda data: list(
+        SubscribeRepository.get_users_with_follow_counts([data['author'].pk, data['follower'].pk])),
+}
+
+# Plan lines of a sequential scan; the table is the first group
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    # SQLite names the index of an index scan ("SCAN t USING INDEX i") and of a search
+    'sqlite': re.compile(r'^SCAN (\w+)$'),
+}
+# Plan lines of a subquery SQLite computes first and then scans, which is not a table
+DERIVED_TABLE_PATTERN = re.compile(r'^(?:CO-ROUTINE|MATERIALIZE) (\w+)$')
+
+
+def explain(sql: str, params: Any) -> List[str]:
+    """
+    Args:
+        sql (str): A SELECT statement with placeholders.
+        params (Any): Its parameters.
+
+    Returns:
+        List[str]: The lines of the plan of the statement.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}', params)
+            return [row[0] for row in cursor.fetchall()]
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+    raise NotImplementedError(f'EXPLAIN is not supported on {connection.vendor}.')
+
+
+def seq_scans(plan: List[str]) -> List[str]:
+    """
+    Returns:
+        List[str]: The tables scanned sequentially by a plan of explain().
+    """
+    pattern = SEQ_SCAN_PATTERNS[connection.vendor]
+    lines = [line.strip() for line in plan]
+    derived = {match.group(1) for match in map(DERIVED_TABLE_PATTERN.match, lines) if match}
+    return [match.group(1) for match in map(pattern.search, lines) if match and match.group(1) not in derived]
+
+
+def explain_queries(data: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Run every entry of QUERIES and explain the SELECTs it runs.
+
+    Args:
+        data (Dict[str, Any]): The objects returned by benchmarks.seed_data.
+
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: The sql, plan and sequentially scanned tables of every SELECT, per entry.
+    """
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    for name, call in QUERIES.items():
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                statements.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            call(data)
+
+        results[name] = []
+        for sql, params in statements:
+            plan = explain(sql, params)
+            results[name].append({'sql': sql, 'plan': plan, 'seq_scans': seq_scans(plan)})
+    return results
@@ -1,10 +1,10 @@
 from pathlib import Path
-from typing import Union
+from typing import Dict, Optional, Union
 
 from django import forms
 from django.contrib.auth.forms import (AuthenticationForm, UserChangeForm,
                                        UserCreationForm)
-from django.forms import modelformset_factory
+from django.forms import BaseModelFormSet, modelformset_factory
 
 from main_app.constants import allowed_photos_extensions
 from main_app.models import Comment, CustomUser, Photo, Post, Tag
@@ -25,7 +25,19 @@ class PhotoForm(forms.ModelForm):
     image = forms.ImageField(validators=[validate_image_extension])
 
 
-PhotoFormSet = modelformset_factory(Photo, form=PhotoForm, extra=5)
+class BasePhotoFormSet(BaseModelFormSet):
+    def __init__(self, *args, rejected_uploads: Optional[Dict[str, str]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Errors of the files the upload handler skipped, so the forms of these files look empty
+        self.rejected_uploads = rejected_uploads or {}
+
+    def clean(self) -> None:
+        super().clean()
+        if self.rejected_uploads:
+            raise forms.ValidationError(list(self.rejected_uploads.values()))
+
+
+PhotoFormSet = modelformset_factory(Photo, form=PhotoForm, formset=BasePhotoFormSet, extra=5)
 
 
 # Form for creating and updating Post objects
@@ -73,4 +85,11 @@ class CustomUserChangeForm(UserChangeForm):
 class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
-        fields = ('text',)  # Fields to include in the form
+        fields = ('text', 'parent')  # Fields to include in the form
+        widgets = {'parent': forms.HiddenInput}
+
+    def __init__(self, *args, post: Optional[Post] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Only a comment of the same post can be replied to
+        if post is not None:
+            self.fields['parent'].queryset = Comment.objects.filter(post=post)
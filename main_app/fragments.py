@@ -0,0 +1,66 @@
+"""
+Cache of the rendered post cards.
+
+A card (name, author link and photos of a post) is the same for every viewer, so it is rendered once and kept in
+the `fragments` cache (settings.CACHES). Its key holds the post id and Post.updated_at, so a change of the post
+gives new keys instead of deleting old ones: save() updates the field, and the signals touch the posts of a
+changed photo or author with invalidate_post_cards(). Old cards expire with the cache timeout.
+
+A page loads the ids and versions of its posts, fetches their cards with one get_many and renders only the
+missing ones, loading the author and the photos of those posts alone.
+"""
+from typing import Callable, Dict, List, Sequence
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import QuerySet
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import SafeString, mark_safe
+
+from main_app.models import Post
+
+POST_CARD_TEMPLATE = 'main_app/includes/post_card.html'
+# Bumped when the markup of the cards changes, so the cards rendered by the previous release are not used
+POST_CARD_VERSION = 1
+
+
+def post_card_key(post: Post, variant: str) -> str:
+    return f'post-card:{variant}:{post.pk}:{post.updated_at.timestamp()}'
+
+
+def render_post_cards(posts: Sequence[Post], variant: str,
+                      load: Callable[[List[int]], Dict[int, Post]]) -> Dict[int, SafeString]:
+    """
+    Get the rendered cards of posts from the cache, rendering the missing ones.
+
+    Args:
+        posts (Sequence[Post]): The posts, loaded with their pk and updated_at only.
+        variant (str): 'feed' (author first, subscriptions) or 'list' (name first, all posts).
+        load (Callable[[List[int]], Dict[int, Post]]): Loads the posts of the missing cards by pk, with their
+            author and photos (PostQuerySet.with_author().with_photos()).
+
+    Returns:
+        Dict[int, SafeString]: The cards by post pk; a post deleted in the meantime has none.
+    """
+    cache = caches[settings.FRAGMENT_CACHE_ALIAS]
+    keys = {post.pk: post_card_key(post, variant) for post in posts}
+    cards = cache.get_many(keys.values(), version=POST_CARD_VERSION)
+
+    missing = [pk for pk, key in keys.items() if key not in cards]
+    if missing:
+        rendered = {keys[pk]: render_to_string(POST_CARD_TEMPLATE, {'post': post, 'variant': variant})
+                    for pk, post in load(missing).items()}
+        cache.set_many(rendered, version=POST_CARD_VERSION)
+        cards.update(rendered)
+    return {pk: mark_safe(cards[key]) for pk, key in keys.items() if key in cards}
+
+
+def invalidate_post_cards(posts: QuerySet) -> int:
+    """
+    Give new card keys to posts whose card changed without saving them (photos, author).
+
+    Returns:
+        int: The number of touched posts.
+    """
+    return posts.update(updated_at=timezone.now())
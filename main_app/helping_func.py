@@ -1,13 +1,83 @@
+import hashlib
 import uuid
+from functools import partial
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
 
 from django.utils.text import slugify
+from PIL import Image, UnidentifiedImageError
+
+
+def file_digest(file: IO[bytes]) -> str:
+    """
+    Compute the SHA-256 of a file, read from its start.
+
+    Args:
+        file (IO[bytes]): The file.
+
+    Returns:
+        str: The hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(partial(file.read, 64 * 1024), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def image_extension(file: IO[bytes], filename: str) -> str:
+    """
+    Get the file extension of an image from its format, whatever the extension of its name.
+
+    Args:
+        file (IO[bytes]): The image file, read from its start.
+        filename (str): The original filename, whose extension is kept for a file which is not an image.
+
+    Returns:
+        str: The extension, with its dot.
+    """
+    file.seek(0)
+    try:
+        with Image.open(file) as image:
+            # Pillow opens JPEGs with several frames (cameras) as MPO
+            extension = '.jpg' if image.format in ('JPEG', 'MPO') else f'.{image.format.lower()}'
+    except UnidentifiedImageError:
+        extension = Path(filename).suffix.lower().replace('.jpeg', '.jpg')
+    file.seek(0)
+    return extension
+
+
+def content_file_path(digest: str, extension: str) -> Path:
+    """
+    Generate the content-addressed file path for a photo: the same bytes always get the same path.
+
+    Args:
+        digest (str): The SHA-256 of the content.
+        extension (str): The extension of the image format, see image_extension.
+
+    Returns:
+        Path: The complete file path for the photo.
+    """
+    return Path(f"media/photos/{digest[:2]}/{digest}{extension}")
+
+
+def content_digest(name: str) -> str:
+    """
+    Get the SHA-256 a content-addressed photo or rendition file is named after.
+
+    Args:
+        name (str): The storage name of the photo or the rendition.
+
+    Returns:
+        str: The digest.
+    """
+    return Path(name).stem.split('--')[0]
 
 
 def photo_file_path(instance: Any, filename: str) -> Path:
     """
-    Generate the file path for uploaded photos.
+    Generate the file path for uploaded photos, named after their content (see main_app.blobs).
 
     Args:
         instance (Any): The instance of the Photo model.
@@ -16,10 +86,22 @@ def photo_file_path(instance: Any, filename: str) -> Path:
     Returns:
         Path: The complete file path for the uploaded photo.
     """
-    author_slug: str = slugify(instance.post.author.username)
-    post_name_slug: str = slugify(instance.post.name)
-    unique_filename: str = f"{author_slug}--{post_name_slug}--{uuid.uuid4()}--{Path(filename).suffix}"
-    return Path(f"media/photos/{unique_filename}")
+    return content_file_path(file_digest(instance.image), image_extension(instance.image, filename))
+
+
+def rendition_file_path(source_name: str, size: str, extension: str) -> Path:
+    """
+    Generate the file path for a rendition of a photo.
+
+    Args:
+        source_name (str): The storage name of the original photo.
+        size (str): The name of the rendition size.
+        extension (str): The file extension of the rendition format.
+
+    Returns:
+        Path: The complete file path for the rendition.
+    """
+    return Path(f"media/renditions/{Path(source_name).stem}--{size}.{extension}")
 
 
 def avatar_file_path(instance: object, filename: str) -> Path:
@@ -0,0 +1,170 @@
+"""
+Resized renditions of the uploaded photos.
+
+Every photo gets a copy per size of constants.rendition_sizes in every modern format the installed Pillow can
+write (WebP, and AVIF when supported). Templates serve them with `<picture>` and `srcset` (see the `picture`
+template tag), so browsers download a thumbnail instead of the original upload.
+"""
+from collections import defaultdict
+from io import BytesIO
+from typing import (IO, Any, Callable, Collection, Dict, List, Optional,
+                    Sequence, Tuple)
+
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from main_app import blobs
+from main_app.constants import rendition_quality, rendition_sizes
+from main_app.helping_func import rendition_file_path
+from main_app.models import Photo, PhotoRendition
+
+# Most compact format first, browsers pick the first <source> they support
+FORMATS = ('avif', 'webp')
+# Encoder options per format; the default AVIF speed is several times slower than WebP for a similar size
+SAVE_OPTIONS = {'avif': {'speed': 8}}
+
+
+def rendition_formats() -> List[str]:
+    """
+    Returns:
+        List[str]: The rendition formats the installed Pillow can write.
+    """
+    Image.init()
+    return [image_format for image_format in FORMATS if image_format.upper() in Image.SAVE]
+
+
+def render(source: IO[bytes]) -> List[Dict[str, Any]]:
+    """
+    Resize an image to every rendition size and encode it in every rendition format.
+
+    Images are never upscaled: a size whose result is not smaller than the previous one is skipped.
+
+    Args:
+        source (IO[bytes]): The original image file.
+
+    Returns:
+        List[Dict[str, Any]]: The size, format, width, height and content of every rendition.
+    """
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    renditions = []
+    previous_size = None
+    for size, longest_side in rendition_sizes.items():
+        resized = image.copy()
+        resized.thumbnail((longest_side, longest_side), Image.LANCZOS)
+        if resized.size == previous_size:
+            continue
+        previous_size = resized.size
+        for image_format in rendition_formats():
+            buffer = BytesIO()
+            resized.save(buffer, format=image_format.upper(), quality=rendition_quality,
+                         **SAVE_OPTIONS.get(image_format, {}))
+            renditions.append({'size': size, 'format': image_format, 'width': resized.width,
+                               'height': resized.height, 'content': ContentFile(buffer.getvalue())})
+    return renditions
+
+
+def store_renditions(source_name: str, source: IO[bytes],
+                     save: Optional[Callable[[str, File], str]] = None) -> List[Dict[str, Any]]:
+    """
+    Render an image and save the renditions to the storage.
+
+    Args:
+        source_name (str): The storage name of the original image, the renditions are named after it.
+        source (IO[bytes]): The original image file.
+        save (Optional[Callable[[str, File], str]]): The function saving a file, e.g. BlobWriteBatch.save;
+            blobs.save by default, which keeps the renditions already stored for the same bytes.
+
+    Returns:
+        List[Dict[str, Any]]: The PhotoRendition fields of every rendition.
+    """
+    save = save or blobs.save
+    stored = []
+    for rendition in render(source):
+        content = rendition.pop('content')
+        name = rendition_file_path(source_name, rendition['size'], rendition['format'])
+        stored.append({**rendition, 'image': save(str(name), content)})
+    return stored
+
+
+def create_renditions(photo: Photo) -> List[PhotoRendition]:
+    """
+    Generate and record the renditions of a saved photo.
+
+    A photo of a file which already has renditions shares them. A file Pillow cannot read gets no renditions;
+    the templates then fall back to the original.
+
+    Args:
+        photo (Photo): The photo.
+
+    Returns:
+        List[PhotoRendition]: The created renditions.
+    """
+    if not photo.image:
+        return []
+    renditions = stored_renditions([photo.image.name]).get(photo.image.name)
+    if renditions is None:
+        try:
+            with photo.image.open('rb') as source:
+                renditions = store_renditions(photo.image.name, source)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            return []
+    return PhotoRendition.objects.bulk_create([PhotoRendition(photo=photo, **rendition) for rendition in renditions])
+
+
+def stored_renditions(source_names: Collection[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Find the renditions already recorded for photo files, to share them with new photos of the same file.
+
+    Args:
+        source_names (Collection[str]): The storage names of the photos.
+
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: The PhotoRendition fields of every rendition, per name which has any.
+    """
+    renditions: Dict[str, Dict[Tuple[str, str], Dict[str, Any]]] = defaultdict(dict)
+    for row in (PhotoRendition.objects.filter(photo__image__in=source_names)
+                .values('photo__image', 'size', 'format', 'image', 'width', 'height')):
+        source_name = row.pop('photo__image')
+        renditions[source_name].setdefault((row['size'], row['format']), row)
+    return {source_name: list(by_key.values()) for source_name, by_key in renditions.items()}
+
+
+def delete_photo_files(names: Sequence[str]) -> None:
+    """
+    Delete released photo files (see blobs.release) and their renditions, unless a new photo uses them again.
+    """
+    blobs.delete_released(names, delete_photo_file)
+
+
+def delete_photo_file(name: str) -> None:
+    """
+    Delete a photo file and its renditions from the storage.
+    """
+    default_storage.delete(name)
+    for size in rendition_sizes:
+        for image_format in FORMATS:
+            default_storage.delete(str(rendition_file_path(name, size, image_format)))
+
+
+def photo_srcsets(photo: Photo) -> List[Dict[str, str]]:
+    """
+    Build the `<source>` attributes of a photo, one per format, from its (prefetched) renditions.
+
+    Returns:
+        List[Dict[str, str]]: The MIME type and the srcset of every format, most compact format first.
+    """
+    by_format: Dict[str, List[PhotoRendition]] = {}
+    for rendition in photo.renditions.all():
+        by_format.setdefault(rendition.format, []).append(rendition)
+    sources = []
+    for image_format in FORMATS:
+        renditions = sorted(by_format.get(image_format, []), key=lambda rendition: rendition.width)
+        if renditions:
+            srcset = ', '.join(f'{rendition.image.url} {rendition.width}w' for rendition in renditions)
+            sources.append({'type': f'image/{image_format}', 'srcset': srcset})
+    return sources
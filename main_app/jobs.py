@@ -0,0 +1,120 @@
+"""
+A job queue stored in the database.
+
+enqueue() saves a Job row in the current transaction, so a job exists only if the work that created it was
+committed. The run_worker command claims pending jobs one at a time and calls their task; a failed job is
+retried with a growing delay up to constants.job_max_attempts times.
+
+With settings.JOBS_EAGER (tests, local runs without a worker) the job runs in the same process right after
+the transaction is committed.
+"""
+import traceback
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from main_app.constants import job_max_attempts, job_retry_delay, job_timeout
+from main_app.models import Job
+
+
+def enqueue(task: str, payload: Dict[str, Any]) -> Job:
+    """
+    Queue a job.
+
+    Args:
+        task (str): The dotted path of the function to call, e.g. 'main_app.uploads.process_post_photos'.
+        payload (Dict[str, Any]): The JSON-serializable argument of the function.
+
+    Returns:
+        Job: The queued job.
+    """
+    job = Job.objects.create(task=task, payload=payload)
+    if settings.JOBS_EAGER:
+        transaction.on_commit(lambda: run_job(job))
+    return job
+
+
+def claim(job: Job) -> bool:
+    """
+    Mark a pending job as running; False if another worker claimed it first.
+    """
+    now = timezone.now()
+    claimed = Job.objects.filter(pk=job.pk, status=Job.PENDING).update(
+        status=Job.RUNNING, attempts=F('attempts') + 1, updated_at=now)
+    if claimed:
+        job.refresh_from_db(fields=['status', 'attempts', 'updated_at'])
+    return bool(claimed)
+
+
+def claim_next() -> Optional[Job]:
+    """
+    Claim the oldest pending job which is due.
+
+    Returns:
+        Optional[Job]: The claimed job or None if the queue is empty.
+    """
+    while True:
+        job = (Job.objects.filter(status=Job.PENDING, run_after__lte=timezone.now())
+               .order_by('run_after', 'pk').first())
+        if job is None:
+            return None
+        if claim(job):
+            return job
+
+
+def run_job(job: Job) -> bool:
+    """
+    Claim and run a job.
+
+    Returns:
+        bool: True if the job ran successfully.
+    """
+    if job.status != Job.RUNNING and not claim(job):
+        return False
+    try:
+        import_string(job.task)(job.payload)
+    except Exception:
+        fail(job, traceback.format_exc())
+        return False
+    Job.objects.filter(pk=job.pk).update(status=Job.DONE, error='', updated_at=timezone.now())
+    job.status = Job.DONE
+    return True
+
+
+def fail(job: Job, error: str) -> None:
+    now = timezone.now()
+    if job.attempts >= job_max_attempts:
+        job.status = Job.FAILED
+    else:
+        job.status = Job.PENDING
+        job.run_after = now + job_retry_delay * job.attempts
+    Job.objects.filter(pk=job.pk).update(status=job.status, run_after=job.run_after, error=error, updated_at=now)
+
+
+def run_next() -> bool:
+    """
+    Run the next due job.
+
+    Returns:
+        bool: False if there was no job to run.
+    """
+    job = claim_next()
+    if job is None:
+        return False
+    run_job(job)
+    return True
+
+
+def requeue_abandoned() -> int:
+    """
+    Put back in the queue the jobs left running by a worker which died, see constants.job_timeout.
+
+    Returns:
+        int: The number of requeued jobs.
+    """
+    return Job.objects.filter(status=Job.RUNNING, updated_at__lt=timezone.now() - job_timeout).update(
+        status=Job.PENDING, run_after=timezone.now())
@@ -0,0 +1,53 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from main_app.benchmarks import (BUDGETS_PATH, benchmark_routes, check_budgets,
+                                 isolated_media, load_budgets, make_budgets,
+                                 seed_data)
+
+
+class Command(BaseCommand):
+    help = ("Seed a test database with fake data, request every main_app url as an anonymous user and as a user "
+            "with many follows, and check query counts, latency and peak memory against the budgets.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100, help='Number of fake posts to seed.')
+        parser.add_argument('--iterations', type=int, default=20, help='Measured requests per url and user.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the fake data generator.')
+        parser.add_argument('--budgets', type=Path, default=BUDGETS_PATH, help='Path of the budgets file.')
+        parser.add_argument('--write-budgets', action='store_true',
+                            help='Write budgets derived from this run instead of checking them.')
+
+    def handle(self, *args, **options):
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        setup_test_environment()
+        old_config = runner.setup_databases()
+        try:
+            with isolated_media():
+                data = seed_data(posts=options['posts'], seed=options['seed'])
+                results = benchmark_routes(data, iterations=options['iterations'])
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        self.stdout.write(f"{'route':<22}{'user':<11}{'queries':>8}{'p50 ms':>10}{'p95 ms':>10}{'peak KiB':>10}")
+        for route, kinds in results.items():
+            for kind, metrics in kinds.items():
+                self.stdout.write(f"{route:<22}{kind:<11}{metrics['queries']:>8}{metrics['p50_ms']:>10}"
+                                  f"{metrics['p95_ms']:>10}{metrics['peak_kib']:>10}")
+
+        if options['write_budgets']:
+            with open(options['budgets'], 'w') as budgets_file:
+                json.dump(make_budgets(results), budgets_file, indent=2)
+                budgets_file.write('\n')
+            self.stdout.write(self.style.SUCCESS(f"Budgets written to {options['budgets']}."))
+            return
+
+        failures = check_budgets(results, load_budgets(options['budgets']))
+        if failures:
+            raise CommandError('Benchmark budgets exceeded:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('All benchmarks are within budgets.'))
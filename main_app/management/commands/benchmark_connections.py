@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from djangogramm.pooled_postgresql.pool import pool_stats
+from main_app.benchmarks import (CONNECTION_ROUTE, benchmark_connections,
+                                 isolated_media, seed_data)
+
+
+class Command(BaseCommand):
+    help = ("Seed a test database with fake data, measure how long connecting to the database takes and compare the "
+            "latency of concurrent requests which connect every time with requests which reuse their connection.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100, help='Number of fake posts to seed.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the fake data generator.')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per connection mode and number of threads.')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8],
+                            help='Numbers of threads sending requests at the same time.')
+        parser.add_argument('--connects', type=int, default=50, help='Number of measured connections.')
+
+    def handle(self, *args, **options):
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        setup_test_environment()
+        old_config = runner.setup_databases()
+        try:
+            with isolated_media():
+                data = seed_data(posts=options['posts'], seed=options['seed'])
+                results = benchmark_connections(data, concurrency=options['concurrency'],
+                                                requests=options['requests'], connects=options['connects'])
+                pools = pool_stats()
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        self.stdout.write(f"Backend {connection.settings_dict['ENGINE']}, route {CONNECTION_ROUTE}.")
+        self.stdout.write(f"Connect: p50 {results['connect']['p50_ms']} ms, p95 {results['connect']['p95_ms']} ms.")
+        self.stdout.write(f"{'connection':<14}{'threads':>8}{'p50 ms':>10}{'p95 ms':>10}{'req/s':>10}")
+        for mode, by_threads in results['requests'].items():
+            for threads, metrics in by_threads.items():
+                self.stdout.write(f"{mode:<14}{threads:>8}{metrics['p50_ms']:>10}{metrics['p95_ms']:>10}"
+                                  f"{metrics['requests_per_s']:>10}")
+        for name, stats in pools.items():
+            self.stdout.write(f'Pool {name}: ' + ', '.join(f'{key} {value}' for key, value in stats.items()))
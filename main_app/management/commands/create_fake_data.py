@@ -0,0 +1,34 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app import create_fake_data
+
+
+class Command(BaseCommand):
+    help = "Generate a fake data set (users, tags, follows, posts, photos, comments, likes) for load testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--preset', choices=sorted(create_fake_data.PRESETS), default='small',
+                            help='Size of the data set; the options below override its values.')
+        for option in ('users', 'tags', 'posts', 'follows-per-user', 'likes-per-post', 'max-photos',
+                       'max-comments'):
+            parser.add_argument(f'--{option}', type=int)
+        parser.add_argument('--seed', type=int, default=0, help='Same seed, same data on an empty database.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of processes generating rows.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of rows per INSERT.')
+        parser.add_argument('--skip-feeds', action='store_true', help='Do not fill the home feeds.')
+
+    def handle(self, *args, **options):
+        sizes = dict(create_fake_data.PRESETS[options['preset']])
+        for name in sizes:
+            if options[name] is not None:
+                sizes[name] = options[name]
+        # Every post has at least one photo
+        if sizes['max_photos'] < 1:
+            raise CommandError('--max-photos must be at least 1.')
+
+        create_fake_data.generate(**sizes, seed=options['seed'], workers=options['workers'],
+                                  batch_size=options['batch_size'], feeds=not options['skip_feeds'])
+        self.stdout.write(self.style.SUCCESS(f"Fake data successfully created: {sizes}."))
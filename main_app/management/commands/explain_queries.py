@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from main_app.benchmarks import isolated_media, seed_data
+from main_app.explain import explain_queries
+
+
+class Command(BaseCommand):
+    help = ("Seed a test database with fake data, run EXPLAIN on every repository query of main_app.explain.QUERIES "
+            "and fail if one of them scans a table sequentially.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100, help='Number of fake posts to seed.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the fake data generator.')
+
+    def handle(self, *args, **options):
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        setup_test_environment()
+        old_config = runner.setup_databases()
+        try:
+            with isolated_media():
+                data = seed_data(posts=options['posts'], seed=options['seed'])
+                results = explain_queries(data)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        failures = []
+        for name, statements in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for statement in statements:
+                scans = statement['seq_scans']
+                if scans:
+                    failures.append(f"{name}: sequential scan of {', '.join(scans)}")
+                if scans or options['verbosity'] > 1:
+                    self.stdout.write(f"  {statement['sql']}")
+                    self.stdout.write('\n'.join(f'    {line}' for line in statement['plan']))
+                else:
+                    self.stdout.write(f"  {statement['sql'][:100]}")
+
+        if failures:
+            raise CommandError('Queries without an index:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('Every query is served by an index.'))
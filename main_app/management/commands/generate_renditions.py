@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from main_app.fragments import invalidate_post_cards
+from main_app.images import create_renditions
+from main_app.models import Post
+from main_app.repositories import PhotoRepository
+
+
+class Command(BaseCommand):
+    help = "Generate the resized renditions of the photos which have none (e.g. uploaded before they existed)."
+
+    def handle(self, *args, **options):
+        generated = 0
+        post_ids = set()
+        for photo in PhotoRepository.get_photos_without_renditions().iterator():
+            if create_renditions(photo):
+                generated += 1
+                post_ids.add(photo.post_id)
+        # The cached cards of the posts still show the originals
+        invalidate_post_cards(Post.objects.filter(pk__in=post_ids))
+        self.stdout.write(self.style.SUCCESS(f"Successfully generated renditions of {generated} photos."))
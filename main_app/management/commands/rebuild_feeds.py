@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from main_app.constants import feed_backfill_limit
+from main_app.models import CustomUser
+from main_app.repositories import FeedRepository
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized home feeds from the users' current subscriptions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Rebuild only the feed of the given user id (can be repeated).')
+        parser.add_argument('--limit', type=int, default=feed_backfill_limit,
+                            help='Number of latest posts copied per followed author.')
+
+    def handle(self, *args, **options):
+        users = CustomUser.objects.all()
+        if options['user_ids']:
+            users = users.filter(pk__in=options['user_ids'])
+
+        rebuilt = 0
+        for user in users.iterator():
+            FeedRepository.rebuild_feed(user, limit=options['limit'])
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f"Successfully rebuilt {rebuilt} feeds."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from main_app.models import Post
+from main_app.repositories import SearchRepository
+from main_app.search import create_search_index, drop_search_index
+
+
+class Command(BaseCommand):
+    help = "Recompute the search documents of all posts and rebuild the full-text search index."
+
+    def handle(self, *args, **options):
+        drop_search_index(connection)
+        reindexed = SearchRepository.reindex_posts(Post.objects.all())
+        create_search_index(connection)
+        self.stdout.write(self.style.SUCCESS(f"Successfully reindexed {reindexed} posts."))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from main_app.repositories import CommentRepository, LikeRepository
+
+
+class Command(BaseCommand):
+    help = ("Fix Post.likes_count, Post.dislikes_count and Post.comments_count that drifted from the stored likes, "
+            "dislikes and comments.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report the posts with drifted counters.')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            drifted = LikeRepository.get_drifted_counts()
+            for post in drifted:
+                self.stdout.write(f"Post {post.pk}: likes {post.likes_count} -> {post.actual_likes_count}, "
+                                  f"dislikes {post.dislikes_count} -> {post.actual_dislikes_count}")
+            drifted_comments = CommentRepository.get_drifted_counts()
+            for post in drifted_comments:
+                self.stdout.write(f"Post {post.pk}: comments {post.comments_count} -> {post.actual_comments_count}")
+            self.stdout.write(f"Found {len(drifted) + len(drifted_comments)} posts with drifted counters.")
+            return
+
+        fixed = LikeRepository.reconcile_counts() + CommentRepository.reconcile_counts()
+        self.stdout.write(self.style.SUCCESS(f"Successfully reconciled {fixed} posts."))
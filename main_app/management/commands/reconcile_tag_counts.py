@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from main_app.repositories import TagRepository
+
+
+class Command(BaseCommand):
+    help = "Fix Tag.post_count values that drifted from the stored post tags (e.g. after posts were deleted)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report the tags with drifted counters.')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            drifted = TagRepository.get_drifted_counts()
+            for tag in drifted:
+                self.stdout.write(f"Tag {tag.tag}: posts {tag.post_count} -> {tag.actual_post_count}")
+            self.stdout.write(f"Found {len(drifted)} tags with drifted counters.")
+            return
+
+        fixed = TagRepository.reconcile_counts()
+        self.stdout.write(self.style.SUCCESS(f"Successfully reconciled {fixed} tags."))
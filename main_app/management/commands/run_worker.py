@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from main_app import jobs
+
+
+class Command(BaseCommand):
+    help = "Run the background jobs queued in the database (photo uploads of new posts), one at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty.')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--max-jobs', type=int, default=0, help='Exit after this number of jobs (0: no limit).')
+
+    def handle(self, *args, **options):
+        requeued = jobs.requeue_abandoned()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} abandoned jobs.")
+
+        processed = 0
+        try:
+            while not options['max_jobs'] or processed < options['max_jobs']:
+                # The worker lives longer than CONN_MAX_AGE, like a request it drops broken or expired connections
+                close_old_connections()
+                if jobs.run_next():
+                    processed += 1
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Successfully processed {processed} jobs."))
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.4 on 2026-10-18 17:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_subscribes_to_follows(apps, schema_editor):
+    CustomUser = apps.get_model('main_app', 'CustomUser')
+    Follow = apps.get_model('main_app', 'Follow')
+    db_alias = schema_editor.connection.alias
+    user_ids = set(CustomUser.objects.using(db_alias).values_list('pk', flat=True))
+    follows = []
+    for user in CustomUser.objects.using(db_alias).only('pk', 'my_subscribes_dict').iterator():
+        for followee_id in user.my_subscribes_dict or {}:
+            if int(followee_id) in user_ids and int(followee_id) != user.pk:
+                follows.append(Follow(follower_id=user.pk, followee_id=int(followee_id)))
+    Follow.objects.using(db_alias).bulk_create(follows, batch_size=1000, ignore_conflicts=True)
+
+
+def copy_follows_to_subscribes(apps, schema_editor):
+    CustomUser = apps.get_model('main_app', 'CustomUser')
+    Follow = apps.get_model('main_app', 'Follow')
+    db_alias = schema_editor.connection.alias
+    subscribes = {}
+    for follower_id, followee_id, username in Follow.objects.using(db_alias).values_list(
+            'follower_id', 'followee_id', 'followee__username'):
+        subscribes.setdefault(follower_id, {})[str(followee_id)] = username
+    for user_id, subscribes_dict in subscribes.items():
+        CustomUser.objects.using(db_alias).filter(pk=user_id).update(my_subscribes_dict=subscribes_dict)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0002_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Follow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('followee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='follower_relations', to=settings.AUTH_USER_MODEL)),
+                ('follower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='following_relations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['followee', 'follower'], name='follow_followee_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('follower', 'followee'), name='unique_follow'),
+        ),
+        migrations.RunPython(copy_subscribes_to_follows, copy_follows_to_subscribes),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='my_subscribes_dict',
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.4 on 2026-10-18 17:18
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_reactions(apps, schema_editor):
+    Post = apps.get_model('main_app', 'Post')
+    counts = {}
+    for field in ('likes', 'dislikes'):
+        through = getattr(Post, field).through
+        reactions = (through.objects.filter(post=OuterRef('pk')).order_by().values('post')
+                     .annotate(count=Count('*')).values('count'))
+        counts[f'{field}_count'] = Coalesce(Subquery(reactions), 0)
+    Post.objects.using(schema_editor.connection.alias).update(**counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0003_follow'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='dislikes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_reactions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.4 on 2026-10-18 17:27
+
+from django.db import migrations, models
+
+from main_app.search import (build_search_document, create_search_index,
+                             drop_search_index)
+
+
+def fill_search_documents(apps, schema_editor):
+    Post = apps.get_model('main_app', 'Post')
+    db_alias = schema_editor.connection.alias
+    posts = []
+    for post in Post.objects.using(db_alias).prefetch_related('tag').iterator(chunk_size=1000):
+        post.search_document = build_search_document(post.name, post.summary, [tag.tag for tag in post.tag.all()])
+        posts.append(post)
+        if len(posts) == 1000:
+            Post.objects.using(db_alias).bulk_update(posts, ['search_document'])
+            posts = []
+    Post.objects.using(db_alias).bulk_update(posts, ['search_document'])
+
+
+def create_index(apps, schema_editor):
+    create_search_index(schema_editor.connection)
+
+
+def drop_index(apps, schema_editor):
+    drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0004_post_reaction_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.4 on 2026-10-18 17:30
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_posts(apps, schema_editor):
+    Tag = apps.get_model('main_app', 'Tag')
+    Post = apps.get_model('main_app', 'Post')
+    posts = (Post.tag.through.objects.filter(tag=OuterRef('pk')).order_by().values('tag')
+             .annotate(count=Count('*')).values('count'))
+    Tag.objects.using(schema_editor.connection.alias).update(post_count=Coalesce(Subquery(posts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0005_post_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_posts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['tag'], name='tag_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['-post_count', 'tag'], name='tag_popular_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.4 on 2026-10-18 17:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0006_tag_post_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoRendition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.CharField(max_length=10)),
+                ('format', models.CharField(max_length=10)),
+                ('image', models.ImageField(max_length=255, upload_to='')),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('photo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='main_app.photo')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='photorendition',
+            constraint=models.UniqueConstraint(fields=('photo', 'size', 'format'), name='unique_photo_rendition'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.4 on 2026-10-18 18:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_comments(apps, schema_editor):
+    Post = apps.get_model('main_app', 'Post')
+    Comment = apps.get_model('main_app', 'Comment')
+    comments = (Comment.objects.filter(post=OuterRef('pk')).order_by().values('post')
+                .annotate(count=Count('*')).values('count'))
+    Post.objects.using(schema_editor.connection.alias).update(comments_count=Coalesce(Subquery(comments), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0012_post_comment_pubdate_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='main_app.comment'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['parent', '-publish_date'], name='comment_parent_pubdate_idx'),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+    ]
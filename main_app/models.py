@@ -15,13 +15,63 @@ class Photo(models.Model):
         return str(self.pk)
 
 
+# File of the storage named after the SHA-256 of its content, shared by every photo with the same bytes
+class Blob(models.Model):
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    # Storage name of the file, see helping_func.content_file_path
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    # Number of photos using the file; the file is deleted when it drops to zero (see main_app.blobs)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+# Resized copy of a photo in a web format, generated by main_app.images when the photo is saved
+class PhotoRendition(models.Model):
+    photo = models.ForeignKey(Photo, on_delete=models.CASCADE, related_name='renditions')
+    # Name of the size in constants.rendition_sizes: thumb, feed or full
+    size = models.CharField(max_length=10)
+    # Image format: webp or avif
+    format = models.CharField(max_length=10)
+    image = models.ImageField(max_length=255)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['photo', 'size', 'format'], name='unique_photo_rendition'),
+        ]
+
+    def __str__(self):
+        return f'{self.photo_id} {self.size}.{self.format}'
+
+
 # Tag model representing tags associated with posts
 class Tag(models.Model):
     tag = models.CharField(max_length=50, primary_key=True, help_text="Enter tags separated by commas")
+    # Denormalized number of published posts with the tag, kept in step by TagRepository and the signals
+    post_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Prefix lookups (LIKE 'abc%') for the autocomplete on PostgreSQL; opclasses are ignored elsewhere
+            models.Index(fields=['tag'], name='tag_prefix_idx', opclasses=['varchar_pattern_ops']),
+            # The most used tags first, for the autocomplete without a prefix
+            models.Index(fields=['-post_count', 'tag'], name='tag_popular_idx'),
+        ]
 
     def __str__(self):
         return self.tag
 
+    def get_absolute_url(self):
+        """
+        Returns the tag`s url.
+        """
+        return reverse('tag_detail', args=[self.tag])
+
 
 # Custom user model extending the AbstractUser class
 class CustomUser(AbstractUser):
@@ -30,7 +80,6 @@ class CustomUser(AbstractUser):
     bio = models.TextField(max_length=1000, help_text='Introduce yourself', default=None, blank=True, null=True)
     # ImageField for storing user avatars, using the avatar_file_path function for the upload_to parameter
     avatar = models.ImageField(upload_to=avatar_file_path, default='avatars/base_avatar.png')
-    my_subscribes_dict = models.JSONField(default=dict)
 
     def __str__(self):
         return self.username
@@ -42,14 +91,61 @@ class CustomUser(AbstractUser):
         return reverse('someone_profile', args=[str(self.pk)])
 
 
+# Follow model representing a subscription of one user (follower) to another (followee)
+class Follow(models.Model):
+    # ForeignKey to the CustomUser model who subscribes
+    follower = models.ForeignKey(CustomUser, related_name='following_relations', on_delete=models.CASCADE)
+    # ForeignKey to the CustomUser model being subscribed to
+    followee = models.ForeignKey(CustomUser, related_name='follower_relations', on_delete=models.CASCADE)
+    created_at = models.DateTimeField(default=django.utils.timezone.now)
+
+    class Meta:
+        constraints = [
+            # Also serves "who does X follow" lookups, (follower, followee) being its index
+            models.UniqueConstraint(fields=['follower', 'followee'], name='unique_follow'),
+        ]
+        indexes = [
+            # Reverse lookups: "who follows X"
+            models.Index(fields=['followee', 'follower'], name='follow_followee_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.follower_id} -> {self.followee_id}'
+
+
+# QuerySet of Post with composable builders that load related rows in a constant number of queries
+class PostQuerySet(models.QuerySet):
+    def with_author(self):
+        return self.select_related('author')
+
+    def with_photos(self):
+        return self.prefetch_related(models.Prefetch('photo_set', queryset=Photo.objects.order_by('pk')),
+                                     'photo_set__renditions')
+
+    def with_tags(self):
+        return self.prefetch_related('tag')
+
+    def with_counts(self):
+        # Post.comments_count is kept in step by signals; this counts the stored comments, see reconcile_counts
+        return self.annotate(actual_comments_count=models.Count('comment', distinct=True))
+
+    def published(self):
+        return self.filter(is_published=True)
+
+    def card_versions(self):
+        # Only what the cached post cards are looked up with, see main_app.fragments
+        return self.only('pk', 'publish_date', 'updated_at')
+
+
 # Post model representing individual posts
 class Post(models.Model):
     # CharField for the name of the post
     name = models.CharField(max_length=50)
     # TextField for the summary/description of the post
     summary = models.TextField(max_length=1000, help_text="Enter description of the post")
-    # ForeignKey to the CustomUser model representing the author of the post
-    author = models.ForeignKey(CustomUser, related_name='posts', on_delete=models.SET_NULL, null=True)
+    # ForeignKey to the CustomUser model representing the author of the post; indexed by post_author_pubdate_idx
+    author = models.ForeignKey(CustomUser, related_name='posts', on_delete=models.SET_NULL, null=True,
+                               db_index=False)
     # Many-to-Many relationship with the Tag model, allowing multiple tags for a post (blank=True allows no tags)
     tag = models.ManyToManyField(Tag, blank=True)
     # DateField for the publish date of the post, using Django's timezone and set to the current time by defaul
@@ -57,6 +153,29 @@ class Post(models.Model):
 
     likes = models.ManyToManyField(CustomUser, blank=True, related_name='likes')
     dislikes = models.ManyToManyField(CustomUser, blank=True, related_name='dislikes')
+    # Name, tags and summary indexed by the full-text search (see main_app.search), kept in step by signals
+    search_document = models.TextField(blank=True, default='', editable=False)
+    # Denormalized sizes of likes/dislikes, kept in step by LikeRepository.toggle_like
+    likes_count = models.PositiveIntegerField(default=0)
+    dislikes_count = models.PositiveIntegerField(default=0)
+    # Denormalized number of comments, replies included, kept in step by signals
+    comments_count = models.PositiveIntegerField(default=0)
+    # False while the background worker stores the photos of a new post; only its author sees it until then
+    is_published = models.BooleanField(default=True)
+    # Last change of what its card shows, the version of the cached card (see main_app.fragments)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # The latest change of the posts, the version of the cached anonymous pages (see main_app.page_cache)
+            models.Index(fields=['updated_at'], name='post_updated_at_idx'),
+            # Pages of all posts and of a tag, newest first (PostRepository.get_all_posts, get_posts_by_tag)
+            models.Index(fields=['-publish_date', '-id'], name='post_pubdate_idx'),
+            # Pages of the posts of an author, and the author's latest posts backfilled into feeds
+            models.Index(fields=['author', '-publish_date', '-id'], name='post_author_pubdate_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -70,15 +189,77 @@ class Post(models.Model):
 
 # Comment model representing comments on posts
 class Comment(models.Model):
-    # ForeignKey to the Post model, indicating the post to which the comment belongs
-    post = models.ForeignKey(Post, on_delete=models.CASCADE)
+    # ForeignKey to the Post model of the comment; indexed by comment_post_pubdate_idx
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, db_index=False)
     # ForeignKey to the CustomUser model representing the author of the comment
     author = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True)
+    # The comment this one replies to, always a top-level comment of the post; indexed by comment_parent_pubdate_idx
+    parent = models.ForeignKey('self', related_name='replies', on_delete=models.CASCADE, null=True, blank=True,
+                               db_index=False)
     # TextField for the text of the comment
     text = models.TextField(max_length=1000)
     # DateField for the publish date of the comment, using Django's timezone and set to the current time by default
 
     publish_date = models.DateTimeField('pubdate', default=django.utils.timezone.now, auto_now_add=False)
 
+    class Meta:
+        indexes = [
+            # The comments of a post, newest first (PostRepository.get_post_with_details)
+            models.Index(fields=['post', '-publish_date'], name='comment_post_pubdate_idx'),
+            # The replies to a comment, newest first
+            models.Index(fields=['parent', '-publish_date'], name='comment_parent_pubdate_idx'),
+        ]
+
     def __str__(self):
         return self.text[:75]
+
+
+# FeedEntry model materializing a user's home feed: one row per (follower, post), written when the post is created
+class FeedEntry(models.Model):
+    # ForeignKey to the CustomUser model whose home feed contains the post
+    owner = models.ForeignKey(CustomUser, related_name='feed_entries', on_delete=models.CASCADE)
+    # ForeignKey to the Post model delivered to the owner's feed
+    post = models.ForeignKey(Post, related_name='feed_entries', on_delete=models.CASCADE)
+    # Copy of Post.publish_date, so the feed is read as a range of the (owner, publish_date) index
+    publish_date = models.DateTimeField('pubdate')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'post'], name='unique_feed_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', '-publish_date', '-post'], name='feed_owner_pubdate_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.owner_id}:{self.post_id}'
+
+
+# Job model: a unit of background work run by the run_worker command (see main_app.jobs)
+class Job(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    # Dotted path of the function running the job, called with the payload
+    task = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    # Number of times a worker started the job
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Error of the last failed attempt
+    error = models.TextField(blank=True, default='')
+    # The job is not started before this time (set on retries)
+    run_after = models.DateTimeField(default=django.utils.timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.task} [{self.status}]'
@@ -0,0 +1,124 @@
+"""
+Full-page cache of the public pages for anonymous visitors.
+
+Anonymous visitors all get the same home page, search results and explore page, so AnonymousPageCacheMixin keeps
+the rendered responses in the default cache for settings.PAGE_CACHE_TIMEOUT seconds and answers conditional
+requests (If-None-Match / If-Modified-Since) with 304 Not Modified. Both are derived from the version of the
+posts (posts_version): the latest Post.updated_at, which moves forward when a post is published or changed, and a
+counter of deleted posts kept in the cache. A change of the posts gives every page a new cache key and ETag.
+
+Signed-in users get the pages uncached, and every response varies on Cookie, so shared HTTP caches keep the two
+apart. The version is read from the cache, so processes must share a cache backend (settings.CACHES).
+"""
+import hashlib
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers, set_response_etag)
+from django.utils.http import http_date, quote_etag
+
+from main_app.models import Post
+
+DELETIONS_KEY = 'page-cache:post-deletions'
+# Last-Modified of the pages when there are no posts
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def posts_version() -> Tuple[datetime, str]:
+    """
+    Returns:
+        Tuple[datetime, str]: The time the posts last changed and an ETag which also changes when one is deleted.
+    """
+    last_modified = Post.objects.aggregate(latest=Max('updated_at'))['latest'] or EPOCH
+    deletions = cache.get(DELETIONS_KEY, 0)
+    return last_modified, quote_etag(f'{last_modified.timestamp()}-{deletions}')
+
+
+async def aposts_version() -> Tuple[datetime, str]:
+    last_modified = (await Post.objects.aaggregate(latest=Max('updated_at')))['latest'] or EPOCH
+    deletions = await cache.aget(DELETIONS_KEY, 0)
+    return last_modified, quote_etag(f'{last_modified.timestamp()}-{deletions}')
+
+
+def count_post_deletion() -> None:
+    cache.add(DELETIONS_KEY, 0, timeout=None)
+    cache.incr(DELETIONS_KEY)
+
+
+class AnonymousPageCacheMixin:
+    """
+    Cache the GET responses of a view for anonymous visitors and answer their conditional requests.
+
+    A view whose page does not show posts sets `page_shows_posts = False`: it is cached by URL alone and
+    validated with the ETag of its content, without a query.
+    """
+    page_cache_timeout = None
+    page_shows_posts = True
+
+    def dispatch(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        if not self.is_page_cached(request):
+            response = super().dispatch(request, *args, **kwargs)
+            patch_vary_headers(response, ['Cookie'])
+            return response
+
+        last_modified, etag = posts_version() if self.page_shows_posts else (None, None)
+        not_modified = self.not_modified(request, last_modified, etag)
+        if not_modified is not None:
+            return not_modified
+
+        key = self.page_key(request, etag)
+        response = cache.get(key)
+        if response is not None:
+            return get_conditional_response(request, etag=response.get('ETag'), response=response)
+        return self.cache_response(super().dispatch(request, *args, **kwargs), key, last_modified, etag)
+
+    @staticmethod
+    def is_page_cached(request: HttpRequest) -> bool:
+        return request.method in ('GET', 'HEAD') and not request.user.is_authenticated
+
+    def not_modified(self, request: HttpRequest, last_modified: Optional[datetime],
+                     etag: Optional[str]) -> Optional[HttpResponse]:
+        if etag is None:
+            return None
+        response = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+        return None if response is None else self.add_cache_headers(response, last_modified, etag)
+
+    @staticmethod
+    def page_key(request: HttpRequest, etag: Optional[str]) -> str:
+        return f'page-cache:{hashlib.md5(request.get_full_path().encode()).hexdigest()}:{etag}'
+
+    def cache_response(self, response: HttpResponse, key: str, last_modified: Optional[datetime],
+                       etag: Optional[str]) -> HttpResponse:
+        if response.status_code != 200 or response.streaming:
+            return response
+
+        def store(rendered: HttpResponse) -> None:
+            self.add_cache_headers(rendered, last_modified, etag)
+            if not rendered.cookies:
+                timeout = self.page_cache_timeout
+                cache.set(key, rendered, settings.PAGE_CACHE_TIMEOUT if timeout is None else timeout)
+
+        if callable(getattr(response, 'render', None)):
+            response.add_post_render_callback(store)
+        else:
+            store(response)
+        return response
+
+    @staticmethod
+    def add_cache_headers(response: HttpResponse, last_modified: Optional[datetime],
+                          etag: Optional[str]) -> HttpResponse:
+        if etag is None:
+            set_response_etag(response)
+        else:
+            response.headers.setdefault('ETag', etag)
+        if last_modified is not None:
+            response.headers.setdefault('Last-Modified', http_date(last_modified.timestamp()))
+        # Browsers keep the page but ask whether it changed every time
+        patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+        patch_vary_headers(response, ['Cookie'])
+        return response
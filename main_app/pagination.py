@@ -0,0 +1,159 @@
+import base64
+import binascii
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db.models import Field, Q, QuerySet
+from django.http import Http404
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values: Sequence[Any], reverse: bool = False) -> str:
+    """
+    Encode the keyset position of a row into an opaque url-safe cursor.
+
+    Args:
+        values (Sequence[Any]): The values of the ordering fields of the row.
+        reverse (bool): True if the cursor points to the page before the row.
+
+    Returns:
+        str: The cursor.
+    """
+    payload = {'v': [value.isoformat() if hasattr(value, 'isoformat') else value for value in values],
+               'r': reverse}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, fields: Optional[Sequence[Field]] = None) -> Tuple[List[Any], bool]:
+    """
+    Decode a cursor created by encode_cursor.
+
+    Args:
+        cursor (str): The cursor received from the client.
+        fields (Optional[Sequence[Field]]): The ordering fields; the values are converted to their types, and
+            checked, when given.
+
+    Returns:
+        Tuple[List[Any], bool]: The values of the ordering fields and the direction flag.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        values, reverse = list(payload['v']), bool(payload['r'])
+        if fields is not None:
+            if len(values) != len(fields):
+                raise InvalidCursor('Invalid cursor.')
+            values = [field.to_python(value) for field, value in zip(fields, values)]
+            # A NULL key cannot be compared
+            if None in values:
+                raise InvalidCursor('Invalid cursor.')
+        return values, reverse
+    except (binascii.Error, ValueError, TypeError, KeyError, ValidationError) as error:
+        raise InvalidCursor('Invalid cursor.') from error
+
+
+class KeysetPage:
+    def __init__(self, object_list: List[Any], next_cursor: Optional[str], previous_cursor: Optional[str]):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset newest first by a unique key such as (publish_date, id).
+
+    Unlike OFFSET pagination every page is a single range read of the matching index, so the cost of a page
+    does not depend on how deep it is.
+    """
+
+    def __init__(self, queryset: QuerySet, per_page: int, fields: Sequence[str] = ('publish_date', 'id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.fields = tuple(fields)
+
+    def _after(self, values: Sequence[Any], descending: bool) -> Q:
+        lookup = 'lt' if descending else 'gt'
+        condition = Q()
+        for index, field in enumerate(self.fields):
+            equal = {name: value for name, value in zip(self.fields[:index], values)}
+            condition |= Q(**equal, **{f'{field}__{lookup}': values[index]})
+        return condition
+
+    def _ordering(self, descending: bool) -> List[str]:
+        prefix = '-' if descending else ''
+        return [prefix + field for field in self.fields]
+
+    def _key(self, obj: Any) -> List[Any]:
+        return [getattr(obj, field) for field in self.fields]
+
+    def get_page(self, cursor: Optional[str] = None) -> KeysetPage:
+        queryset, reverse = self._page_queryset(cursor)
+        return self._make_page(list(queryset), cursor, reverse)
+
+    async def aget_page(self, cursor: Optional[str] = None) -> KeysetPage:
+        queryset, reverse = self._page_queryset(cursor)
+        return self._make_page([row async for row in queryset], cursor, reverse)
+
+    def _page_queryset(self, cursor: Optional[str]) -> Tuple[QuerySet, bool]:
+        # The rows of the page and one more, which tells whether there is a next page
+        queryset = self.queryset
+        reverse = False
+        if cursor:
+            model_fields = [self.queryset.model._meta.get_field(field) for field in self.fields]
+            values, reverse = decode_cursor(cursor, model_fields)
+            queryset = queryset.filter(self._after(values, descending=not reverse))
+        return queryset.order_by(*self._ordering(descending=not reverse))[:self.per_page + 1], reverse
+
+    def _make_page(self, rows: List[Any], cursor: Optional[str], reverse: bool) -> KeysetPage:
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage(rows, None, None)
+
+        has_next = has_more if not reverse else True
+        has_previous = bool(cursor) if not reverse else has_more
+        next_cursor = encode_cursor(self._key(rows[-1])) if has_next else None
+        previous_cursor = encode_cursor(self._key(rows[0]), reverse=True) if has_previous else None
+        return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+class KeysetPaginationMixin:
+    """
+    Replace the page-number pagination of ListView with keyset pagination driven by the `cursor` GET parameter.
+    """
+    cursor_param = 'cursor'
+    cursor_fields = ('publish_date', 'id')
+
+    def paginate_keyset(self, queryset: QuerySet, per_page: int, param: Optional[str] = None,
+                        fields: Optional[Sequence[str]] = None) -> KeysetPage:
+        paginator = KeysetPaginator(queryset, per_page, fields or self.cursor_fields)
+        try:
+            return paginator.get_page(self.request.GET.get(param or self.cursor_param))
+        except InvalidCursor:
+            raise Http404('Invalid cursor.')
+
+    def paginate_queryset(self, queryset, page_size):
+        page = self.paginate_keyset(queryset, page_size)
+        return None, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,98 @@
+"""
+Read-through cache of the public profiles of the users.
+
+A profile (username, avatar URL, bio and the numbers of followers and subscriptions) is read on every profile page
+and next to every comment, and rarely changes. get_profiles() reads many with one get_many and loads the missing
+ones from the database with one query.
+
+The key of a profile holds a version, also kept in the cache. invalidate() increments it when the user is saved
+(EditProfile) or a follow of the user changes, so a request which loaded the old profile in the meantime can
+only store it under the previous key, which is not read anymore.
+"""
+import time
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.urls import reverse
+
+from main_app.models import CustomUser
+from main_app.repositories import SubscribeRepository
+
+
+class UserProfile:
+    def __init__(self, pk: int, username: str, avatar_url: str, bio: Optional[str], followers_count: int,
+                 following_count: int):
+        self.pk = pk
+        self.username = username
+        self.avatar_url = avatar_url
+        self.bio = bio
+        self.followers_count = followers_count
+        self.following_count = following_count
+
+    @classmethod
+    def from_user(cls, user: CustomUser) -> 'UserProfile':
+        """
+        Args:
+            user (CustomUser): The user, annotated by SubscribeRepository.get_users_with_follow_counts.
+        """
+        return cls(user.pk, user.username, user.avatar.url if user.avatar else '', user.bio, user.followers_count,
+                   user.following_count)
+
+    def __str__(self):
+        return self.username
+
+    def get_absolute_url(self):
+        return reverse('someone_profile', args=[str(self.pk)])
+
+
+def _version_key(user_id: int) -> str:
+    return f'user-profile-version:{user_id}'
+
+
+def get_profiles(user_ids: Iterable[int]) -> Dict[int, UserProfile]:
+    """
+    Get the profiles of users from the cache, loading the missing ones.
+
+    Args:
+        user_ids (Iterable[int]): The pks of the users.
+
+    Returns:
+        Dict[int, UserProfile]: The profiles by user pk; a user which does not exist has none.
+    """
+    version_keys = {user_id: _version_key(user_id) for user_id in set(user_ids) if user_id is not None}
+    versions = cache.get_many(version_keys.values())
+    for key in version_keys.values():
+        if key not in versions:
+            # A new version never used before, in case older profiles of the user are still cached
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+
+    keys = {user_id: f'user-profile:{user_id}:{versions[key]}' for user_id, key in version_keys.items()}
+    profiles = cache.get_many(keys.values())
+    missing = [user_id for user_id, key in keys.items() if key not in profiles]
+    if missing:
+        # Loaded from the primary: a replica lagging behind the invalidation would have the profile cached stale
+        # under the new version for PROFILE_CACHE_TIMEOUT
+        loaded = {keys[user.pk]: UserProfile.from_user(user)
+                  for user in SubscribeRepository.get_users_with_follow_counts(missing, using=DEFAULT_DB_ALIAS)}
+        cache.set_many(loaded, settings.PROFILE_CACHE_TIMEOUT)
+        profiles.update(loaded)
+    return {user_id: profiles[key] for user_id, key in keys.items() if key in profiles}
+
+
+def get_profile(user_id: int) -> Optional[UserProfile]:
+    return get_profiles([user_id]).get(user_id)
+
+
+def invalidate(user_ids: Iterable[int]) -> None:
+    """
+    Make the cached profiles of users stale, after the users or their follows changed.
+    """
+    for user_id in user_ids:
+        try:
+            cache.incr(_version_key(user_id))
+        except ValueError:
+            # No version, so no profile is cached under the current one
+            pass
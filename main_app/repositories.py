@@ -1,114 +1,571 @@
-import datetime
+from collections import Counter, defaultdict
+from functools import partial
 
-from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import (Case, Count, F, OuterRef, Q, Subquery, Value,
+                              When, Window)
+from django.db.models.functions import Coalesce, Greatest, RowNumber
 from django.utils import timezone
 
-from main_app.models import Comment, CustomUser, Photo, Post, Tag
+from main_app import search, uploads
+from main_app.constants import feed_backfill_limit, feed_window
+from main_app.models import (Comment, CustomUser, FeedEntry, Follow, Photo,
+                             Post, Tag)
+from main_app.pagination import KeysetPage, KeysetPaginator
 
 
 class LikeRepository:
+    @staticmethod
+    def _reactions(relation, post, user):
+        return getattr(Post, relation).through.objects.filter(post_id=post.pk, customuser_id=user.pk)
+
     @staticmethod
     def toggle_like(request, post, is_like):
-        likes_set = post.likes.all()
-        dislikes_set = post.dislikes.all()
+        relation, opposite = ('likes', 'dislikes') if is_like else ('dislikes', 'likes')
+        user = request.user
 
-        if is_like:
-            if request.user in likes_set:
-                post.likes.remove(request.user)
-            else:
-                post.likes.add(request.user)
-                post.dislikes.remove(request.user)
-        else:
-            if request.user in dislikes_set:
-                post.dislikes.remove(request.user)
+        with transaction.atomic():
+            # Locked, so that concurrent toggles of the post (a double click) wait for each other instead of
+            # inserting the same reaction twice
+            Post.objects.select_for_update().filter(pk=post.pk).values_list('pk').first()
+            # The (post, user) unique index of the through table answers the membership check,
+            # and the number of deleted rows tells whether the reaction was there.
+            # Counters never go below zero; drift is fixed by the reconcile_reaction_counts command
+            removed, _ = LikeRepository._reactions(relation, post, user).delete()
+            if removed:
+                counts = {f'{relation}_count': Greatest(F(f'{relation}_count') - 1, 0)}
             else:
-                post.dislikes.add(request.user)
-                post.likes.remove(request.user)
+                getattr(Post, relation).through.objects.create(post_id=post.pk, customuser_id=user.pk)
+                counts = {f'{relation}_count': F(f'{relation}_count') + 1}
+                removed_opposite, _ = LikeRepository._reactions(opposite, post, user).delete()
+                if removed_opposite:
+                    counts[f'{opposite}_count'] = Greatest(F(f'{opposite}_count') - 1, 0)
+            Post.objects.filter(pk=post.pk).update(**counts)
+
+        post.refresh_from_db(fields=['likes_count', 'dislikes_count'])
+
+    @staticmethod
+    def set_reactions(user, reactions):
+        """
+        Set the reactions of the user to posts, whatever they were before, in the same number of queries for any
+        number of posts. Setting a reaction twice changes nothing.
+
+        Args:
+            user (CustomUser): The user.
+            reactions (Dict[int, Optional[str]]): 'like', 'dislike' or None (no reaction) by post pk.
+
+        Returns:
+            Dict[int, Tuple[int, int]]: The numbers of likes and dislikes by post pk. Posts which do not exist or
+            are not published yet, unless the user wrote them, are missing and left alone.
+        """
+        relations = {'like': 'likes', 'dislike': 'dislikes'}
+        with transaction.atomic():
+            # Locked in pk order, so that concurrent calls for the same posts wait for each other
+            post_ids = list(Post.objects.filter(Q(is_published=True) | Q(author_id=user.pk), pk__in=reactions)
+                            .select_for_update().order_by('pk').values_list('pk', flat=True))
+            current = {}
+            for reaction, relation in relations.items():
+                reacted = getattr(Post, relation).through.objects.filter(customuser_id=user.pk, post_id__in=post_ids)
+                current.update(dict.fromkeys(reacted.values_list('post_id', flat=True), reaction))
+
+            deltas = {}
+            for reaction, relation in relations.items():
+                through = getattr(Post, relation).through
+                added = [pk for pk in post_ids if reactions[pk] == reaction and current.get(pk) != reaction]
+                removed = [pk for pk in post_ids if reactions[pk] != reaction and current.get(pk) == reaction]
+                if removed:
+                    through.objects.filter(customuser_id=user.pk, post_id__in=removed).delete()
+                if added:
+                    through.objects.bulk_create([through(post_id=pk, customuser_id=user.pk) for pk in added])
+                if added or removed:
+                    delta = Case(When(pk__in=added, then=Value(1)), When(pk__in=removed, then=Value(-1)),
+                                 default=Value(0))
+                    deltas[f'{relation}_count'] = Greatest(F(f'{relation}_count') + delta, 0)
+            if deltas:
+                changed = [pk for pk in post_ids if current.get(pk) != reactions[pk]]
+                Post.objects.filter(pk__in=changed).update(**deltas)
+
+            counts = Post.objects.filter(pk__in=post_ids).values_list('pk', 'likes_count', 'dislikes_count')
+            return {pk: (likes_count, dislikes_count) for pk, likes_count, dislikes_count in counts}
+
+    @staticmethod
+    def get_drifted_counts():
+        counts = {}
+        for relation in ('likes', 'dislikes'):
+            reactions = (getattr(Post, relation).through.objects.filter(post=OuterRef('pk')).order_by()
+                         .values('post').annotate(count=Count('*')).values('count'))
+            counts[f'actual_{relation}_count'] = Coalesce(Subquery(reactions), 0)
+        return (Post.objects.annotate(**counts)
+                .filter(~Q(likes_count=F('actual_likes_count')) | ~Q(dislikes_count=F('actual_dislikes_count'))))
+
+    @staticmethod
+    def reconcile_counts():
+        drifted = list(LikeRepository.get_drifted_counts().values_list('pk', 'actual_likes_count',
+                                                                       'actual_dislikes_count'))
+        for post_pk, likes_count, dislikes_count in drifted:
+            Post.objects.filter(pk=post_pk).update(likes_count=likes_count, dislikes_count=dislikes_count)
+        return len(drifted)
 
 
 class SubscribeRepository:
     @staticmethod
     def is_subscribed(user, subscribed_to):
-        return bool(user.my_subscribes_dict.get(str(subscribed_to.pk)))
+        return Follow.objects.filter(follower=user, followee=subscribed_to).exists()
 
     @staticmethod
     def update_subscribe(user, subscribed_to):
-        if user.my_subscribes_dict.get(str(subscribed_to.pk)):
-            del user.my_subscribes_dict[str(subscribed_to.pk)]
-        else:
-            user.my_subscribes_dict[str(subscribed_to.pk)] = subscribed_to.username
-        user.save()
+        """
+        Subscribe the user to subscribed_to, or unsubscribe if already subscribed.
 
+        Returns:
+            bool: True if the user is subscribed now.
+        """
+        with transaction.atomic():
+            deleted, _ = Follow.objects.filter(follower=user, followee=subscribed_to).delete()
+            if deleted:
+                FeedRepository.remove_author(user, subscribed_to)
+                return False
+            # A concurrent request (a double click) may have subscribed in the meantime
+            _, created = Follow.objects.get_or_create(follower=user, followee=subscribed_to)
+            if created:
+                FeedRepository.backfill_author(user, subscribed_to)
+        return True
 
-class PostRepository:
     @staticmethod
-    @login_required
-    def get_last_posts_from_subscribe(request):
-        user = request.user
-        last_posts_from_subscribe_list = []
-        one_day_ago = timezone.now() - datetime.timedelta(days=1)
+    def set_follows(user, follows):
+        """
+        Subscribe the user to users or unsubscribe, whatever the subscriptions were before, in the same number of
+        queries for any number of users. Setting a subscription twice changes nothing.
+
+        Args:
+            user (CustomUser): The follower.
+            follows (Dict[int, bool]): Whether the user follows them, by user pk.
+
+        Returns:
+            Dict[int, bool]: The subscriptions by user pk. Users which do not exist, and the user itself, are missing.
+        """
+        # Imported here, main_app.profiles reads the follows with this module
+        from main_app import profiles
+
+        with transaction.atomic():
+            # Only the pks, the rows of the users are neither loaded nor saved
+            user_ids = list(CustomUser.objects.filter(pk__in=follows).exclude(pk=user.pk)
+                            .order_by('pk').values_list('pk', flat=True))
+            following = set(Follow.objects.filter(follower=user, followee_id__in=user_ids)
+                            .values_list('followee_id', flat=True))
+            followed = [pk for pk in user_ids if follows[pk] and pk not in following]
+            unfollowed = [pk for pk in user_ids if not follows[pk] and pk in following]
+
+            if unfollowed:
+                Follow.objects.filter(follower=user, followee_id__in=unfollowed).delete()
+                FeedRepository.remove_authors(user, unfollowed)
+            if followed:
+                Follow.objects.bulk_create([Follow(follower=user, followee_id=pk) for pk in followed],
+                                           ignore_conflicts=True)
+                # bulk_create sends no signals: the profiles are invalidated as main_app.signals does for a follow
+                changed_profiles = [user.pk, *followed]
+                profiles.invalidate(changed_profiles)
+                transaction.on_commit(partial(profiles.invalidate, changed_profiles))
+                FeedRepository.backfill_authors(user, followed)
+        return {pk: follows[pk] for pk in user_ids}
+
+    @staticmethod
+    def get_users_with_follow_counts(user_ids, using=None):
+        """
+        Args:
+            user_ids (Iterable[int]): The pks of the users.
+            using (Optional[str]): The database to read, the one chosen by the router if None.
+
+        Returns:
+            QuerySet: The users annotated with followers_count and following_count.
+        """
+        # Counted by subqueries on the follow indexes rather than by joining both relations
+        def count(field):
+            follows = (Follow.objects.filter(**{field: OuterRef('pk')}).order_by().values(field)
+                       .annotate(count=Count('*')).values('count'))
+            return Coalesce(Subquery(follows), 0)
+
+        return CustomUser.objects.using(using).filter(pk__in=user_ids).annotate(followers_count=count('followee'),
+                                                                                following_count=count('follower'))
+
+    @staticmethod
+    def get_followers(user):
+        return CustomUser.objects.filter(following_relations__followee=user)
+
+    @staticmethod
+    def get_following(user):
+        return CustomUser.objects.filter(follower_relations__follower=user)
+
+    @staticmethod
+    def get_mutual_follows(user):
+        return CustomUser.objects.filter(following_relations__followee=user, follower_relations__follower=user)
+
+
+class FeedRepository:
+    """
+    Materialized home feeds: every post is written into the feeds of its author's subscribers
+    when it is created, so reading a feed is a single range read of the (owner, publish_date) index.
+    """
+
+    @staticmethod
+    def fan_out_post(post):
+        followers = Follow.objects.filter(followee_id=post.author_id).values_list('follower_id', flat=True)
+        entries = [FeedEntry(owner_id=follower_pk, post=post, publish_date=post.publish_date)
+                   for follower_pk in followers]
+        FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+    @staticmethod
+    def backfill_author(user, author, limit=feed_backfill_limit):
+        posts = (Post.objects.published().filter(author=author).order_by('-publish_date')
+                 .values_list('pk', 'publish_date'))
+        entries = [FeedEntry(owner=user, post_id=post_pk, publish_date=publish_date)
+                   for post_pk, publish_date in posts[:limit]]
+        FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+    @staticmethod
+    def backfill_authors(user, author_ids, limit=feed_backfill_limit):
+        posts = FeedRepository.get_latest_posts_of_authors(author_ids, limit=limit).values_list('pk', 'publish_date')
+        entries = [FeedEntry(owner=user, post_id=post_pk, publish_date=publish_date) for post_pk, publish_date in posts]
+        FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+    @staticmethod
+    def remove_author(user, author):
+        FeedEntry.objects.filter(owner=user, post__author=author).delete()
+
+    @staticmethod
+    def remove_authors(user, author_ids):
+        FeedEntry.objects.filter(owner=user, post__author__in=author_ids).delete()
+
+    @staticmethod
+    def get_latest_posts_of_following(user, limit=feed_backfill_limit):
+        following = Follow.objects.filter(follower=user).values('followee_id')
+        return FeedRepository.get_latest_posts_of_authors(following, limit=limit)
+
+    @staticmethod
+    def get_latest_posts_of_authors(authors, limit=feed_backfill_limit):
+        # One query for all the authors: the latest `limit` posts of each, ranked per author
+        return (Post.objects.published().filter(author__in=authors)
+                .annotate(author_rank=Window(RowNumber(), partition_by=F('author'),
+                                             order_by=[F('publish_date').desc(), F('id').desc()]))
+                .filter(author_rank__lte=limit)
+                .order_by('-publish_date', '-id'))
+
+    @staticmethod
+    def rebuild_feed(user, limit=feed_backfill_limit):
+        FeedEntry.objects.filter(owner=user).delete()
+        posts = FeedRepository.get_latest_posts_of_following(user, limit=limit).values_list('pk', 'publish_date')
+        entries = [FeedEntry(owner=user, post_id=post_pk, publish_date=publish_date) for post_pk, publish_date in posts]
+        FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+    @staticmethod
+    def get_feed_entries(user, since=None):
+        entries = FeedEntry.objects.filter(owner=user)
+        if since is not None:
+            entries = entries.filter(publish_date__gte=since)
+        return entries
+
+    @staticmethod
+    def get_feed_post_ids(user, since=None):
+        entries = FeedRepository.get_feed_entries(user, since=since)
+        return list(entries.order_by('-publish_date', '-post').values_list('post_id', flat=True))
+
+    @staticmethod
+    def get_posts_by_ids(post_ids, queryset=None):
+        if queryset is None:
+            queryset = Post.objects.with_author().with_photos()
+        posts = queryset.in_bulk(post_ids)
+        return [posts[pk] for pk in post_ids if pk in posts]
+
+    @staticmethod
+    async def aget_posts_by_ids(post_ids, queryset=None):
+        if queryset is None:
+            queryset = Post.objects.with_author().with_photos()
+        posts = await queryset.ain_bulk(post_ids)
+        return [posts[pk] for pk in post_ids if pk in posts]
+
+    @staticmethod
+    def get_feed_posts(user, since=None):
+        return FeedRepository.get_posts_by_ids(FeedRepository.get_feed_post_ids(user, since=since))
+
+    @staticmethod
+    def get_feed_page(user, per_page, cursor=None, since=None, queryset=None):
+        entries = FeedRepository.get_feed_entries(user, since=since).only('post_id', 'publish_date')
+        page = KeysetPaginator(entries, per_page, fields=('publish_date', 'post_id')).get_page(cursor)
+        page.object_list = FeedRepository.get_posts_by_ids([entry.post_id for entry in page.object_list],
+                                                           queryset=queryset)
+        return page
+
+    @staticmethod
+    async def aget_feed_page(user, per_page, cursor=None, since=None, queryset=None):
+        entries = FeedRepository.get_feed_entries(user, since=since).only('post_id', 'publish_date')
+        page = await KeysetPaginator(entries, per_page, fields=('publish_date', 'post_id')).aget_page(cursor)
+        page.object_list = await FeedRepository.aget_posts_by_ids([entry.post_id for entry in page.object_list],
+                                                                  queryset=queryset)
+        return page
 
-        for sub in user.my_subscribes_dict:
-            user = CustomUser.objects.get(pk=sub)
-            posts = user.posts.filter(publish_date__gte=one_day_ago)
-            last_posts_from_subscribe_list.append(posts)
 
-        return last_posts_from_subscribe_list
+class PostRepository:
+    """
+    Post queries. Results are PostQuerySets, so callers compose the related rows they render with the
+    with_author/with_photos/with_tags/with_counts builders: `PostRepository.get_all_posts().with_author()`.
+    """
+
+    @staticmethod
+    def get_last_posts_from_subscribe(request, per_page, cursor=None, queryset=None):
+        if not request.user.is_authenticated:
+            return KeysetPage([], None, None)
+        return FeedRepository.get_feed_page(request.user, per_page, cursor=cursor,
+                                            since=timezone.now() - feed_window, queryset=queryset)
+
+    @staticmethod
+    async def aget_last_posts_from_subscribe(request, per_page, cursor=None, queryset=None):
+        # request.user must be loaded already, see main_app.async_views.aget_user
+        if not request.user.is_authenticated:
+            return KeysetPage([], None, None)
+        return await FeedRepository.aget_feed_page(request.user, per_page, cursor=cursor,
+                                                   since=timezone.now() - feed_window, queryset=queryset)
 
     @staticmethod
     def get_all_posts():
-        return Post.objects.all().order_by('-publish_date')
+        return Post.objects.published().order_by('-publish_date', '-id')
+
+    @staticmethod
+    def get_posts_by_author(author, include_unpublished=False):
+        posts = Post.objects.all() if include_unpublished else Post.objects.published()
+        return posts.filter(author=author).order_by('-publish_date', '-id')
 
     @staticmethod
-    def get_posts_by_author(author):
-        return Post.objects.filter(author=author).order_by('-publish_date')
+    def get_posts_for_cards(post_ids):
+        return Post.objects.with_author().with_photos().in_bulk(post_ids)
+
+    @staticmethod
+    def publish_post(post):
+        # A retried job publishes the post again, its tags are counted once
+        if not post.is_published:
+            TagRepository.change_post_counts_of_posts([post.pk], 1)
+        Post.objects.filter(pk=post.pk).update(is_published=True, updated_at=timezone.now())
+        post.is_published = True
+        FeedRepository.fan_out_post(post)
 
     @staticmethod
     def get_post_with_details(post_id):
-        post = Post.objects.get(pk=post_id)
+        post = Post.objects.with_author().with_photos().with_tags().get(pk=post_id)
         photos = post.photo_set.all()
         tags = post.tag.all()
-        comments = Comment.objects.filter(post=post).order_by('-publish_date')
+        # Unevaluated: the view reads the first page, see CommentRepository.get_comments
+        comments = CommentRepository.get_comments(post.pk)
         return {'post': post, 'photos': photos, 'tags': tags, 'comments': comments}
 
 
 class PostCreationRepository:
     @staticmethod
     def create_post(user, post_form, photo_formset, tag_form):
-        post = post_form.save(commit=False)
-        post.author = user
-        post.save()
-
-        for photo_form in photo_formset:
-            if photo_form.cleaned_data.get('image'):
-                photo = photo_form.save(commit=False)
-                photo.post = post
-                photo.save()
-
-        tags = tag_form.cleaned_data['tag'].split(',')
-        for tag in tags:
-            tag, created = Tag.objects.get_or_create(tag=tag.strip())
-            post.tag.add(tag)
+        photo_files = [photo_form.cleaned_data['image'] for photo_form in photo_formset
+                       if photo_form.cleaned_data.get('image')]
+
+        with transaction.atomic():
+            post = post_form.save(commit=False)
+            post.author = user
+            # A post with photos is published by the worker once they are stored (see main_app.uploads)
+            post.is_published = not photo_files
+            post.save()
+
+            TagRepository.attach_tags(post, tag_form.cleaned_data['tag'].split(','))
+
+            if photo_files:
+                uploads.queue_post_photos(post, photo_files)
+            else:
+                FeedRepository.fan_out_post(post)
         return post
 
 
+class TagRepository:
+    @staticmethod
+    def normalize_tags(tag_names):
+        """
+        Strip the tag names, drop the empty ones and the duplicates, keeping the order they were typed in.
+
+        Args:
+            tag_names (Iterable[str]): The raw tag names, e.g. the comma separated parts of the tag field.
+
+        Returns:
+            List[str]: The tag names to store.
+        """
+        max_length = Tag._meta.get_field('tag').max_length
+        names = (name.strip()[:max_length].strip() for name in tag_names)
+        return list(dict.fromkeys(name for name in names if name))
+
+    @staticmethod
+    def attach_tags(post, tag_names):
+        return TagRepository.attach_tags_to_posts([(post, tag_names)])[0]
+
+    @staticmethod
+    def attach_tags_to_posts(posts_tags, batch_size=1000):
+        """
+        Attach tags to many posts in a fixed number of queries, creating the missing tags.
+
+        The tags and the post-tag rows are inserted in bulk, so neither Tag.objects.get_or_create nor
+        m2m_changed run: the post counters of the tags and the search documents of the posts are updated here.
+
+        Args:
+            posts_tags (Sequence[Tuple[Post, Iterable[str]]]): The saved posts with their raw tag names.
+            batch_size (int): The number of rows per INSERT or UPDATE.
+
+        Returns:
+            List[List[str]]: The normalized tag names of every post, in the order of posts_tags.
+        """
+        posts_tags = [(post, TagRepository.normalize_tags(names)) for post, names in posts_tags]
+        names = list(dict.fromkeys(name for _, post_names in posts_tags for name in post_names))
+        if not names:
+            return [post_names for _, post_names in posts_tags]
+        Tag.objects.bulk_create([Tag(tag=name) for name in names], batch_size=batch_size, ignore_conflicts=True)
+
+        through = Post.tag.through
+        current_tags = defaultdict(list)
+        for post_id, tag_id in (through.objects.filter(post_id__in=[post.pk for post, _ in posts_tags])
+                                .order_by('pk').values_list('post_id', 'tag_id')):
+            current_tags[post_id].append(tag_id)
+
+        rows, added, changed_posts = [], Counter(), []
+        for post, post_names in posts_tags:
+            new_names = [name for name in post_names if name not in current_tags[post.pk]]
+            if not new_names:
+                continue
+            rows.extend(through(post_id=post.pk, tag_id=name) for name in new_names)
+            # Unpublished posts are counted when they are published
+            if post.is_published:
+                added.update(new_names)
+            current_tags[post.pk].extend(new_names)
+            search_document = search.build_search_document(post.name, post.summary, current_tags[post.pk])
+            if post.search_document != search_document:
+                post.search_document = search_document
+                changed_posts.append(post)
+        through.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+        TagRepository.change_post_counts(added)
+
+        Post.objects.bulk_update(changed_posts, ['search_document'], batch_size=batch_size)
+        return [post_names for _, post_names in posts_tags]
+
+    @staticmethod
+    def change_post_counts(changes):
+        """
+        Change the numbers of published posts of tags, which never go below zero.
+
+        Args:
+            changes (Mapping[str, int]): The change by tag name, negative for posts which lost the tag.
+        """
+        # One UPDATE per distinct change, a single one when tagging one post
+        tags_by_change = defaultdict(list)
+        for name, change in changes.items():
+            if change:
+                tags_by_change[change].append(name)
+        for change, names in tags_by_change.items():
+            Tag.objects.filter(tag__in=names).update(post_count=Greatest(F('post_count') + change, 0))
+
+    @staticmethod
+    def change_post_counts_of_posts(post_ids, change):
+        """
+        Count published posts in, or out of, the post counters of their tags.
+
+        Args:
+            post_ids (Iterable[int]): The posts.
+            change (int): 1 when the posts are published, -1 when they are deleted or unpublished.
+        """
+        tag_names = Post.tag.through.objects.filter(post_id__in=post_ids).values_list('tag_id', flat=True)
+        TagRepository.change_post_counts({name: count * change for name, count in Counter(tag_names).items()})
+
+    @staticmethod
+    def autocomplete(prefix, limit=10):
+        # A range scan of the tag index (tag_prefix_idx on PostgreSQL), most used tags first
+        tags = Tag.objects.all()
+        if prefix:
+            tags = tags.filter(tag__startswith=prefix)
+        return tags.order_by('-post_count', 'tag')[:limit]
+
+    @staticmethod
+    def get_tag(name):
+        return Tag.objects.get(tag=name)
+
+    @staticmethod
+    def get_posts_by_tag(tag):
+        return Post.objects.published().filter(tag=tag).order_by('-publish_date', '-id')
+
+    @staticmethod
+    def get_drifted_counts():
+        posts = (Post.tag.through.objects.filter(tag=OuterRef('pk'), post__is_published=True).order_by()
+                 .values('tag').annotate(count=Count('*')).values('count'))
+        return (Tag.objects.annotate(actual_post_count=Coalesce(Subquery(posts), 0))
+                .exclude(post_count=F('actual_post_count')))
+
+    @staticmethod
+    def reconcile_counts():
+        drifted = list(TagRepository.get_drifted_counts().values_list('pk', 'actual_post_count'))
+        for tag, post_count in drifted:
+            Tag.objects.filter(pk=tag).update(post_count=post_count)
+        return len(drifted)
+
+
 class PhotoRepository:
     @staticmethod
     def get_photos_for_post(post):
-        return Photo.objects.filter(post=post)
+        # Served from the prefetch cache when the post was loaded with PostQuerySet.with_photos()
+        return post.photo_set.all()
+
+    @staticmethod
+    def get_photos_without_renditions():
+        return (Photo.objects.filter(renditions__isnull=True).exclude(image='').exclude(image__isnull=True)
+                .order_by('pk'))
 
 
 class SearchRepository:
     @staticmethod
     def search_posts(query):
-        name_filtered = Post.objects.filter(name__icontains=query)
-        tag_filtered = Post.objects.filter(tag__tag__icontains=query)
-        return name_filtered.union(tag_filtered)
+        return search.search_posts(Post.objects.published(), query)
+
+    @staticmethod
+    def reindex_posts(queryset, batch_size=1000):
+        posts = []
+        reindexed = 0
+        for post in queryset.prefetch_related('tag').iterator(chunk_size=batch_size):
+            post.search_document = search.build_search_document(post.name, post.summary,
+                                                                [tag.tag for tag in post.tag.all()])
+            posts.append(post)
+            if len(posts) == batch_size:
+                reindexed += Post.objects.bulk_update(posts, ['search_document'])
+                posts = []
+        return reindexed + Post.objects.bulk_update(posts, ['search_document'])
 
 
 class CommentRepository:
+    """
+    Comments are threaded one level deep: a reply to a reply is attached to the top-level comment, so every
+    thread is one range read of the (parent, publish_date) index. Post.comments_count is kept in step by signals.
+    """
+
+    @staticmethod
+    def get_comments(post_id, parent_id=None):
+        if parent_id is not None:
+            return Comment.objects.filter(post_id=post_id, parent_id=parent_id)
+        replies = (Comment.objects.filter(parent=OuterRef('pk')).order_by().values('parent')
+                   .annotate(count=Count('*')).values('count'))
+        return (Comment.objects.filter(post_id=post_id, parent__isnull=True)
+                .annotate(replies_count=Coalesce(Subquery(replies), 0)))
+
     @staticmethod
     def add_comment(user, post, form_data):
         comment = Comment(author=user, post=post, **form_data)
+        if comment.parent is not None and comment.parent.parent_id is not None:
+            comment.parent_id = comment.parent.parent_id
         comment.save()
         return comment
+
+    @staticmethod
+    def get_drifted_counts():
+        return Post.objects.with_counts().filter(~Q(comments_count=F('actual_comments_count')))
+
+    @staticmethod
+    def reconcile_counts():
+        drifted = list(CommentRepository.get_drifted_counts().values_list('pk', 'actual_comments_count'))
+        for post_pk, comments_count in drifted:
+            Post.objects.filter(pk=post_pk).update(comments_count=comments_count)
+        return len(drifted)
@@ -0,0 +1,144 @@
+"""
+Full-text search over posts.
+
+Every post keeps a search document (name, tags and summary) in Post.search_document. The database indexes it:
+
+* PostgreSQL: a GIN index over its tsvector for ranked word matches and a pg_trgm GIN index for typos;
+* SQLite: an FTS5 table kept in sync by triggers, ranked with bm25 (used by the tests and local runs).
+
+Other databases fall back to a case-insensitive substring match.
+"""
+import re
+from typing import Iterable, List
+
+from django.db import connection
+from django.db.models import F, FloatField, Q, QuerySet
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'simple'
+FTS_TABLE = 'main_app_post_fts'
+
+_words = re.compile(r'\w+', re.UNICODE)
+
+
+def build_search_document(name: str, summary: str, tags: Iterable[str]) -> str:
+    """
+    Build the text a post is found by.
+
+    Args:
+        name (str): The name of the post.
+        summary (str): The summary of the post.
+        tags (Iterable[str]): The tags of the post.
+
+    Returns:
+        str: The search document.
+    """
+    return ' '.join(part for part in (name, ' '.join(tags), summary) if part)
+
+
+def search_words(query: str) -> List[str]:
+    return _words.findall(query.lower())
+
+
+def search_posts(queryset: QuerySet, query: str) -> QuerySet:
+    """
+    Filter the posts matching the query and order them by relevance, best first.
+
+    Args:
+        queryset (QuerySet): The posts to search in.
+        query (str): The text typed by the user.
+
+    Returns:
+        QuerySet: The matching posts annotated with `search_rank`.
+    """
+    words = search_words(query)
+    if not words:
+        return queryset.none()
+    if connection.vendor == 'postgresql':
+        return _search_postgresql(queryset, query)
+    if connection.vendor == 'sqlite':
+        return _search_sqlite(queryset, words)
+    return _search_fallback(queryset, words)
+
+
+def _search_postgresql(queryset: QuerySet, query: str) -> QuerySet:
+    from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                                SearchVector,
+                                                TrigramWordSimilarity)
+
+    # The vector expression matches the one of the GIN index created by the migration
+    vector = SearchVector('search_document', config=SEARCH_CONFIG)
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    # Typos match through the trigram index (the <% operator, pg_trgm.word_similarity_threshold)
+    return (queryset
+            .annotate(search_vector=vector)
+            .filter(Q(search_vector=search_query) | Q(search_document__trigram_word_similar=query))
+            .annotate(search_rank=SearchRank(F('search_vector'), search_query)
+                      + TrigramWordSimilarity(query, 'search_document'))
+            .order_by('-search_rank', '-publish_date', '-id'))
+
+
+def _search_sqlite(queryset: QuerySet, words: List[str]) -> QuerySet:
+    # Every word must match, the last one also as a prefix of a longer word
+    match = ' '.join(f'"{word}"' for word in words[:-1]) + f' "{words[-1]}"*'
+    matching_ids = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+    # bm25 is lower for better matches; computed for the matching posts only
+    rank = RawSQL(f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                  f'AND rowid = main_app_post.id', [match], output_field=FloatField())
+    return (queryset.filter(pk__in=matching_ids)
+            .annotate(search_rank=rank)
+            .order_by('-search_rank', '-publish_date', '-id'))
+
+
+def _search_fallback(queryset: QuerySet, words: List[str]) -> QuerySet:
+    condition = Q()
+    for word in words:
+        condition &= Q(search_document__icontains=word)
+    return queryset.filter(condition).order_by('-publish_date', '-id')
+
+
+def create_search_index(db_connection) -> None:
+    """
+    Create the database objects indexing Post.search_document (called by the migrations and after every migrate,
+    as SQLite drops the triggers when a migration rebuilds the main_app_post table).
+    """
+    with db_connection.cursor() as cursor:
+        if db_connection.vendor == 'postgresql':
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS main_app_post_search_idx ON main_app_post "
+                f"USING GIN (to_tsvector('{SEARCH_CONFIG}'::regconfig, COALESCE(search_document, '')))")
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS main_app_post_search_trgm_idx ON main_app_post '
+                'USING GIN (search_document gin_trgm_ops)')
+        elif db_connection.vendor == 'sqlite':
+            cursor.execute(f"SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE '{FTS_TABLE}_%'")
+            if cursor.fetchone()[0] == 3:
+                return
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"search_document, content='main_app_post', content_rowid='id', prefix='2 3')")
+            cursor.execute(
+                f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON main_app_post BEGIN '
+                f'INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document); END')
+            cursor.execute(
+                f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON main_app_post BEGIN '
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) "
+                f"VALUES ('delete', old.id, old.search_document); END")
+            cursor.execute(
+                f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF search_document ON main_app_post '
+                f"BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) "
+                f"VALUES ('delete', old.id, old.search_document); "
+                f'INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document); END')
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_search_index(db_connection) -> None:
+    with db_connection.cursor() as cursor:
+        if db_connection.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS main_app_post_search_idx')
+            cursor.execute('DROP INDEX IF EXISTS main_app_post_search_trgm_idx')
+        elif db_connection.vendor == 'sqlite':
+            for trigger in ('insert', 'delete', 'update'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{trigger}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
@@ -0,0 +1,170 @@
+"""
+Serializers of the JSON API (main_app.api_views).
+
+The read serializers return only the fields listed by the `fields` query parameter (`?fields=id,name,photos`),
+all of them without it. Links and photo URLs are absolute.
+"""
+from typing import Any, Dict, List, Optional, Set, Type
+
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.request import Request
+from rest_framework.reverse import reverse
+
+from main_app.constants import api_batch_limit
+from main_app.images import FORMATS
+from main_app.models import Comment, Photo, Post
+from main_app.profiles import UserProfile
+
+
+def check_unique(items: List[Dict[str, Any]], field: str) -> List[Dict[str, Any]]:
+    # A batch sets the state of every object once, two states for one object are a mistake of the client
+    values = [item[field] for item in items]
+    if len(values) != len(set(values)):
+        raise serializers.ValidationError(f'Every {field} must appear once.')
+    return items
+
+
+class ReactionSerializer(serializers.Serializer):
+    post = serializers.IntegerField(min_value=1)
+    # null removes the reaction
+    reaction = serializers.ChoiceField(choices=['like', 'dislike'], allow_null=True)
+    likes_count = serializers.IntegerField(read_only=True)
+    dislikes_count = serializers.IntegerField(read_only=True)
+
+
+class ReactionBatchSerializer(serializers.Serializer):
+    reactions = ReactionSerializer(many=True, allow_empty=False, max_length=api_batch_limit)
+
+    def validate_reactions(self, reactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return check_unique(reactions, 'post')
+
+
+class FollowSerializer(serializers.Serializer):
+    user = serializers.IntegerField(min_value=1)
+    following = serializers.BooleanField()
+
+
+class FollowBatchSerializer(serializers.Serializer):
+    follows = FollowSerializer(many=True, allow_empty=False, max_length=api_batch_limit)
+
+    def validate_follows(self, follows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return check_unique(follows, 'user')
+
+
+def requested_fields(request: Request, serializer_class: Type[serializers.Serializer]) -> Optional[Set[str]]:
+    """
+    Args:
+        request (Request): The request, with the `fields` query parameter or not.
+        serializer_class (Type[serializers.Serializer]): The serializer of the objects of the response.
+
+    Returns:
+        Optional[Set[str]]: The fields asked for, or None for all of them.
+    """
+    value = request.query_params.get('fields')
+    if not value:
+        return None
+    fields = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = fields - set(serializer_class().fields)
+    if unknown:
+        raise ParseError(f'Unknown fields: {", ".join(sorted(unknown))}.')
+    return fields
+
+
+class SparseFieldsetMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        fields = requested_fields(request, type(self)) if request is not None else None
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+
+def user_link(request: Request, user_id: Optional[int], username: str) -> Optional[Dict[str, Any]]:
+    if user_id is None:
+        return None
+    return {'id': user_id, 'username': username, 'url': reverse('user', args=[user_id], request=request)}
+
+
+class PhotoSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    url = serializers.SerializerMethodField()
+    renditions = serializers.SerializerMethodField()
+
+    def get_url(self, photo: Photo) -> str:
+        return self.context['request'].build_absolute_uri(photo.image.url) if photo.image else ''
+
+    def get_renditions(self, photo: Photo) -> List[Dict[str, Any]]:
+        # From the renditions prefetched by PostQuerySet.with_photos(), most compact format and smallest size first
+        renditions = sorted(photo.renditions.all(),
+                            key=lambda rendition: (FORMATS.index(rendition.format), rendition.width))
+        build_absolute_uri = self.context['request'].build_absolute_uri
+        return [{'size': rendition.size, 'format': rendition.format, 'width': rendition.width,
+                 'height': rendition.height, 'url': build_absolute_uri(rendition.image.url)}
+                for rendition in renditions]
+
+
+class PostSerializer(SparseFieldsetMixin, serializers.Serializer):
+    id = serializers.IntegerField()
+    url = serializers.SerializerMethodField()
+    name = serializers.CharField()
+    summary = serializers.CharField()
+    publish_date = serializers.DateTimeField()
+    author = serializers.SerializerMethodField()
+    tags = serializers.SerializerMethodField()
+    photos = PhotoSerializer(source='photo_set.all', many=True)
+    likes_count = serializers.IntegerField()
+    dislikes_count = serializers.IntegerField()
+    comments_count = serializers.IntegerField()
+    comments_url = serializers.SerializerMethodField()
+
+    # The relations each field needs loaded, see main_app.api_views.post_queryset
+    relations = {'author': 'with_author', 'tags': 'with_tags', 'photos': 'with_photos'}
+
+    def get_url(self, post: Post) -> str:
+        return reverse('post', args=[post.pk], request=self.context['request'])
+
+    def get_author(self, post: Post) -> Optional[Dict[str, Any]]:
+        return user_link(self.context['request'], post.author_id, post.author.username if post.author_id else '')
+
+    @staticmethod
+    def get_tags(post: Post) -> List[str]:
+        return [tag.tag for tag in post.tag.all()]
+
+    def get_comments_url(self, post: Post) -> str:
+        return reverse('post_comments', args=[post.pk], request=self.context['request'])
+
+
+class CommentSerializer(SparseFieldsetMixin, serializers.Serializer):
+    id = serializers.IntegerField()
+    parent = serializers.IntegerField(source='parent_id')
+    text = serializers.CharField()
+    publish_date = serializers.DateTimeField()
+    author = serializers.SerializerMethodField()
+    replies_count = serializers.SerializerMethodField()
+
+    def get_author(self, comment: Comment) -> Optional[Dict[str, Any]]:
+        # From the profile cache, see main_app.views.attach_author_profiles
+        author = comment.author_profile
+        return author and user_link(self.context['request'], author.pk, author.username)
+
+    @staticmethod
+    def get_replies_count(comment: Comment) -> int:
+        return getattr(comment, 'replies_count', 0)
+
+
+class ProfileSerializer(SparseFieldsetMixin, serializers.Serializer):
+    id = serializers.IntegerField(source='pk')
+    username = serializers.CharField()
+    avatar = serializers.SerializerMethodField()
+    bio = serializers.CharField()
+    followers_count = serializers.IntegerField()
+    following_count = serializers.IntegerField()
+    posts_url = serializers.SerializerMethodField()
+
+    def get_avatar(self, profile: UserProfile) -> str:
+        return self.context['request'].build_absolute_uri(profile.avatar_url) if profile.avatar_url else ''
+
+    def get_posts_url(self, profile: UserProfile) -> str:
+        return reverse('user_posts', args=[profile.pk], request=self.context['request'])
@@ -0,0 +1,174 @@
+from functools import partial
+
+from django.db import connections, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_migrate, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from main_app import blobs, profiles
+from main_app.fragments import invalidate_post_cards
+from main_app.images import create_renditions, delete_photo_files
+from main_app.models import Comment, CustomUser, Follow, Photo, Post
+from main_app.page_cache import count_post_deletion
+from main_app.repositories import TagRepository
+from main_app.search import build_search_document, create_search_index
+
+
+@receiver(pre_save, sender=Post)
+def update_search_document(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    tags = instance.tag.values_list('tag', flat=True) if instance.pk else []
+    instance.search_document = build_search_document(instance.name, instance.summary, tags)
+
+
+@receiver(m2m_changed, sender=Post.tag.through)
+def update_search_document_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    posts = Post.objects.filter(tag__in=pk_set) if reverse and pk_set else [instance] if not reverse else []
+    for post in posts:
+        tags = post.tag.values_list('tag', flat=True)
+        Post.objects.filter(pk=post.pk).update(
+            search_document=build_search_document(post.name, post.summary, tags))
+
+
+@receiver(m2m_changed, sender=Post.tag.through)
+def count_tag_posts(sender, instance, action, reverse, pk_set, **kwargs):
+    # Tag.post_count counts published posts; the rows going away are counted before they are deleted
+    if action not in ('post_add', 'pre_remove', 'pre_clear') or (action != 'pre_clear' and not pk_set):
+        return
+    own_field, other_field = ('tag_id', 'post_id') if reverse else ('post_id', 'tag_id')
+    rows = sender.objects.filter(**{own_field: instance.pk})
+    if pk_set:
+        rows = rows.filter(**{f'{other_field}__in': pk_set})
+    change = 1 if action == 'post_add' else -1
+    if reverse:
+        TagRepository.change_post_counts({instance.pk: change * rows.filter(post__is_published=True).count()})
+    elif instance.is_published:
+        TagRepository.change_post_counts({name: change for name in rows.values_list('tag_id', flat=True)})
+
+
+@receiver(post_init, sender=Post)
+def remember_is_published(sender, instance, **kwargs):
+    # Read from __dict__, so a deferred is_published is not loaded
+    instance._loaded_is_published = instance.__dict__.get('is_published')
+
+
+@receiver(post_save, sender=Post)
+def count_published_post_tags(sender, instance, created, raw=False, **kwargs):
+    # Publishing or unpublishing a saved post (the admin); PostRepository.publish_post counts its own update
+    loaded, instance._loaded_is_published = instance._loaded_is_published, instance.is_published
+    if created or raw or loaded is None or loaded == instance.is_published:
+        return
+    TagRepository.change_post_counts_of_posts([instance.pk], 1 if instance.is_published else -1)
+
+
+@receiver(pre_delete, sender=Post)
+def uncount_deleted_post_tags(sender, instance, **kwargs):
+    # Before the post-tag rows are deleted with the post
+    if instance.is_published:
+        TagRepository.change_post_counts_of_posts([instance.pk], -1)
+
+
+@receiver(pre_save, sender=Photo)
+def store_photo_blob(sender, instance, raw=False, **kwargs):
+    # A photo saved with a new file (admin, forms) is stored under the name of its content
+    if raw or not instance.image or instance.image._committed:
+        return
+    blobs.store_photo_file(instance)
+
+
+@receiver(post_save, sender=Photo)
+def create_photo_renditions(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        create_renditions(instance)
+
+
+@receiver(post_delete, sender=Photo)
+def release_photo_blob(sender, instance, **kwargs):
+    if not instance.image:
+        return
+    released = blobs.release([instance.image.name])
+    if released:
+        transaction.on_commit(partial(delete_photo_files, released))
+
+
+@receiver(post_save, sender=Photo)
+@receiver(post_delete, sender=Photo)
+def invalidate_photo_post_card(sender, instance, raw=False, **kwargs):
+    if not raw and instance.post_id:
+        invalidate_post_cards(Post.objects.filter(pk=instance.post_id))
+
+
+@receiver(post_init, sender=CustomUser)
+def remember_username(sender, instance, **kwargs):
+    # Read from __dict__, so a deferred username is not loaded
+    instance._loaded_username = instance.__dict__.get('username')
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_author_post_cards(sender, instance, created, raw=False, **kwargs):
+    # The cards show the username of the author
+    if created or raw or instance.username == instance._loaded_username:
+        return
+    invalidate_post_cards(Post.objects.filter(author=instance))
+    instance._loaded_username = instance.username
+
+
+@receiver(post_migrate)
+def ensure_search_index(sender, using, **kwargs):
+    if sender.name != 'main_app':
+        return
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if 'main_app_post' not in connection.introspection.table_names(cursor):
+            return
+        columns = [column.name for column in connection.introspection.get_table_description(cursor, 'main_app_post')]
+    if 'search_document' in columns:
+        create_search_index(connection)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Post.objects.filter(pk=instance.post_id).update(comments_count=F('comments_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, origin=None, **kwargs):
+    # Nothing to count when the comments go with their post
+    if isinstance(origin, Post) or getattr(origin, 'model', None) is Post:
+        return
+    Post.objects.filter(pk=instance.post_id).update(comments_count=Greatest(F('comments_count') - 1, 0))
+
+
+@receiver(post_delete, sender=Post)
+def change_pages_version(sender, instance, **kwargs):
+    # The latest Post.updated_at, the version of the cached pages, does not change when a post is deleted
+    count_post_deletion()
+
+
+def invalidate_profiles(*user_ids):
+    # Again after the commit: a request may have cached the old rows under the new version in the meantime
+    profiles.invalidate(user_ids)
+    transaction.on_commit(partial(profiles.invalidate, user_ids))
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_user_profile(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Logging in only saves last_login, which the profile does not show
+    if created or raw or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    invalidate_profiles(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_profiles(sender, instance, raw=False, **kwargs):
+    # The numbers of followers and subscriptions changed
+    if not raw:
+        invalidate_profiles(instance.follower_id, instance.followee_id)
@@ -62,4 +62,84 @@ $(document).ready(function() {
             }
         });
     });
-});
\ No newline at end of file
+});
+
+$(document).ready(function() {
+    var suggestions = $('#tag-suggestions');
+    var input = $('#id_tag');
+    if (!suggestions.length) {
+        return;
+    }
+    input.attr('list', 'tag-suggestions').attr('autocomplete', 'off');
+
+    input.on('input', function() {
+        // Tags are separated by commas, only the one being typed is completed
+        var tags = input.val().split(',');
+        var prefix = tags.pop().trim();
+        var typed = tags.map(function(tag) { return tag.trim(); }).filter(Boolean);
+
+        $.getJSON(suggestions.data('url'), {q: prefix}, function(data) {
+            suggestions.empty();
+            data.tags.forEach(function(item) {
+                var value = typed.concat([item.tag]).join(', ');
+                suggestions.append($('<option>').attr('value', value).text(item.tag + ' (' + item.post_count + ')'));
+            });
+        });
+    });
+});
+
+$(document).ready(function() {
+    var comments = $('.existing-comments');
+    if (!comments.length) {
+        return;
+    }
+    var url = comments.data('url');
+    var replyForm = $('.comment-frame .reply').first();
+
+    function renderComment(comment) {
+        var frame = $('<div class="comment-frame">').attr('id', 'comment-' + comment.id);
+        var author = comment.author ? $('<a>').attr('href', comment.author.url).text(comment.author.username) : 'None';
+        frame.append($('<p class="comment-author">').append($('<strong>').append(author)));
+        frame.append($('<p class="comment-text">').text(comment.text));
+        frame.append($('<p class="comment-date">').text(new Date(comment.publish_date).toLocaleString()));
+        if (comment.parent === null) {
+            frame.append($('<div class="comment-replies">'));
+            if (comment.replies_count) {
+                frame.append($('<button type="button" class="button show-replies">')
+                    .attr('data-parent', comment.id).text('Replies (' + comment.replies_count + ')'));
+            }
+            var form = replyForm.clone().removeAttr('open');
+            form.find('input[name=parent]').val(comment.id);
+            frame.append(form);
+        }
+        return frame;
+    }
+
+    // The next page of the comments, or of the replies to a comment, from the cursor kept on the button
+    function loadMore(button, target, params) {
+        if (button.data('cursor')) {
+            params.cursor = button.data('cursor');
+        }
+        $.getJSON(url, params, function(data) {
+            data.comments.forEach(function(comment) {
+                target.append(renderComment(comment));
+            });
+            if (data.next_cursor) {
+                button.data('cursor', data.next_cursor);
+            } else {
+                button.remove();
+            }
+        });
+    }
+
+    $('.load-comments').click(function(e) {
+        e.preventDefault();
+        loadMore($(this), comments, {});
+    });
+
+    comments.on('click', '.show-replies', function() {
+        var button = $(this);
+        button.text('More replies');
+        loadMore(button, button.siblings('.comment-replies'), {parent: button.data('parent')});
+    });
+});
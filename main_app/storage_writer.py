@@ -0,0 +1,85 @@
+"""
+Concurrent writes to the file storage.
+
+Every write to Google Cloud Storage is a blocking HTTP request, so the files of a post are written by a bounded
+pool of threads. The writes of a batch succeed or fail together: when one fails, the files already written are
+deleted, so no blob is left without a database row.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+from django.core.files.base import File
+from django.core.files.storage import Storage, default_storage
+
+from main_app.constants import storage_write_workers
+
+T = TypeVar('T')
+
+
+class WriteBatch:
+    """
+    The names written to a storage by a batch, deleted again by rollback().
+    """
+
+    def __init__(self, storage: Optional[Storage] = None):
+        self.storage = storage or default_storage
+        self.names: List[str] = []
+
+    def save(self, name: str, content: File) -> str:
+        name = self.storage.save(name, content)
+        # list.append is atomic, the threads of a batch share it
+        self.names.append(name)
+        return name
+
+    def rollback(self) -> None:
+        for name in self.names:
+            self.storage.delete(name)
+        self.names = []
+
+
+def run_concurrently(tasks: Sequence[Callable[[WriteBatch], T]], batch: Optional[WriteBatch] = None,
+                     max_workers: int = storage_write_workers) -> List[T]:
+    """
+    Run tasks writing to the storage on a thread pool; if any of them fails, delete everything they wrote.
+
+    The tasks must not use the database: the threads have their own connections, outside of the transaction
+    of the caller.
+
+    Args:
+        tasks (Sequence[Callable[[WriteBatch], T]]): Functions writing their files with batch.save().
+        batch (Optional[WriteBatch]): The batch to write with, so the caller can also roll it back when what
+            follows the writes fails; a new batch on the default storage by default.
+        max_workers (int): The maximum number of concurrent writes.
+
+    Returns:
+        List[T]: The results of the tasks, in order.
+    """
+    batch = batch or WriteBatch()
+    if not tasks:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tasks))) as pool:
+        futures = [pool.submit(task, batch) for task in tasks]
+    # Leaving the pool waited for every task, so the batch holds all written names
+    try:
+        return [future.result() for future in futures]
+    except BaseException:
+        batch.rollback()
+        raise
+
+
+def save_files(files: Sequence[File], names: Sequence[str], storage: Optional[Storage] = None,
+               max_workers: int = storage_write_workers) -> List[str]:
+    """
+    Save files concurrently, all or none.
+
+    Args:
+        files (Sequence[File]): The files.
+        names (Sequence[str]): The names to save them under.
+        storage (Optional[Storage]): The storage, the default storage by default.
+        max_workers (int): The maximum number of concurrent writes.
+
+    Returns:
+        List[str]: The names the storage saved the files under.
+    """
+    return run_concurrently([lambda batch, file=file, name=name: batch.save(name, file)
+                             for file, name in zip(files, names)], WriteBatch(storage), max_workers)
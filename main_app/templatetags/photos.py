@@ -0,0 +1,35 @@
+from typing import Any, Dict, Optional
+
+from django import template
+
+from main_app.constants import rendition_sizes
+from main_app.images import photo_srcsets
+from main_app.models import Photo
+
+register = template.Library()
+
+
+@register.inclusion_tag('main_app/includes/picture.html')
+def picture(photo: Photo, size: str = 'feed', width: Optional[int] = None, height: Optional[int] = None,
+            alt: str = 'Photo') -> Dict[str, Any]:
+    """
+    Render a photo as `<picture>` with a srcset of its renditions, falling back to the original upload.
+
+    Usage: `{% picture photo 'thumb' width=150 height=150 %}`.
+
+    Args:
+        photo (Photo): The photo, ideally loaded with PostQuerySet.with_photos() so renditions are prefetched.
+        size (str): The rendition size the photo is displayed at, used for the `sizes` attribute.
+        width (Optional[int]): The width attribute of the image.
+        height (Optional[int]): The height attribute of the image.
+        alt (str): The alternative text.
+    """
+    longest_side = rendition_sizes[size]
+    return {
+        'sources': photo_srcsets(photo),
+        'sizes': f'{width}px' if width else f'(max-width: {longest_side}px) 100vw, {longest_side}px',
+        'src': photo.image.url if photo.image else '',
+        'width': width,
+        'height': height,
+        'alt': alt,
+    }
@@ -0,0 +1,252 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from main_app import profiles
+from main_app.constants import api_batch_limit
+from main_app.models import (Comment, CustomUser, FeedEntry, Follow, Photo,
+                             PhotoRendition, Post, Tag)
+from main_app.repositories import (FeedRepository, LikeRepository,
+                                   SubscribeRepository)
+
+
+class SetReactionsTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='user', email='user@example.com', password='password')
+        self.author = CustomUser.objects.create_user(username='author', email='author@example.com',
+                                                     password='password')
+        self.posts = [Post.objects.create(author=self.author, name=f'Post {i}', summary='Sea') for i in range(3)]
+
+    def test_reactions_are_set_idempotently(self):
+        first, second, third = self.posts
+        second.dislikes.add(self.user)
+        Post.objects.filter(pk=second.pk).update(dislikes_count=1)
+
+        reactions = {first.pk: 'like', second.pk: 'like', third.pk: None}
+        counts = LikeRepository.set_reactions(self.user, reactions)
+        self.assertEqual(LikeRepository.set_reactions(self.user, reactions), counts)
+
+        self.assertEqual(counts, {first.pk: (1, 0), second.pk: (1, 0), third.pk: (0, 0)})
+        self.assertEqual(set(self.user.likes.values_list('pk', flat=True)), {first.pk, second.pk})
+        self.assertFalse(self.user.dislikes.exists())
+        self.assertFalse(LikeRepository.get_drifted_counts().exists())
+
+    def test_number_of_queries_does_not_grow_with_the_batch(self):
+        posts = self.posts + [Post.objects.create(author=self.author, name=f'More {i}', summary='Sea')
+                              for i in range(20)]
+        self.posts[0].dislikes.add(self.user)
+
+        # lock, current likes and dislikes, delete dislikes, insert likes, counters, read, and the savepoint
+        with self.assertNumQueries(9):
+            LikeRepository.set_reactions(self.user, {post.pk: 'like' for post in posts})
+
+    def test_unpublished_posts_of_others_are_left_alone(self):
+        draft = Post.objects.create(author=self.author, name='Draft', summary='Sea', is_published=False)
+
+        self.assertEqual(LikeRepository.set_reactions(self.user, {draft.pk: 'like', 0: 'like'}), {})
+        self.assertEqual(LikeRepository.set_reactions(self.author, {draft.pk: 'like'}), {draft.pk: (1, 0)})
+
+
+class SetFollowsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='user', email='user@example.com', password='password')
+        self.authors = [CustomUser.objects.create_user(username=f'author{i}', email=f'author{i}@example.com',
+                                                       password='password') for i in range(3)]
+        for author in self.authors:
+            Post.objects.create(author=author, name=f'Post of {author}', summary='Sea')
+
+    def test_follows_are_set_idempotently(self):
+        first, second, third = self.authors
+        SubscribeRepository.update_subscribe(self.user, second)
+
+        follows = {first.pk: True, second.pk: False, third.pk: True, self.user.pk: True}
+        following = SubscribeRepository.set_follows(self.user, follows)
+        self.assertEqual(SubscribeRepository.set_follows(self.user, follows), following)
+
+        self.assertEqual(following, {first.pk: True, second.pk: False, third.pk: True})
+        self.assertEqual(set(SubscribeRepository.get_following(self.user)), {first, third})
+        self.assertEqual(set(FeedEntry.objects.filter(owner=self.user).values_list('post__author', flat=True)),
+                         {first.pk, third.pk})
+
+    def test_profiles_are_invalidated(self):
+        profiles.get_profiles([self.user.pk, self.authors[0].pk])
+
+        SubscribeRepository.set_follows(self.user, {self.authors[0].pk: True})
+        self.assertEqual(profiles.get_profile(self.authors[0].pk).followers_count, 1)
+        self.assertEqual(profiles.get_profile(self.user.pk).following_count, 1)
+
+        SubscribeRepository.set_follows(self.user, {self.authors[0].pk: False})
+        self.assertEqual(profiles.get_profile(self.authors[0].pk).followers_count, 0)
+
+
+class ApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='user', email='user@example.com', password='password')
+        self.author = CustomUser.objects.create_user(username='author', email='author@example.com',
+                                                     password='password')
+        self.post = Post.objects.create(author=self.author, name='Holidays', summary='Sea')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_is_obtained_with_the_email(self):
+        response = APIClient().post(reverse('v1:token'), {'username': 'user@example.com', 'password': 'password'},
+                                    format='json')
+
+        self.assertEqual(response.json(), {'token': self.token.key})
+
+    def test_authentication_is_required(self):
+        response = APIClient().put(reverse('v1:reactions'), {'reactions': [{'post': self.post.pk, 'reaction': 'like'}]},
+                                   format='json')
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_put_reactions(self):
+        data = {'reactions': [{'post': self.post.pk, 'reaction': 'dislike'}]}
+
+        for _ in range(2):
+            response = self.client.put(reverse('v1:reactions'), data, format='json')
+            self.assertEqual(response.json(), {'reactions': [{'post': self.post.pk, 'reaction': 'dislike',
+                                                              'likes_count': 0, 'dislikes_count': 1}]})
+
+    def test_put_reactions_with_an_unknown_post_changes_nothing(self):
+        data = {'reactions': [{'post': self.post.pk, 'reaction': 'like'}, {'post': 999, 'reaction': 'like'}]}
+
+        response = self.client.put(reverse('v1:reactions'), data, format='json')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(self.user.likes.exists())
+
+    def test_put_reactions_validates_the_batch(self):
+        duplicate = {'reactions': [{'post': self.post.pk, 'reaction': 'like'}] * 2}
+        too_large = {'reactions': [{'post': pk, 'reaction': 'like'} for pk in range(1, api_batch_limit + 2)]}
+        wrong = {'reactions': [{'post': self.post.pk, 'reaction': 'love'}]}
+
+        for data in (duplicate, too_large, wrong, {'reactions': []}):
+            self.assertEqual(self.client.put(reverse('v1:reactions'), data, format='json').status_code, 400)
+
+    def test_put_follows(self):
+        data = {'follows': [{'user': self.author.pk, 'following': True}]}
+
+        response = self.client.put(reverse('v1:follows'), data, format='json')
+
+        self.assertEqual(response.json(), {'follows': [{'user': self.author.pk, 'following': True}]})
+        self.assertTrue(Follow.objects.filter(follower=self.user, followee=self.author).exists())
+        self.assertEqual(self.client.put(reverse('v1:follows'), {'follows': [{'user': 0, 'following': True}]},
+                                         format='json').status_code, 400)
+        self.assertEqual(self.client.put(reverse('v1:follows'), {'follows': [{'user': 999, 'following': True}]},
+                                         format='json').status_code, 404)
+
+    def test_cannot_follow_oneself(self):
+        data = {'follows': [{'user': self.user.pk, 'following': True}]}
+
+        self.assertEqual(self.client.put(reverse('v1:follows'), data, format='json').status_code, 400)
+
+    def test_session_authentication_needs_csrf(self):
+        client = APIClient(enforce_csrf_checks=True)
+        client.force_login(self.user)
+
+        response = client.put(reverse('v1:follows'), {'follows': [{'user': self.author.pk, 'following': True}]},
+                              format='json')
+
+        self.assertEqual(response.status_code, 403)
+
+
+class ReadApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='user', email='user@example.com', password='password')
+        self.author = CustomUser.objects.create_user(username='author', email='author@example.com',
+                                                     password='password', bio='Photographer')
+        self.posts = [Post.objects.create(author=self.author, name=f'Post {i}', summary='Sea') for i in range(3)]
+        self.post = self.posts[-1]
+        self.post.tag.add(Tag.objects.create(tag='#sea'))
+        photo = Photo.objects.create(post=self.post, image='photos/test.jpg')
+        PhotoRendition.objects.create(photo=photo, size='feed', format='webp', image='renditions/test.webp',
+                                      width=600, height=400)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+
+    def test_posts_are_paginated_by_cursor(self):
+        first = self.client.get(reverse('v1:posts'), {'page_size': 2}).json()
+        second = self.client.get(first['next']).json()
+
+        self.assertEqual([post['name'] for post in first['results']], ['Post 2', 'Post 1'])
+        self.assertEqual([post['name'] for post in second['results']], ['Post 0'])
+        self.assertIsNone(second['next'])
+        self.assertEqual(self.client.get(reverse('v1:posts'), {'cursor': 'broken'}).status_code, 404)
+
+    def test_post_embeds_photos_and_links(self):
+        post = self.client.get(reverse('v1:post', args=[self.post.pk])).json()
+
+        self.assertEqual(post['tags'], ['#sea'])
+        self.assertEqual(post['author']['url'], f'http://testserver/api/v1/users/{self.author.pk}/')
+        self.assertEqual(post['comments_url'], f'http://testserver/api/v1/posts/{self.post.pk}/comments/')
+        self.assertTrue(post['photos'][0]['url'].startswith('http://testserver/'))
+        self.assertEqual(len(post['photos'][0]['renditions']), 1)
+        self.assertEqual({key: value for key, value in post['photos'][0]['renditions'][0].items() if key != 'url'},
+                         {'size': 'feed', 'format': 'webp', 'width': 600, 'height': 400})
+
+    def test_fields_narrow_the_objects_and_the_queries(self):
+        # The token, and the posts without their author, tags and photos
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('v1:posts'), {'fields': 'id,name'})
+
+        self.assertEqual(response.json()['results'][0], {'id': self.post.pk, 'name': 'Post 2'})
+        self.assertEqual(self.client.get(reverse('v1:posts'), {'fields': 'id,secret'}).status_code, 400)
+
+    def test_etag(self):
+        response = self.client.get(reverse('v1:post', args=[self.post.pk]))
+
+        not_modified = self.client.get(reverse('v1:post', args=[self.post.pk]), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+        Post.objects.filter(pk=self.post.pk).update(likes_count=1)
+        changed = self.client.get(reverse('v1:post', args=[self.post.pk]), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertIn('private', changed['Cache-Control'])
+
+    def test_unpublished_post_is_only_shown_to_its_author(self):
+        draft = Post.objects.create(author=self.author, name='Draft', summary='Sea', is_published=False)
+
+        self.assertEqual(self.client.get(reverse('v1:post', args=[draft.pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('v1:post_comments', args=[draft.pk])).status_code, 404)
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self.client.get(reverse('v1:post', args=[draft.pk])).status_code, 200)
+        own_posts = self.client.get(reverse('v1:user_posts', args=[self.author.pk])).json()['results']
+        self.assertEqual(own_posts[0]['name'], 'Draft')
+
+    def test_feed(self):
+        Follow.objects.create(follower=self.user, followee=self.author)
+        FeedRepository.rebuild_feed(self.user)
+
+        feed = self.client.get(reverse('v1:feed'), {'page_size': 2, 'fields': 'name'}).json()
+
+        self.assertEqual(feed['results'], [{'name': 'Post 2'}, {'name': 'Post 1'}])
+        self.assertEqual(self.client.get(feed['next']).json()['results'], [{'name': 'Post 0'}])
+
+    def test_comments_and_replies(self):
+        comment = Comment.objects.create(post=self.post, author=self.user, text='Nice')
+        Comment.objects.create(post=self.post, author=self.author, text='Thanks', parent=comment)
+
+        comments = self.client.get(reverse('v1:post_comments', args=[self.post.pk])).json()['results']
+        replies = self.client.get(reverse('v1:post_comments', args=[self.post.pk]), {'parent': comment.pk}).json()
+
+        self.assertEqual([(item['text'], item['replies_count'], item['author']['username']) for item in comments],
+                         [('Nice', 1, 'user')])
+        self.assertEqual([item['text'] for item in replies['results']], ['Thanks'])
+
+    def test_user(self):
+        SubscribeRepository.update_subscribe(self.user, self.author)
+
+        profile = self.client.get(reverse('v1:user', args=[self.author.pk])).json()
+
+        self.assertEqual((profile['username'], profile['bio'], profile['followers_count']),
+                         ('author', 'Photographer', 1))
+        self.assertEqual(profile['posts_url'], f'http://testserver/api/v1/users/{self.author.pk}/posts/')
+        self.assertEqual(self.client.get(reverse('v1:user', args=[0])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('v1:user_posts', args=[0])).status_code, 404)
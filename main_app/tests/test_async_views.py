@@ -0,0 +1,106 @@
+import asyncio
+
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import include, path, reverse
+
+from djangogramm import urls as project_urls
+from main_app.models import Comment, CustomUser, Follow, Post
+from main_app.repositories import FeedRepository
+from main_app.urls import get_urlpatterns
+
+# The project urls with the async views, as served under ASGI
+urlpatterns = [path('main_app/', include(get_urlpatterns(async_views_enabled=True)))] + project_urls.urlpatterns
+
+
+class AsyncUrlsTest(TestCase):
+    def test_hot_views_are_async(self):
+        callbacks = {pattern.name: pattern.callback for pattern in get_urlpatterns(async_views_enabled=True)}
+
+        for name in ('index', 'last_news', 'post_detail', 'search_view', 'like-dislike', 'subscribe'):
+            self.assertTrue(asyncio.iscoroutinefunction(callbacks[name]), name)
+        self.assertFalse(asyncio.iscoroutinefunction(callbacks['self_profile']))
+
+
+@override_settings(ROOT_URLCONF='main_app.tests.test_async_views')
+class AsyncViewsTest(TestCase):
+    def setUp(self):
+        for backend in caches.all():
+            backend.clear()
+        self.user = CustomUser.objects.create_user(username='user', email='user@example.com', password='password')
+        self.author = CustomUser.objects.create_user(username='author', email='author@example.com',
+                                                     password='password')
+        self.post = Post.objects.create(author=self.author, name='Holidays', summary='Sea')
+        self.draft = Post.objects.create(author=self.author, name='Draft', summary='Sea', is_published=False)
+
+    def login(self):
+        self.async_client.force_login(self.user)
+
+    async def test_index_is_cached_for_anonymous_visitors(self):
+        response = await self.async_client.get(reverse('index'))
+
+        self.assertContains(response, 'Holidays')
+        not_modified = await self.async_client.get(reverse('index'), headers={'If-None-Match': response['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_index_shows_the_feed(self):
+        Follow.objects.create(follower=self.user, followee=self.author)
+        FeedRepository.rebuild_feed(self.user)
+        self.login()
+
+        response = async_to_sync(self.async_client.get)(reverse('last_news'))
+
+        self.assertNotIn('ETag', response)
+        self.assertContains(response, 'published: <a', count=1)
+
+    async def test_search(self):
+        response = await self.async_client.get(reverse('search_view'), {'q': 'holidays', 'page': 'last'})
+
+        self.assertEqual([post.name for post in response.context['object_list']], ['Holidays'])
+        self.assertEqual((await self.async_client.get(reverse('search_view'), {'q': 'x', 'page': 3})).status_code,
+                         404)
+
+    async def test_post_detail_requires_login(self):
+        url = reverse('post_detail', args=[self.post.pk])
+
+        response = await self.async_client.get(url)
+
+        self.assertRedirects(response, reverse('login') + '?next=' + url, fetch_redirect_response=False)
+
+    def test_post_detail(self):
+        Comment.objects.create(post=self.post, author=self.user, text='Nice')
+        self.login()
+
+        response = async_to_sync(self.async_client.get)(reverse('post_detail', args=[self.post.pk]))
+        self.assertContains(response, 'Holidays')
+        self.assertContains(response, f'href="{reverse("someone_profile", args=[self.user.pk])}">user</a>')
+        self.assertContains(response, 'Comments (1)')
+
+        draft = async_to_sync(self.async_client.get)(reverse('post_detail', args=[self.draft.pk]))
+        self.assertEqual(draft.status_code, 404)
+
+    def test_like_dislike(self):
+        self.login()
+        url = reverse('like-dislike', args=[self.post.pk])
+
+        liked = async_to_sync(self.async_client.post)(url, {'is_like': 'true'})
+        disliked = async_to_sync(self.async_client.post)(url, {'is_like': 'false'})
+
+        self.assertEqual(liked.json(), {'likes_count': 1, 'dislikes_count': 0})
+        self.assertEqual(disliked.json(), {'likes_count': 0, 'dislikes_count': 1})
+        self.assertEqual(async_to_sync(self.async_client.get)(url).status_code, 405)
+
+        for pk in (self.draft.pk, 0):
+            response = async_to_sync(self.async_client.post)(reverse('like-dislike', args=[pk]), {'is_like': 'true'})
+            self.assertEqual(response.status_code, 404)
+        self.assertFalse(self.draft.likes.exists())
+
+    def test_subscribe(self):
+        self.login()
+        url = reverse('subscribe', args=[self.author.pk])
+
+        self.assertEqual(async_to_sync(self.async_client.post)(url).json(), {'is_subscribed': True})
+        self.assertTrue(Follow.objects.filter(follower=self.user, followee=self.author).exists())
+        self.assertEqual(async_to_sync(self.async_client.post)(url).json(), {'is_subscribed': False})
+        self.assertEqual(async_to_sync(self.async_client.post)(reverse('subscribe', args=[0])).status_code, 404)
@@ -0,0 +1,41 @@
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from main_app import urls as main_app_urls
+from main_app.benchmarks import (CONNECTION_MODES, ROUTES, USER_KINDS,
+                                 benchmark_connections, benchmark_routes,
+                                 check_budgets, isolated_media, load_budgets,
+                                 seed_data)
+
+
+class BenchmarkBudgetsTest(TestCase):
+    def test_every_route_has_a_spec_and_budgets(self):
+        budgets = load_budgets()
+        for pattern in main_app_urls.urlpatterns:
+            self.assertIn(pattern.name, ROUTES)
+            for kind in USER_KINDS:
+                self.assertIn(kind, budgets.get(pattern.name, {}))
+
+    def test_query_counts_within_budgets(self):
+        with isolated_media():
+            data = seed_data(posts=20)
+            results = benchmark_routes(data, iterations=1)
+
+        # Latency and memory depend on the machine; the benchmark command checks them
+        budgets = {route: {kind: {'queries': budget['queries']} for kind, budget in kinds.items()}
+                   for route, kinds in load_budgets().items()}
+        self.assertEqual(check_budgets(results, budgets), [])
+
+
+class BenchmarkConnectionsTest(TransactionTestCase):
+    def test_connection_modes_are_measured(self):
+        conn_max_age = connection.settings_dict['CONN_MAX_AGE']
+        with isolated_media():
+            data = seed_data(posts=5)
+            results = benchmark_connections(data, concurrency=(1, 2), requests=4, connects=2)
+
+        self.assertEqual(set(results['connect']), {'p50_ms', 'p95_ms'})
+        self.assertEqual(set(results['requests']), set(CONNECTION_MODES))
+        self.assertEqual(set(results['requests']['persistent']), {1, 2})
+        self.assertGreater(results['requests']['per request'][2]['requests_per_s'], 0)
+        self.assertEqual(connection.settings_dict['CONN_MAX_AGE'], conn_max_age)
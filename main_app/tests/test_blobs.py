@@ -0,0 +1,128 @@
+import os
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+
+from main_app import blobs, uploads
+from main_app.benchmarks import isolated_media
+from main_app.models import Blob, CustomUser, Photo, PhotoRendition, Post
+from main_app.tests.test_uploads import jpeg, png
+
+
+class ContentAddressedPhotoTest(TestCase):
+    def setUp(self):
+        media = isolated_media()
+        self.media_root = media.__enter__()
+        self.addCleanup(media.__exit__, None, None, None)
+        self.author = CustomUser.objects.create_user(username='author', email='author@example.com',
+                                                     password='password')
+
+    def create_post(self, *files):
+        post = Post.objects.create(author=self.author, name='Holidays', summary='Sea', is_published=False)
+        uploads.process_post_photos({'post_id': post.pk, 'photos': uploads.stage_photos(files)})
+        return post
+
+    def stored_files(self, folder):
+        path = os.path.join(self.media_root, 'media', folder)
+        return sorted(name for _, _, names in os.walk(path) for name in names)
+
+    def test_same_bytes_are_stored_once(self):
+        first = self.create_post(SimpleUploadedFile('photo.jpg', jpeg()))
+        second = self.create_post(SimpleUploadedFile('copy.JPEG', jpeg()), SimpleUploadedFile('other.png', png()))
+
+        first_photo = first.photo_set.get()
+        copy = second.photo_set.get(image=first_photo.image.name)
+        self.assertEqual(len(self.stored_files('photos')), 2)
+        self.assertEqual(Blob.objects.get(name=first_photo.image.name).ref_count, 2)
+        self.assertEqual(sorted(copy.renditions.values_list('image', flat=True)),
+                         sorted(first_photo.renditions.values_list('image', flat=True)))
+        self.assertEqual(len(self.stored_files('renditions')), 2 * first_photo.renditions.count())
+
+    def test_file_is_deleted_with_its_last_photo(self):
+        first = self.create_post(SimpleUploadedFile('photo.jpg', jpeg()))
+        second = self.create_post(SimpleUploadedFile('photo.jpg', jpeg()))
+        name = first.photo_set.get().image.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(Blob.objects.get(name=name).ref_count, 1)
+        self.assertEqual(len(self.stored_files('photos')), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(Blob.objects.exists())
+        self.assertEqual(self.stored_files('photos'), [])
+        self.assertEqual(self.stored_files('renditions'), [])
+
+    def test_same_bytes_with_another_extension_share_the_file(self):
+        first = self.create_post(SimpleUploadedFile('photo.jpg', jpeg()))
+        second = self.create_post(SimpleUploadedFile('photo.png', jpeg()))
+        name = second.photo_set.get().image.name
+
+        self.assertEqual(name, first.photo_set.get().image.name)
+        self.assertTrue(name.endswith('.jpg'))
+        self.assertEqual(Blob.objects.get(name=name).ref_count, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        renditions = second.photo_set.get().renditions.all()
+        self.assertTrue(renditions)
+        self.assertTrue(all(rendition.image.storage.exists(rendition.image.name) for rendition in renditions))
+
+    def test_photo_saved_with_a_file_is_content_addressed(self):
+        post = Post.objects.create(author=self.author, name='Holidays', summary='Sea')
+
+        first = Photo.objects.create(post=post, image=SimpleUploadedFile('photo.png', png()))
+        second = Photo.objects.create(post=post, image=SimpleUploadedFile('again.png', png()))
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.endswith('.png'))
+        self.assertEqual(Blob.objects.get().ref_count, 2)
+        self.assertEqual(len(self.stored_files('photos')), 1)
+        self.assertEqual(PhotoRendition.objects.filter(photo=second).count(), first.renditions.count())
+
+    def upload_while_releasing(self, before_counted):
+        first = self.create_post(SimpleUploadedFile('photo.jpg', jpeg()))
+        with self.captureOnCommitCallbacks() as callbacks:
+            first.delete()
+        add_references = blobs.add_references
+
+        def delete_released_files():
+            for callback in callbacks:
+                callback()
+
+        def count_while_deleting(references):
+            # The files of the deleted photo are deleted while the same bytes are uploaded
+            if before_counted:
+                delete_released_files()
+            add_references(references)
+            if not before_counted:
+                delete_released_files()
+
+        with mock.patch('main_app.blobs.add_references', side_effect=count_while_deleting):
+            second = self.create_post(SimpleUploadedFile('photo.jpg', jpeg()))
+
+        photo = second.photo_set.get()
+        self.assertEqual(Blob.objects.get(name=photo.image.name).ref_count, 1)
+        self.assertTrue(default_storage.exists(photo.image.name))
+        self.assertTrue(photo.renditions.exists())
+        self.assertTrue(all(default_storage.exists(rendition.image.name) for rendition in photo.renditions.all()))
+
+    def test_file_released_before_an_upload_is_counted_is_written_again(self):
+        self.upload_while_releasing(before_counted=True)
+
+    def test_file_released_after_an_upload_is_counted_is_kept(self):
+        self.upload_while_releasing(before_counted=False)
+
+    def test_failed_upload_deletes_the_files_it_wrote(self):
+        self.create_post(SimpleUploadedFile('photo.jpg', jpeg()))
+        name = Photo.objects.get().image.name
+
+        with mock.patch.object(PhotoRendition.objects, 'bulk_create', side_effect=OSError):
+            with self.assertRaises(OSError):
+                self.create_post(SimpleUploadedFile('copy.jpg', jpeg()), SimpleUploadedFile('other.png', png()))
+
+        self.assertEqual(self.stored_files('photos'), [os.path.basename(name)])
+        self.assertEqual(Blob.objects.get().ref_count, 1)
@@ -0,0 +1,141 @@
+import io
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from main_app.constants import comments_per_page
+from main_app.models import Comment, CustomUser, Post
+from main_app.repositories import CommentRepository
+
+
+class CommentCountTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='user', email='user@example.com', password='password')
+        self.post = Post.objects.create(author=self.user, name='Holidays', summary='Sea')
+
+    def comments_count(self):
+        self.post.refresh_from_db(fields=['comments_count'])
+        return self.post.comments_count
+
+    def test_count_follows_comments_and_replies(self):
+        comment = CommentRepository.add_comment(self.user, self.post, {'text': 'Nice'})
+        CommentRepository.add_comment(self.user, self.post, {'text': 'Thanks', 'parent': comment})
+        self.assertEqual(self.comments_count(), 2)
+
+        # The reply goes with its comment
+        comment.delete()
+        self.assertEqual(self.comments_count(), 0)
+
+    def test_deleted_post_takes_its_comments(self):
+        Comment.objects.create(post=self.post, author=self.user, text='Nice')
+
+        self.post.delete()
+
+        self.assertFalse(Comment.objects.exists())
+
+    def test_reconcile_fixes_drifted_count(self):
+        Comment.objects.create(post=self.post, author=self.user, text='Nice')
+        Post.objects.filter(pk=self.post.pk).update(comments_count=5)
+
+        call_command('reconcile_reaction_counts', stdout=io.StringIO())
+
+        self.assertEqual(self.comments_count(), 1)
+
+
+class CommentThreadTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='user', email='user@example.com', password='password')
+        self.post = Post.objects.create(author=self.user, name='Holidays', summary='Sea')
+        self.client.login(username='user', password='password')
+
+    def add(self, text, parent=None, post=None):
+        data = {'text': text} if parent is None else {'text': text, 'parent': parent.pk}
+        return self.client.post(reverse('add_comment_to_post', args=[(post or self.post).pk]), data)
+
+    def test_reply_to_a_reply_joins_the_thread(self):
+        self.add('Nice')
+        comment = Comment.objects.get()
+        self.add('Thanks', parent=comment)
+        self.add('Welcome', parent=Comment.objects.get(text='Thanks'))
+
+        self.assertEqual(Comment.objects.get(text='Welcome').parent, comment)
+        self.assertEqual(comment.replies.count(), 2)
+
+    def test_reply_to_another_post_is_rejected(self):
+        other = Post.objects.create(author=self.user, name='Mountains', summary='Snow')
+        comment = Comment.objects.create(post=other, author=self.user, text='Nice')
+
+        response = self.add('Thanks', parent=comment)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_unpublished_post_of_another_user_cannot_be_commented(self):
+        author = CustomUser.objects.create_user(username='author', email='author@example.com', password='password')
+        draft = Post.objects.create(author=author, name='Draft', summary='Sea', is_published=False)
+
+        self.assertEqual(self.add('Nice', post=draft).status_code, 404)
+        self.assertEqual(self.client.get(reverse('add_comment_to_post', args=[draft.pk])).status_code, 404)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_detail_shows_the_first_page_of_comments(self):
+        for number in range(comments_per_page + 1):
+            Comment.objects.create(post=self.post, author=self.user, text=f'Comment {number}')
+        first = Comment.objects.get(text='Comment 0')
+        Comment.objects.create(post=self.post, author=self.user, text='A reply', parent=first)
+
+        response = self.client.get(reverse('post_detail', args=[self.post.pk]))
+
+        self.assertEqual(len(response.context['comments']), comments_per_page)
+        self.assertContains(response, f'Comments ({comments_per_page + 2})')
+        self.assertContains(response, 'More comments')
+        self.assertNotContains(response, 'Comment 0<')
+        self.assertNotContains(response, 'A reply<')
+
+        next_page = self.client.get(reverse('post_detail', args=[self.post.pk]),
+                                    {'comments_cursor': response.context['comments_page'].next_cursor})
+        self.assertContains(next_page, 'Comment 0<')
+        self.assertContains(next_page, 'Replies (1)')
+
+
+class CommentListViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='user', email='user@example.com', password='password')
+        self.post = Post.objects.create(author=self.user, name='Holidays', summary='Sea')
+        self.client.login(username='user', password='password')
+        self.url = reverse('post_comments', args=[self.post.pk])
+
+    def test_pages_of_comments(self):
+        for number in range(comments_per_page + 1):
+            Comment.objects.create(post=self.post, author=self.user, text=f'Comment {number}')
+
+        first = self.client.get(self.url).json()
+        second = self.client.get(self.url, {'cursor': first['next_cursor']}).json()
+
+        self.assertEqual(len(first['comments']), comments_per_page)
+        self.assertEqual(first['comments'][0]['author']['username'], 'user')
+        self.assertEqual([comment['text'] for comment in second['comments']], ['Comment 0'])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_replies_of_a_comment(self):
+        comment = Comment.objects.create(post=self.post, author=self.user, text='Nice')
+        Comment.objects.create(post=self.post, author=None, text='Thanks', parent=comment)
+
+        top = self.client.get(self.url).json()['comments']
+        replies = self.client.get(self.url, {'parent': comment.pk}).json()['comments']
+
+        self.assertEqual([(item['text'], item['replies_count']) for item in top], [('Nice', 1)])
+        self.assertEqual([(item['text'], item['parent'], item['author']) for item in replies],
+                         [('Thanks', comment.pk, None)])
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(self.url, {'parent': 'x'}).status_code, 404)
+        self.assertEqual(self.client.get(self.url, {'cursor': 'x'}).status_code, 404)
+
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='password')
+        unpublished = Post.objects.create(author=other, name='Draft', summary='', is_published=False)
+        self.assertEqual(self.client.get(reverse('post_comments', args=[unpublished.pk])).status_code, 404)
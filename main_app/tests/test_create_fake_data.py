@@ -0,0 +1,50 @@
+import contextlib
+import io
+
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import TestCase
+
+from main_app import create_fake_data
+from main_app.benchmarks import isolated_media
+from main_app.models import (Blob, Comment, CustomUser, FeedEntry, Follow,
+                             Photo, Post, Tag)
+from main_app.repositories import CommentRepository, LikeRepository
+
+
+class GenerateFakeDataTest(TestCase):
+    def generate(self, **options):
+        with isolated_media(), contextlib.redirect_stdout(io.StringIO()):
+            create_fake_data.generate(users=12, tags=6, posts=30, follows_per_user=3, **options)
+
+    def test_generate(self):
+        self.generate()
+
+        self.assertEqual(CustomUser.objects.count(), 12)
+        self.assertEqual(Tag.objects.count(), 6)
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Follow.objects.count(), 36)
+        self.assertFalse(Follow.objects.filter(follower=F('followee')).exists())
+        self.assertTrue(Comment.objects.exists())
+        # Every fake photo file is stored once and counted for each of its photos
+        self.assertEqual(Blob.objects.count(), Photo.objects.values('image').distinct().count())
+        self.assertEqual(sum(Blob.objects.values_list('ref_count', flat=True)), Photo.objects.count())
+        self.assertTrue(FeedEntry.objects.exists())
+        self.assertFalse(LikeRepository.get_drifted_counts().exists())
+        self.assertFalse(CommentRepository.get_drifted_counts().exists())
+        self.assertTrue(CustomUser.objects.first().check_password(create_fake_data.FAKE_PASSWORD))
+
+    def test_same_seed_same_data(self):
+        self.generate(seed=3)
+        first = list(Post.objects.order_by('pk').values_list('name', 'summary'))
+        Post.objects.all().delete()
+        CustomUser.objects.all().delete()
+        Tag.objects.all().delete()
+
+        self.generate(seed=3)
+        self.assertEqual(list(Post.objects.order_by('pk').values_list('name', 'summary')), first)
+
+    def test_every_post_has_a_photo(self):
+        with self.assertRaisesMessage(CommandError, '--max-photos must be at least 1.'):
+            call_command('create_fake_data', max_photos=0)
+        self.assertFalse(CustomUser.objects.exists())
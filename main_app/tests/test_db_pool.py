@@ -0,0 +1,133 @@
+import threading
+from unittest import mock
+
+from django.db import connection
+from django.db.backends.postgresql import base as postgresql_base
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from psycopg2.extensions import (TRANSACTION_STATUS_IDLE,
+                                 TRANSACTION_STATUS_INTRANS)
+
+from djangogramm.pooled_postgresql import pool as pool_module
+from djangogramm.pooled_postgresql.base import DatabaseWrapper
+from djangogramm.pooled_postgresql.pool import ConnectionPool, PoolTimeout
+from main_app.models import CustomUser
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.status = TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    def test_connections_are_reused(self):
+        pool = ConnectionPool('test', max_size=2)
+
+        first = pool.getconn(FakeConnection)
+        pool.putconn(first)
+
+        self.assertIs(pool.getconn(FakeConnection), first)
+        self.assertEqual(pool.stats()['connections_opened'], 1)
+        self.assertEqual(pool.stats()['checkouts'], 2)
+        self.assertEqual(pool.stats()['in_use'], 1)
+
+    def test_open_transaction_is_rolled_back(self):
+        pool = ConnectionPool('test')
+        connection = pool.getconn(FakeConnection)
+        connection.status = TRANSACTION_STATUS_INTRANS
+
+        pool.putconn(connection)
+
+        self.assertEqual(connection.rollbacks, 1)
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    def test_closed_discarded_and_old_connections_are_replaced(self):
+        pool = ConnectionPool('test', max_lifetime=60)
+        closed, discarded, old = [pool.getconn(FakeConnection) for _ in range(3)]
+        pool.putconn(discarded, discard=True)
+        closed.close()
+        pool.putconn(closed)
+
+        with mock.patch('time.monotonic', return_value=10 ** 9):
+            pool.putconn(old)
+
+        self.assertTrue(discarded.closed and old.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+        self.assertEqual(pool.stats()['connections_closed'], 3)
+
+    def test_full_pool_waits_then_times_out(self):
+        pool = ConnectionPool('test', max_size=1, timeout=5)
+        connection = pool.getconn(FakeConnection)
+        threading.Timer(0.05, pool.putconn, [connection]).start()
+
+        self.assertIs(pool.getconn(FakeConnection), connection)
+        self.assertEqual(pool.stats()['waits'], 1)
+
+        pool.timeout = 0.01
+        with self.assertRaises(PoolTimeout):
+            pool.getconn(FakeConnection)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_failed_connect_frees_its_slot(self):
+        pool = ConnectionPool('test', max_size=1)
+
+        with self.assertRaises(OSError):
+            pool.getconn(mock.Mock(side_effect=OSError))
+        self.assertIsNotNone(pool.getconn(FakeConnection))
+
+
+class PooledDatabaseWrapperTest(SimpleTestCase):
+    def setUp(self):
+        self.settings_dict = {**connection.settings_dict, 'ENGINE': 'djangogramm.pooled_postgresql',
+                              'NAME': 'djangogramm', 'USER': 'user', 'PASSWORD': '', 'HOST': 'db', 'PORT': '5432',
+                              'OPTIONS': {'pool': {'max_size': 3}}}
+        patcher = mock.patch.dict(pool_module._pools, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pool_options_are_not_connection_params(self):
+        params = DatabaseWrapper(self.settings_dict, alias='pooled').get_connection_params()
+
+        self.assertNotIn('pool', params)
+        self.assertEqual(params['dbname'], 'djangogramm')
+
+    def test_threads_share_the_connections_of_the_pool(self):
+        first = DatabaseWrapper(self.settings_dict, alias='pooled')
+        second = DatabaseWrapper(self.settings_dict, alias='pooled')
+        with mock.patch.object(postgresql_base.DatabaseWrapper, 'get_new_connection',
+                               side_effect=lambda params: FakeConnection()) as connect:
+            opened = first.get_new_connection(first.get_connection_params())
+            first.connection = opened
+            first._close()
+            reused = second.get_new_connection(second.get_connection_params())
+
+        self.assertIs(reused, opened)
+        self.assertEqual(connect.call_count, 1)
+        self.assertEqual(first.pool.stats()['max_size'], 3)
+        self.assertEqual(list(pool_module.pool_stats()), ['pooled:djangogramm'])
+
+
+class PoolMetricsViewTest(TestCase):
+    def test_metrics_are_for_staff(self):
+        url = reverse('db_pool_metrics')
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        staff = CustomUser.objects.create_user(username='staff', email='staff@example.com', password='password',
+                                               is_staff=True)
+        self.client.force_login(staff)
+        with mock.patch.dict(pool_module._pools, {('default',): ConnectionPool('default:djangogramm')}, clear=True):
+            response = self.client.get(url)
+
+        self.assertEqual(response.json()['pools']['default:djangogramm']['size'], 0)
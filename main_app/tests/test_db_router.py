@@ -0,0 +1,204 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from djangogramm.db_router import (STICKY_COOKIE, PrimaryReplicaRouter,
+                                   ReplicaStickinessMiddleware, replica_reads)
+from main_app import profiles
+from main_app.models import CustomUser, Follow, Post
+from main_app.repositories import (FeedRepository, LikeRepository,
+                                   PostRepository, SearchRepository)
+
+
+def read_database(request):
+    return HttpResponse(PostRepository.get_all_posts().db)
+
+
+def write_then_read_database(request):
+    PrimaryReplicaRouter.db_for_write(Post)
+    return read_database(request)
+
+
+# SimpleTestCase does not wrap the tests in a transaction, which would send every read to the primary
+@override_settings(DATABASE_REPLICAS=['replica'])
+class PrimaryReplicaRouterTest(SimpleTestCase):
+    def test_reads_outside_requests_go_to_the_primary(self):
+        self.assertEqual(PostRepository.get_all_posts().db, 'default')
+
+    def test_reads_of_requests_go_to_a_replica(self):
+        user = CustomUser(pk=1)
+        with replica_reads():
+            self.assertEqual(PostRepository.get_all_posts().db, 'replica')
+            self.assertEqual(FeedRepository.get_feed_entries(user).db, 'replica')
+            self.assertEqual(SearchRepository.search_posts('sea').db, 'replica')
+
+    def test_reads_after_a_write_go_to_the_primary(self):
+        with replica_reads():
+            self.assertEqual(PrimaryReplicaRouter.db_for_write(Post), 'default')
+            self.assertEqual(PostRepository.get_all_posts().db, 'default')
+
+        with replica_reads(pinned=True):
+            self.assertEqual(PostRepository.get_all_posts().db, 'default')
+
+    @override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+    def test_a_request_reads_from_one_replica(self):
+        with replica_reads(), mock.patch('random.choice', return_value='replica2') as choose_replica:
+            databases = {PostRepository.get_all_posts().db, SearchRepository.search_posts('sea').db,
+                         FeedRepository.get_feed_entries(CustomUser(pk=1)).db}
+        self.assertEqual(databases, {'replica2'})
+        choose_replica.assert_called_once()
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_reads_go_to_the_primary_without_replicas(self):
+        with replica_reads():
+            self.assertEqual(PostRepository.get_all_posts().db, 'default')
+
+    def test_replicas_are_not_migrated(self):
+        self.assertIs(PrimaryReplicaRouter.allow_migrate('replica', 'main_app'), False)
+        self.assertIsNone(PrimaryReplicaRouter.allow_migrate('default', 'main_app'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_STICKY_SECONDS=5)
+class ReplicaStickinessMiddlewareTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_client_who_wrote_reads_from_the_primary(self):
+        response = ReplicaStickinessMiddleware(write_then_read_database)(self.factory.get('/'))
+        self.assertEqual(response.content, b'default')
+        self.assertEqual(response.cookies[STICKY_COOKIE]['max-age'], 5)
+
+        response = ReplicaStickinessMiddleware(read_database)(self.factory.get('/', HTTP_COOKIE=f'{STICKY_COOKIE}=1'))
+        self.assertEqual(response.content, b'default')
+
+        response = ReplicaStickinessMiddleware(read_database)(self.factory.get('/'))
+        self.assertEqual(response.content, b'replica')
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_async_requests_are_routed(self):
+        async def write_then_read(request):
+            return write_then_read_database(request)
+
+        async def read(request):
+            return read_database(request)
+
+        response = async_to_sync(ReplicaStickinessMiddleware(read))(self.factory.get('/'))
+        self.assertEqual(response.content, b'replica')
+
+        response = async_to_sync(ReplicaStickinessMiddleware(write_then_read))(self.factory.get('/'))
+        self.assertEqual(response.content, b'default')
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+
+class ReadYourWritesTest(TransactionTestCase):
+    def setUp(self):
+        for backend in caches.all():
+            backend.clear()
+        self.user = CustomUser.objects.create_user(username='user', email='user@example.com', password='password')
+        self.post = Post.objects.create(author=self.user, name='Holidays', summary='Sea')
+        self.client.force_login(self.user)
+
+    def routed_to_replicas(self):
+        # The replica is the test database itself, whether a read went to a replica is told by the random choice
+        # of one; not for the whole class, whose tables would not be flushed then
+        return self.settings(DATABASE_REPLICAS=['default'])
+
+    def test_user_who_liked_reads_from_the_primary(self):
+        with self.routed_to_replicas(), mock.patch('random.choice', return_value='default') as choose_replica:
+            response = self.client.post(reverse('like-dislike', args=[self.post.pk]), {'is_like': 'true'})
+            self.assertIn(STICKY_COOKIE, response.cookies)
+            replica_reads_before_write = choose_replica.call_count
+
+            self.client.get(reverse('post_detail', args=[self.post.pk]))
+            self.assertEqual(choose_replica.call_count, replica_reads_before_write)
+
+            del self.client.cookies[STICKY_COOKIE]
+            self.client.get(reverse('post_detail', args=[self.post.pk]))
+            self.assertGreater(choose_replica.call_count, replica_reads_before_write)
+
+    def test_reads_in_a_transaction_go_to_the_primary(self):
+        with self.routed_to_replicas(), replica_reads():
+            with mock.patch('random.choice', return_value='default') as choose_replica, transaction.atomic():
+                self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+            choose_replica.assert_not_called()
+
+
+class TwoDatabasesTest(TransactionTestCase):
+    """
+    The replica is a second SQLite database, which lags behind the primary: the rows written during a test are
+    not copied to it.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_dir = tempfile.mkdtemp()
+        replica = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(cls.replica_dir, 'replica.sqlite3')}
+        connections.settings['replica'] = connections.configure_settings(
+            {'default': connections.settings['default'], 'replica': replica})['replica']
+        # Not a class attribute: the test runner checks the databases of the tests before the replica exists
+        cls.databases = {'default', 'replica'}
+        super().setUpClass()
+        # Migrated before it is a replica, which is not migrated
+        call_command('migrate', database='replica', verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        shutil.rmtree(cls.replica_dir)
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='user', email='user@example.com', password='password')
+        self.post = Post.objects.create(author=self.user, name='Holidays', summary='Sea')
+        # Replicated so far
+        CustomUser.objects.using('replica').create(pk=self.user.pk, username='user', email='user@example.com')
+        Post.objects.using('replica').create(pk=self.post.pk, author_id=self.user.pk, name='Holidays', summary='Sea')
+        self.factory = RequestFactory()
+
+    def request(self, view, sticky=False):
+        request = self.factory.get('/', **({'HTTP_COOKIE': f'{STICKY_COOKIE}=1'} if sticky else {}))
+        request.user = self.user
+        with self.settings(DATABASE_REPLICAS=['replica']):
+            return ReplicaStickinessMiddleware(view)(request)
+
+    def read_likes(self, request):
+        return HttpResponse(str(PostRepository.get_all_posts().get(pk=self.post.pk).likes_count))
+
+    def like_then_read_likes(self, request):
+        LikeRepository.toggle_like(request, self.post, is_like=True)
+        return self.read_likes(request)
+
+    def test_reads_go_to_the_replica_until_the_user_writes(self):
+        Post.objects.create(author=self.user, name='New', summary='Not replicated yet')
+        with self.settings(DATABASE_REPLICAS=['replica']), replica_reads():
+            self.assertQuerysetEqual(PostRepository.get_all_posts(), ['Holidays'], transform=str)
+
+        self.assertEqual(self.request(self.read_likes).content, b'0')
+
+        response = self.request(self.like_then_read_likes)
+        self.assertEqual(response.content, b'1')
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        self.assertEqual(Post.objects.using('replica').get().likes_count, 0)
+
+        self.assertEqual(self.request(self.read_likes, sticky=True).content, b'1')
+        self.assertEqual(self.request(self.read_likes).content, b'0')
+
+    def test_profiles_are_cached_from_the_primary(self):
+        cache.clear()
+        follower = CustomUser.objects.create_user(username='follower', email='follower@example.com')
+        Follow.objects.create(follower=follower, followee=self.user)
+
+        with self.settings(DATABASE_REPLICAS=['replica']), replica_reads():
+            self.assertEqual(profiles.get_profile(self.user.pk).followers_count, 1)
@@ -0,0 +1,22 @@
+from django.test import TestCase
+
+from main_app.benchmarks import isolated_media, seed_data
+from main_app.explain import QUERIES, explain, explain_queries, seq_scans
+from main_app.models import Post
+
+
+class ExplainQueriesTest(TestCase):
+    def test_repository_queries_are_served_by_indexes(self):
+        with isolated_media():
+            data = seed_data(posts=20)
+            results = explain_queries(data)
+
+        self.assertEqual(set(results), set(QUERIES))
+        scans = {name: statement['seq_scans'] for name, statements in results.items()
+                 for statement in statements if statement['seq_scans']}
+        self.assertEqual(scans, {})
+
+    def test_sequential_scan_is_reported(self):
+        sql, params = Post.objects.filter(summary='Sea').query.sql_with_params()
+
+        self.assertEqual(seq_scans(explain(sql, params)), ['main_app_post'])
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from main_app.fragments import POST_CARD_VERSION, post_card_key
+from main_app.models import CustomUser, Photo, Post
+from main_app.repositories import PostRepository
+
+
+class PostCardCacheTest(TestCase):
+    def setUp(self):
+        self.cache = caches[settings.FRAGMENT_CACHE_ALIAS]
+        self.cache.clear()
+        self.author = CustomUser.objects.create_user(username='author', email='author@example.com',
+                                                     password='password')
+        self.post = Post.objects.create(author=self.author, name='Holidays', summary='Sea')
+
+    def cached_card(self):
+        post = Post.objects.card_versions().get(pk=self.post.pk)
+        return self.cache.get(post_card_key(post, 'list'), version=POST_CARD_VERSION)
+
+    def count_index_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('index'))
+        self.assertContains(response, 'Holidays')
+        return len(queries)
+
+    def test_cached_card_skips_loading_the_posts(self):
+        cold = self.count_index_queries()
+        self.assertIn('Holidays', self.cached_card())
+
+        self.assertLess(self.count_index_queries(), cold)
+
+    def test_changed_post_gets_a_new_card(self):
+        self.client.get(reverse('index'))
+        self.post.name = 'Mountains'
+        self.post.save()
+
+        self.assertIsNone(self.cached_card())
+        self.assertContains(self.client.get(reverse('index')), 'Mountains')
+
+    def test_new_photo_invalidates_the_card(self):
+        self.client.get(reverse('index'))
+        Photo.objects.create(post=self.post, image='media/photos/test.jpg')
+
+        self.assertIsNone(self.cached_card())
+        self.assertContains(self.client.get(reverse('index')), 'media/photos/test.jpg')
+
+    def test_renamed_author_invalidates_the_cards(self):
+        self.client.get(reverse('index'))
+        self.client.login(username='author', password='password')
+        self.assertIsNotNone(self.cached_card())
+
+        self.author.username = 'renamed'
+        self.author.save()
+
+        self.assertIsNone(self.cached_card())
+        self.assertContains(self.client.get(reverse('index')), 'renamed')
+
+    def test_published_post_gets_a_new_card(self):
+        self.client.get(reverse('index'))
+        PostRepository.publish_post(self.post)
+
+        self.assertIsNone(self.cached_card())
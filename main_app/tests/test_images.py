@@ -0,0 +1,70 @@
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import TestCase
+from PIL import Image
+
+from main_app import images
+from main_app.benchmarks import isolated_media
+from main_app.models import CustomUser, Photo, PhotoRendition, Post
+
+
+def image_file(size=(800, 400), image_format='PNG', name='photo.png'):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, format=image_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{image_format.lower()}')
+
+
+class RenditionsTest(TestCase):
+    def setUp(self):
+        media = isolated_media()
+        media.__enter__()
+        self.addCleanup(media.__exit__, None, None, None)
+        user = CustomUser.objects.create(username='test_user', password='test_password')
+        self.post = Post.objects.create(name='Post', author=user)
+
+    def test_render_never_upscales(self):
+        renditions = images.render(image_file(size=(800, 400)))
+
+        sizes = {(rendition['size'], rendition['width'], rendition['height']) for rendition in renditions}
+        self.assertEqual(sizes, {('thumb', 150, 75), ('feed', 600, 300), ('full', 800, 400)})
+        self.assertEqual({rendition['format'] for rendition in renditions}, set(images.rendition_formats()))
+
+    def test_render_skips_sizes_larger_than_the_original(self):
+        renditions = images.render(image_file(size=(100, 50)))
+        self.assertEqual({rendition['size'] for rendition in renditions}, {'thumb'})
+
+    def test_saving_a_photo_creates_renditions(self):
+        photo = Photo.objects.create(post=self.post, image=image_file())
+
+        renditions = PhotoRendition.objects.filter(photo=photo, format='webp').order_by('width')
+        self.assertEqual([(rendition.size, rendition.width) for rendition in renditions],
+                         [('thumb', 150), ('feed', 600), ('full', 800)])
+        with Image.open(renditions[0].image) as thumb:
+            self.assertEqual(thumb.format, 'WEBP')
+
+    def test_unreadable_photo_has_no_renditions(self):
+        photo = Photo.objects.create(post=self.post, image=SimpleUploadedFile('photo.jpg', b'not an image'))
+        self.assertFalse(photo.renditions.exists())
+
+    def test_picture_tag(self):
+        photo = Photo.objects.create(post=self.post, image=image_file())
+        photo = Post.objects.with_photos().get(pk=self.post.pk).photo_set.all()[0]
+
+        with self.assertNumQueries(0):
+            html = Template("{% load photos %}{% picture photo 'thumb' width=150 %}").render(
+                Context({'photo': photo}))
+
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('150w', html)
+        self.assertIn('sizes="150px"', html)
+        self.assertIn(f'src="{photo.image.url}"', html)
+
+    def test_picture_tag_falls_back_to_the_original(self):
+        photo = Photo.objects.create(post=self.post, image=image_file())
+        photo.renditions.all().delete()
+
+        html = Template("{% load photos %}{% picture photo %}").render(Context({'photo': photo}))
+        self.assertNotIn('<source', html)
+        self.assertIn(f'src="{photo.image.url}"', html)
@@ -0,0 +1,86 @@
+import io
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from main_app import jobs
+from main_app.constants import job_max_attempts, job_timeout
+from main_app.models import Job
+
+calls = []
+
+
+def record(payload):
+    calls.append(payload)
+
+
+def explode(payload):
+    raise RuntimeError('boom')
+
+
+class JobsTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_run_next_runs_the_oldest_job(self):
+        first = jobs.enqueue('main_app.tests.test_jobs.record', {'n': 1})
+        jobs.enqueue('main_app.tests.test_jobs.record', {'n': 2})
+
+        self.assertTrue(jobs.run_next())
+        self.assertEqual(calls, [{'n': 1}])
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.attempts), (Job.DONE, 1))
+
+        self.assertTrue(jobs.run_next())
+        self.assertFalse(jobs.run_next())
+        self.assertEqual(calls, [{'n': 1}, {'n': 2}])
+
+    def test_claimed_job_is_not_run_twice(self):
+        job = jobs.enqueue('main_app.tests.test_jobs.record', {})
+        self.assertTrue(jobs.claim(job))
+        self.assertFalse(jobs.claim(Job.objects.get(pk=job.pk)))
+        self.assertIsNone(jobs.claim_next())
+
+    def test_failed_job_is_retried_later_then_fails(self):
+        job = jobs.enqueue('main_app.tests.test_jobs.explode', {})
+
+        self.assertTrue(jobs.run_next())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('boom', job.error)
+        self.assertFalse(jobs.run_next())
+
+        for _ in range(job_max_attempts - 1):
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            jobs.run_next()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, job_max_attempts))
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_job_runs_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = jobs.enqueue('main_app.tests.test_jobs.record', {'n': 1})
+            self.assertEqual(calls, [])
+
+        self.assertEqual(calls, [{'n': 1}])
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.DONE)
+
+    def test_requeue_abandoned(self):
+        job = jobs.enqueue('main_app.tests.test_jobs.record', {})
+        jobs.claim(job)
+        Job.objects.filter(pk=job.pk).update(updated_at=timezone.now() - job_timeout * 2)
+
+        self.assertEqual(jobs.requeue_abandoned(), 1)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.PENDING)
+
+    def test_run_worker_command(self):
+        jobs.enqueue('main_app.tests.test_jobs.record', {'n': 1})
+        jobs.enqueue('main_app.tests.test_jobs.record', {'n': 2})
+        out = io.StringIO()
+
+        call_command('run_worker', '--once', stdout=out)
+
+        self.assertEqual(calls, [{'n': 1}, {'n': 2}])
+        self.assertIn('Successfully processed 2 jobs.', out.getvalue())
@@ -118,3 +118,22 @@ class CommentModelTestCase(TestCase):
 
     def test_comment_publish_date_field(self):
         self.assertEqual(self.comment.publish_date, self.today_date)
+
+
+class PostQuerySetTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='testuser', password='testpassword')
+        self.post = Post.objects.create(name='Test Post', summary='Summary', author=self.user)
+        Photo.objects.create(post=self.post, image='photos/test.jpg')
+        Comment.objects.create(post=self.post, author=self.user, text='Comment')
+
+    def test_with_counts(self):
+        self.assertEqual(Post.objects.with_counts().get().comments_count, 1)
+
+    def test_builders_load_related_rows_in_constant_queries(self):
+        with self.assertNumQueries(4):
+            post = Post.objects.with_author().with_photos().with_tags().get()
+            self.assertEqual(post.author, self.user)
+            self.assertEqual(len(post.photo_set.all()), 1)
+            self.assertEqual(len(post.photo_set.all()[0].renditions.all()), 0)
+            self.assertEqual(len(post.tag.all()), 0)
@@ -0,0 +1,75 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from main_app.models import CustomUser, Post
+
+
+class AnonymousPageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = CustomUser.objects.create_user(username='author', email='author@example.com',
+                                                     password='password')
+        self.post = Post.objects.create(author=self.author, name='Holidays', summary='Sea')
+
+    def test_page_is_cached_for_anonymous_visitors(self):
+        first = self.client.get(reverse('index'))
+        self.assertContains(first, 'Holidays')
+        self.assertIn('Cookie', first['Vary'])
+        self.assertFalse(first.cookies)
+
+        # Only the version of the posts is read
+        with self.assertNumQueries(1):
+            second = self.client.get(reverse('index'))
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_unchanged_page_is_not_modified(self):
+        response = self.client.get(reverse('index'))
+
+        self.assertEqual(self.client.get(reverse('index'), HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(reverse('index'), HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                         .status_code, 304)
+
+    def test_changed_posts_give_a_new_page(self):
+        etag = self.client.get(reverse('index'))['ETag']
+        Post.objects.create(author=self.author, name='Mountains', summary='Snow')
+
+        response = self.client.get(reverse('index'), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertContains(response, 'Mountains')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_deleted_post_gives_a_new_page(self):
+        other = Post.objects.create(author=self.author, name='Mountains', summary='Snow')
+        # The latest Post.updated_at stays the same when the post is deleted
+        Post.objects.filter(pk=other.pk).update(updated_at=self.post.updated_at)
+        etag = self.client.get(reverse('index'))['ETag']
+        self.post.delete()
+
+        response = self.client.get(reverse('index'), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Holidays')
+
+    def test_signed_in_users_get_fresh_pages(self):
+        self.client.get(reverse('index'))
+        self.client.login(username='author', password='password')
+
+        response = self.client.get(reverse('index'))
+
+        self.assertNotIn('ETag', response)
+        self.assertIn('Cookie', response['Vary'])
+        self.assertContains(response, 'name="csrf-token"')
+
+    def test_search_results_are_cached_per_query(self):
+        self.assertContains(self.client.get(reverse('search_view'), {'q': 'holidays'}), 'Holidays')
+        self.assertNotContains(self.client.get(reverse('search_view'), {'q': 'mountains'}), 'Holidays')
+
+    def test_static_page_is_validated_by_its_content(self):
+        response = self.client.get(reverse('explore'))
+        self.assertNotIn('Last-Modified', response)
+
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(reverse('explore'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
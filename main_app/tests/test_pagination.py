@@ -0,0 +1,58 @@
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+
+from main_app.models import CustomUser, Post
+from main_app.pagination import (InvalidCursor, KeysetPaginator, decode_cursor,
+                                 encode_cursor)
+
+
+class CursorTestCase(TestCase):
+    def test_encode_decode_cursor(self):
+        date = timezone.now()
+        cursor = encode_cursor([date, 7], reverse=True)
+
+        self.assertEqual(decode_cursor(cursor), ([date.isoformat(), 7], True))
+
+    def test_decode_invalid_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            decode_cursor('not-a-cursor')
+
+
+class KeysetPaginatorTestCase(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create(username='test_user', password='test_password')
+        now = timezone.now()
+        # Two posts share a publish date to check that id breaks the tie
+        dates = [now, now, now - datetime.timedelta(hours=1), now - datetime.timedelta(hours=2),
+                 now - datetime.timedelta(hours=3)]
+        for number, date in enumerate(dates):
+            Post.objects.create(name=f'Post {number}', summary='Summary', author=user, publish_date=date)
+        self.expected = list(Post.objects.order_by('-publish_date', '-id'))
+        self.paginator = KeysetPaginator(Post.objects.all(), per_page=2)
+
+    def test_first_page(self):
+        page = self.paginator.get_page()
+
+        self.assertEqual(page.object_list, self.expected[:2])
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+
+    def test_walk_forward_and_back(self):
+        first = self.paginator.get_page()
+        second = self.paginator.get_page(first.next_cursor)
+        third = self.paginator.get_page(second.next_cursor)
+
+        self.assertEqual(second.object_list, self.expected[2:4])
+        self.assertEqual(third.object_list, self.expected[4:])
+        self.assertFalse(third.has_next())
+
+        back = self.paginator.get_page(third.previous_cursor)
+        self.assertEqual(back.object_list, self.expected[2:4])
+        self.assertEqual(self.paginator.get_page(back.previous_cursor).object_list, self.expected[:2])
+
+    def test_malformed_cursor_values(self):
+        for values in (['abc', 1], [{}, 1], ['2020-01-01T00:00:00+00:00', 'zz'], [None, 1], [1]):
+            with self.subTest(values=values), self.assertRaises(InvalidCursor):
+                self.paginator.get_page(encode_cursor(values))
@@ -0,0 +1,87 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from main_app import profiles
+from main_app.models import Comment, CustomUser, Post
+from main_app.repositories import SubscribeRepository
+
+
+class ProfileCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='user', email='user@example.com', password='password',
+                                                   bio='Hello')
+        self.author = CustomUser.objects.create_user(username='author', email='author@example.com',
+                                                     password='password')
+
+    def test_profiles_are_read_through(self):
+        with self.assertNumQueries(1):
+            loaded = profiles.get_profiles([self.user.pk, self.author.pk, 0])
+        with self.assertNumQueries(0):
+            cached = profiles.get_profiles([self.user.pk, self.author.pk])
+
+        self.assertEqual(set(loaded), {self.user.pk, self.author.pk})
+        self.assertEqual(cached[self.user.pk].bio, 'Hello')
+        self.assertEqual(cached[self.user.pk].avatar_url, self.user.avatar.url)
+
+    def test_saved_user_gets_a_new_profile(self):
+        profiles.get_profile(self.user.pk)
+        self.user.bio = 'Changed'
+        self.user.save()
+
+        self.assertEqual(profiles.get_profile(self.user.pk).bio, 'Changed')
+
+    def test_login_keeps_the_profile(self):
+        profiles.get_profile(self.user.pk)
+        self.client.login(username='user', password='password')
+
+        with self.assertNumQueries(0):
+            profiles.get_profile(self.user.pk)
+
+    def test_follows_update_the_counts(self):
+        profiles.get_profiles([self.user.pk, self.author.pk])
+        SubscribeRepository.update_subscribe(self.user, self.author)
+
+        self.assertEqual(profiles.get_profile(self.author.pk).followers_count, 1)
+        self.assertEqual(profiles.get_profile(self.user.pk).following_count, 1)
+
+        SubscribeRepository.update_subscribe(self.user, self.author)
+        self.assertEqual(profiles.get_profile(self.author.pk).followers_count, 0)
+
+
+class ProfileViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='user', email='user@example.com', password='password')
+        self.author = CustomUser.objects.create_user(username='author', email='author@example.com',
+                                                     password='password', bio='Photographer')
+        self.client.login(username='user', password='password')
+
+    def test_someone_profile_shows_the_cached_profile(self):
+        SubscribeRepository.update_subscribe(self.user, self.author)
+
+        response = self.client.get(reverse('someone_profile', args=[self.author.pk]))
+
+        self.assertContains(response, 'User author')
+        self.assertContains(response, 'Photographer')
+        self.assertContains(response, 'Followers: 1, subscriptions: 0')
+        self.assertTrue(response.context['subscribe'])
+
+    def test_someone_profile_of_unknown_user(self):
+        self.assertEqual(self.client.get(reverse('someone_profile', args=[0])).status_code, 404)
+
+    def test_subscribe_toggles(self):
+        url = reverse('subscribe', args=[self.author.pk])
+
+        self.assertEqual(self.client.post(url).json(), {'is_subscribed': True})
+        self.assertEqual(self.client.post(url).json(), {'is_subscribed': False})
+        self.assertEqual(self.client.post(reverse('subscribe', args=[0])).status_code, 404)
+
+    def test_comment_authors_come_from_profiles(self):
+        post = Post.objects.create(author=self.author, name='Holidays', summary='Sea')
+        Comment.objects.create(post=post, author=self.user, text='Nice')
+
+        response = self.client.get(reverse('post_detail', args=[post.pk]))
+
+        self.assertContains(response, f'href="{reverse("someone_profile", args=[self.user.pk])}">user</a>')
@@ -1,7 +1,11 @@
+from unittest import mock
+
 from django.test import RequestFactory, TestCase
 
-from main_app.models import CustomUser, Post
-from main_app.repositories import LikeRepository
+from main_app.models import CustomUser, FeedEntry, Follow, Post, Tag
+from main_app.repositories import (FeedRepository, LikeRepository,
+                                   PostRepository, SearchRepository,
+                                   SubscribeRepository, TagRepository)
 
 
 class LikeRepositoryTestCase(TestCase):
@@ -67,3 +71,253 @@ class LikeRepositoryTestCase(TestCase):
         # Check the result
         self.assertEqual(self.post.likes.count(), 0)
         self.assertEqual(self.post.dislikes.count(), 0)
+
+    def test_toggle_like_updates_counters(self):
+        LikeRepository.toggle_like(request=self.request, post=self.post, is_like=True)
+        self.assertEqual((self.post.likes_count, self.post.dislikes_count), (1, 0))
+
+        # Switching to a dislike moves the reaction between the counters
+        LikeRepository.toggle_like(request=self.request, post=self.post, is_like=False)
+        self.assertEqual((self.post.likes_count, self.post.dislikes_count), (0, 1))
+
+        LikeRepository.toggle_like(request=self.request, post=self.post, is_like=False)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.dislikes_count), (0, 0))
+
+    def test_reconcile_counts(self):
+        self.post.likes.add(self.user)
+        self.assertEqual(LikeRepository.get_drifted_counts().count(), 1)
+
+        self.assertEqual(LikeRepository.reconcile_counts(), 1)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertFalse(LikeRepository.get_drifted_counts().exists())
+
+
+class FeedRepositoryTestCase(TestCase):
+    def setUp(self):
+        self.author = CustomUser.objects.create(username='author', email='author@example.com')
+        self.follower = CustomUser.objects.create(username='follower', email='follower@example.com')
+        self.stranger = CustomUser.objects.create(username='stranger', email='stranger@example.com')
+        self.old_post = Post.objects.create(name='Old Post', summary='Old', author=self.author)
+
+    def test_subscribe_backfills_author_posts(self):
+        SubscribeRepository.update_subscribe(self.follower, self.author)
+
+        self.assertEqual(FeedRepository.get_feed_posts(self.follower), [self.old_post])
+
+    def test_new_post_is_fanned_out_to_followers_only(self):
+        SubscribeRepository.update_subscribe(self.follower, self.author)
+        new_post = Post.objects.create(name='New Post', summary='New', author=self.author)
+
+        FeedRepository.fan_out_post(new_post)
+
+        self.assertEqual(FeedRepository.get_feed_posts(self.follower), [new_post, self.old_post])
+        self.assertEqual(FeedRepository.get_feed_posts(self.stranger), [])
+
+    def test_unsubscribe_removes_author_posts(self):
+        SubscribeRepository.update_subscribe(self.follower, self.author)
+        SubscribeRepository.update_subscribe(self.follower, self.author)
+
+        self.assertFalse(FeedEntry.objects.filter(owner=self.follower).exists())
+
+    def test_subscribe_after_a_concurrent_subscribe(self):
+        Follow.objects.create(follower=self.follower, followee=self.author)
+
+        # The concurrent request committed its follow after this one found none to delete
+        with mock.patch('django.db.models.query.QuerySet.delete', return_value=(0, {})):
+            self.assertTrue(SubscribeRepository.update_subscribe(self.follower, self.author))
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_rebuild_feed(self):
+        Follow.objects.create(follower=self.follower, followee=self.author)
+
+        FeedRepository.rebuild_feed(self.follower)
+
+        self.assertEqual(FeedRepository.get_feed_post_ids(self.follower), [self.old_post.pk])
+
+    def test_rebuild_feed_limits_posts_per_author(self):
+        other_author = CustomUser.objects.create(username='other', email='other@example.com')
+        other_post = Post.objects.create(name='Other Post', summary='Other', author=other_author)
+        new_post = Post.objects.create(name='New Post', summary='New', author=self.author)
+        Follow.objects.create(follower=self.follower, followee=self.author)
+        Follow.objects.create(follower=self.follower, followee=other_author)
+
+        FeedRepository.rebuild_feed(self.follower, limit=1)
+
+        self.assertEqual(FeedRepository.get_feed_posts(self.follower), [new_post, other_post])
+
+
+class SubscribeRepositoryTestCase(TestCase):
+    def setUp(self):
+        self.alice = CustomUser.objects.create(username='alice', email='alice@example.com')
+        self.bob = CustomUser.objects.create(username='bob', email='bob@example.com')
+        self.carol = CustomUser.objects.create(username='carol', email='carol@example.com')
+
+    def test_update_subscribe_toggles_follow(self):
+        SubscribeRepository.update_subscribe(self.alice, self.bob)
+        self.assertTrue(SubscribeRepository.is_subscribed(self.alice, self.bob))
+        self.assertFalse(SubscribeRepository.is_subscribed(self.bob, self.alice))
+
+        SubscribeRepository.update_subscribe(self.alice, self.bob)
+        self.assertFalse(SubscribeRepository.is_subscribed(self.alice, self.bob))
+
+    def test_followers_following_and_mutual(self):
+        SubscribeRepository.update_subscribe(self.alice, self.bob)
+        SubscribeRepository.update_subscribe(self.bob, self.alice)
+        SubscribeRepository.update_subscribe(self.carol, self.alice)
+
+        self.assertQuerysetEqual(SubscribeRepository.get_followers(self.alice).order_by('username'),
+                                 ['bob', 'carol'], transform=str)
+        self.assertQuerysetEqual(SubscribeRepository.get_following(self.alice), ['bob'], transform=str)
+        self.assertQuerysetEqual(SubscribeRepository.get_mutual_follows(self.alice), ['bob'], transform=str)
+
+
+class SearchRepositoryTestCase(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create(username='test_user', password='test_password')
+        self.sunset = Post.objects.create(name='Sunset', summary='Evening at the sea', author=user)
+        self.beach = Post.objects.create(name='Beach day', summary='Sunset over the sea, sunset again', author=user)
+        self.city = Post.objects.create(name='City', summary='Lights', author=user)
+        self.city.tag.add(Tag.objects.create(tag='nightlife'))
+
+    def search(self, query):
+        return list(SearchRepository.search_posts(query))
+
+    def test_search_covers_name_summary_and_tags(self):
+        self.assertIn(self.sunset, self.search('sunset'))
+        self.assertEqual(self.search('evening'), [self.sunset])
+        self.assertEqual(self.search('nightlife'), [self.city])
+
+    def test_search_requires_every_word(self):
+        self.assertEqual(self.search('beach sea'), [self.beach])
+
+    def test_search_matches_prefix_of_last_word(self):
+        self.assertEqual(self.search('nightl'), [self.city])
+
+    def test_search_ranks_results(self):
+        self.assertEqual(self.search('sunset'), [self.beach, self.sunset])
+
+    def test_search_empty_query(self):
+        self.assertEqual(self.search(' ,.'), [])
+
+    def test_search_document_follows_changes(self):
+        self.city.name = 'Town'
+        self.city.save()
+        self.city.tag.clear()
+
+        self.assertEqual(self.search('town'), [self.city])
+        self.assertEqual(self.search('nightlife'), [])
+
+    def test_reindex_posts(self):
+        Post.objects.update(search_document='')
+        self.assertEqual(SearchRepository.reindex_posts(Post.objects.all()), 3)
+        self.assertEqual(self.search('nightlife'), [self.city])
+
+
+class TagRepositoryTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='test_user', password='test_password')
+
+    def create_post(self, name, tags):
+        post = Post.objects.create(name=name, author=self.user)
+        TagRepository.attach_tags(post, tags)
+        return post
+
+    def test_attach_tags_counts_posts(self):
+        self.create_post('First', ['sea', ' sun'])
+        post = self.create_post('Second', ['sea', 'sea ', ''])
+
+        self.assertQuerysetEqual(post.tag.all(), ['sea'], transform=str)
+        self.assertEqual(Tag.objects.get(tag='sea').post_count, 2)
+        self.assertEqual(Tag.objects.get(tag='sun').post_count, 1)
+        self.assertFalse(Tag.objects.filter(tag='').exists())
+
+    def test_normalize_tags(self):
+        self.assertEqual(TagRepository.normalize_tags('a, ,a,b ,'.split(',')), ['a', 'b'])
+        self.assertEqual(TagRepository.normalize_tags([' ' + 'x' * 60]), ['x' * 50])
+
+    def test_attach_tags_twice_keeps_counts(self):
+        post = self.create_post('First', ['sea'])
+        TagRepository.attach_tags(post, ['sea', 'sun'])
+
+        self.assertQuerysetEqual(post.tag.order_by('tag'), ['sea', 'sun'], transform=str)
+        self.assertEqual(Tag.objects.get(tag='sea').post_count, 1)
+        self.assertEqual(Post.objects.get(pk=post.pk).search_document, 'First sea sun')
+
+    def test_attach_tags_to_posts_in_constant_queries(self):
+        Tag.objects.create(tag='sea', post_count=3)
+        posts = [Post.objects.create(name=f'Post {index}', author=self.user) for index in range(5)]
+
+        # Tags, current post tags, post tags, a counter update per increment (5 and 1), search documents
+        with self.assertNumQueries(6):
+            TagRepository.attach_tags_to_posts([(post, ['sea', f'tag{index}', 'sun'])
+                                                for index, post in enumerate(posts)])
+
+        self.assertEqual(Post.tag.through.objects.count(), 15)
+        self.assertEqual(Tag.objects.get(tag='sea').post_count, 8)
+        self.assertEqual(Tag.objects.get(tag='sun').post_count, 5)
+        self.assertEqual(Tag.objects.get(tag='tag1').post_count, 1)
+        self.assertEqual(Post.objects.get(pk=posts[1].pk).search_document, 'Post 1 sea tag1 sun')
+
+    def test_autocomplete_by_prefix_and_popularity(self):
+        self.create_post('First', ['sea', 'season'])
+        self.create_post('Second', ['season', 'sun'])
+
+        self.assertQuerysetEqual(TagRepository.autocomplete('sea'), ['season', 'sea'], transform=str)
+        self.assertQuerysetEqual(TagRepository.autocomplete(''), ['season', 'sea', 'sun'], transform=str)
+        self.assertQuerysetEqual(TagRepository.autocomplete('x'), [])
+
+    def test_get_posts_by_tag(self):
+        first = self.create_post('First', ['sea'])
+        second = self.create_post('Second', ['sea'])
+        self.create_post('Third', ['sun'])
+
+        self.assertEqual(list(TagRepository.get_posts_by_tag(TagRepository.get_tag('sea'))), [second, first])
+
+    def test_counts_follow_deleted_and_detached_posts(self):
+        first = self.create_post('First', ['sea', 'sun'])
+        second = self.create_post('Second', ['sea', 'sun'])
+
+        first.tag.remove('sun', 'unknown')
+        self.assertEqual(Tag.objects.get(tag='sun').post_count, 1)
+        Tag.objects.get(tag='sun').post_set.clear()
+        self.assertEqual(Tag.objects.get(tag='sun').post_count, 0)
+        second.tag.add('sun')
+        self.assertEqual(Tag.objects.get(tag='sun').post_count, 1)
+
+        second.delete()
+        self.assertEqual(Tag.objects.get(tag='sea').post_count, 1)
+        self.assertEqual(Tag.objects.get(tag='sun').post_count, 0)
+        first.tag.clear()
+        self.assertEqual(Tag.objects.get(tag='sea').post_count, 0)
+
+    def test_unpublished_posts_are_counted_once_published(self):
+        post = Post.objects.create(name='Draft', author=self.user, is_published=False)
+        TagRepository.attach_tags(post, ['sea'])
+        self.assertEqual(Tag.objects.get(tag='sea').post_count, 0)
+
+        PostRepository.publish_post(post)
+        PostRepository.publish_post(Post.objects.get(pk=post.pk))
+        self.assertEqual(Tag.objects.get(tag='sea').post_count, 1)
+
+        post = Post.objects.get(pk=post.pk)
+        post.is_published = False
+        post.save()
+        self.assertEqual(Tag.objects.get(tag='sea').post_count, 0)
+
+        post.delete()
+        self.assertEqual(Tag.objects.get(tag='sea').post_count, 0)
+
+    def test_reconcile_counts(self):
+        self.create_post('First', ['sea', 'sun'])
+        draft = self.create_post('Draft', ['sun'])
+        # Unpublished without the signals
+        Post.objects.filter(pk=draft.pk).update(is_published=False)
+        Tag.objects.filter(tag='sea').update(post_count=3)
+
+        self.assertQuerysetEqual(TagRepository.get_drifted_counts().order_by('tag'), ['sea', 'sun'], transform=str)
+        self.assertEqual(TagRepository.reconcile_counts(), 2)
+        self.assertEqual(Tag.objects.get(tag='sea').post_count, 1)
+        self.assertEqual(Tag.objects.get(tag='sun').post_count, 1)
@@ -0,0 +1,48 @@
+import os
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase
+
+from main_app import storage_writer
+
+
+class FailingStorage(FileSystemStorage):
+    def _save(self, name, content):
+        if 'broken' in name:
+            raise OSError('Upload failed.')
+        return super()._save(name, content)
+
+
+class StorageWriterTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = directory.name
+        self.storage = FailingStorage(location=self.location)
+
+    def stored(self):
+        return sorted(os.listdir(self.location))
+
+    def test_save_files(self):
+        names = storage_writer.save_files([ContentFile(b'1'), ContentFile(b'2'), ContentFile(b'3')],
+                                          ['a.txt', 'b.txt', 'a.txt'], storage=self.storage, max_workers=2)
+
+        self.assertEqual(names[:2], ['a.txt', 'b.txt'])
+        self.assertEqual(len(set(names)), 3)
+        self.assertEqual(self.storage.open(names[1]).read(), b'2')
+
+    def test_failed_write_rolls_back_the_batch(self):
+        with self.assertRaises(OSError):
+            storage_writer.save_files([ContentFile(b'1'), ContentFile(b'2'), ContentFile(b'3')],
+                                      ['a.txt', 'broken.txt', 'c.txt'], storage=self.storage)
+        self.assertEqual(self.stored(), [])
+
+    def test_caller_rolls_back_the_batch(self):
+        batch = storage_writer.WriteBatch(self.storage)
+        storage_writer.run_concurrently([lambda batch: batch.save('a.txt', ContentFile(b'1'))], batch)
+        self.assertEqual(self.stored(), ['a.txt'])
+
+        batch.rollback()
+        self.assertEqual(self.stored(), [])
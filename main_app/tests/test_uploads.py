@@ -0,0 +1,206 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from main_app import jobs, uploads
+from main_app.benchmarks import isolated_media
+from main_app.models import CustomUser, FeedEntry, Job, Photo, Post
+from main_app.repositories import SubscribeRepository
+from main_app.upload_handlers import rejected_uploads
+
+
+def png(size=(40, 20)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'green').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def jpeg(orientation=None):
+    buffer = BytesIO()
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera maker'
+    if orientation:
+        exif[uploads.EXIF_ORIENTATION] = orientation
+    Image.new('RGB', (40, 20), 'blue').save(buffer, format='JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+class StripMetadataTest(TestCase):
+    def test_strips_exif(self):
+        with Image.open(BytesIO(uploads.strip_metadata(BytesIO(jpeg())))) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(dict(image.getexif()), {})
+            self.assertEqual(image.size, (40, 20))
+
+    def test_applies_orientation(self):
+        with Image.open(BytesIO(uploads.strip_metadata(BytesIO(jpeg(orientation=6))))) as image:
+            self.assertEqual(dict(image.getexif()), {})
+            self.assertEqual(image.size, (20, 40))
+
+
+class PostPhotoUploadTest(TestCase):
+    def setUp(self):
+        media = isolated_media()
+        self.media_root = media.__enter__()
+        self.addCleanup(media.__exit__, None, None, None)
+        self.author = CustomUser.objects.create_user(username='author', email='author@example.com',
+                                                     password='password')
+        self.follower = CustomUser.objects.create_user(username='follower', email='follower@example.com',
+                                                       password='password')
+        SubscribeRepository.update_subscribe(self.follower, self.author)
+
+    def create_post(self):
+        self.client.login(username='author', password='password')
+        response = self.client.post(reverse('post_create'), {
+            'name': 'Holidays', 'summary': 'Sea', 'tag': 'sea',
+            'form-TOTAL_FORMS': '1', 'form-INITIAL_FORMS': '0', 'form-MAX_NUM_FORMS': '',
+            'form-0-image': SimpleUploadedFile('photo.jpg', jpeg(), content_type='image/jpeg'),
+        })
+        post = Post.objects.get()
+        self.assertRedirects(response, reverse('post_detail', args=[post.pk]))
+        return post
+
+    def test_post_is_published_by_the_worker(self):
+        post = self.create_post()
+
+        self.assertFalse(post.is_published)
+        self.assertFalse(post.photo_set.exists())
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, 'staging'))), 1)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertNotIn(post, self.client.get(reverse('index')).context['object_list'])
+
+        self.assertTrue(jobs.run_next())
+
+        post.refresh_from_db()
+        self.assertTrue(post.is_published)
+        photo = post.photo_set.get()
+        self.assertTrue(photo.renditions.exists())
+        with Image.open(photo.image) as image:
+            self.assertEqual(dict(image.getexif()), {})
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'staging')), [])
+        self.assertTrue(FeedEntry.objects.filter(owner=self.follower, post=post).exists())
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+
+    def test_unpublished_post_is_only_shown_to_its_author(self):
+        post = self.create_post()
+
+        self.assertEqual(self.client.get(reverse('post_detail', args=[post.pk])).status_code, 200)
+        self.assertIn(post, self.client.get(reverse('self_profile')).context['posts'])
+
+        self.client.login(username='follower', password='password')
+        self.assertEqual(self.client.get(reverse('post_detail', args=[post.pk])).status_code, 404)
+        self.assertNotIn(post, self.client.get(reverse('someone_profile', args=[self.author.pk])).context['posts'])
+
+    def test_failed_upload_leaves_no_files_and_is_retried(self):
+        post = self.create_post()
+        job = Job.objects.get()
+        # A second photo which fails after the first one may have been written
+        broken = uploads.staging_storage().save('broken.jpg', SimpleUploadedFile('broken.jpg', b'not an image'))
+        job.payload['photos'].append({'staged': broken, 'name': 'broken.jpg'})
+        job.save()
+
+        self.assertTrue(jobs.run_next())
+
+        self.assertEqual(Job.objects.get().status, Job.PENDING)
+        self.assertFalse(Photo.objects.exists())
+        stored = [name for directory, _, names in os.walk(self.media_root) if 'staging' not in directory
+                  for name in names]
+        self.assertEqual(stored, [])
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, 'staging'))), 2)
+        post.refresh_from_db()
+        self.assertFalse(post.is_published)
+
+    def test_job_of_a_deleted_post_drops_the_staged_photos(self):
+        self.create_post().delete()
+
+        self.assertTrue(jobs.run_next())
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'staging')), [])
+
+
+class ValidatingUploadHandlerTest(TestCase):
+    def setUp(self):
+        media = isolated_media()
+        self.media_root = media.__enter__()
+        self.addCleanup(media.__exit__, None, None, None)
+        CustomUser.objects.create_user(username='author', email='author@example.com', password='password')
+        self.client.login(username='author', password='password')
+
+    def post(self, *files):
+        data = {'name': 'Holidays', 'summary': 'Sea', 'tag': 'sea', 'form-TOTAL_FORMS': str(len(files)),
+                'form-INITIAL_FORMS': '0', 'form-MAX_NUM_FORMS': ''}
+        for index, (name, content) in enumerate(files):
+            data[f'form-{index}-image'] = SimpleUploadedFile(name, content)
+        return self.client.post(reverse('post_create'), data)
+
+    def assert_rejected(self, response, message):
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Post.objects.exists())
+        errors = response.context['photo_formset'].non_form_errors()
+        self.assertEqual(len(errors), 1)
+        self.assertIn(message, errors[0])
+
+    def test_valid_photos_are_staged(self):
+        response = self.post(('first.png', png()), ('second.jpg', jpeg()))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, 'staging'))), 2)
+
+    def test_rejects_extension(self):
+        self.assert_rejected(self.post(('photo.bmp', png())), 'photo.bmp: Invalid file extension.')
+
+    def test_rejects_content_which_is_not_an_image(self):
+        self.assert_rejected(self.post(('photo.jpg', b'<?php echo 1; ?>' * 10)), 'not a JPEG, PNG or GIF')
+
+    def test_rejects_corrupted_image(self):
+        self.assert_rejected(self.post(('photo.png', png()[:30])), 'The file is corrupted.')
+
+    @override_settings(PHOTO_UPLOAD_MAX_PIXELS=100 * 100)
+    def test_rejects_large_dimensions(self):
+        self.assert_rejected(self.post(('photo.png', png(size=(200, 100)))), 'The image is 200x100 pixels')
+
+    def test_rejects_large_file(self):
+        with override_settings(PHOTO_UPLOAD_MAX_FILE_SIZE=len(png()) - 1):
+            self.assert_rejected(self.post(('photo.png', png())), 'The file is larger than')
+
+    def test_rejects_large_post(self):
+        with override_settings(PHOTO_UPLOAD_MAX_POST_SIZE=len(png()) * 3 // 2):
+            self.assert_rejected(self.post(('first.png', png()), ('second.png', png())),
+                                 'second.png: The photos of a post are larger than')
+
+    def test_rejected_files_leave_nothing_in_staging(self):
+        self.post(('first.png', png()), ('photo.jpg', b'not an image' * 10))
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'staging')), [])
+
+    def test_rejected_files_are_not_kept_by_other_handlers(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+
+        # The default handlers would write every file to FILE_UPLOAD_TEMP_DIR
+        with override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=0, FILE_UPLOAD_TEMP_DIR=temp_dir):
+            response = self.post(('first.png', png()), ('second.jpg', b'not an image' * 10),
+                                 ('third.png', png()[:30]))
+
+        self.assertEqual(list(response.wsgi_request.FILES), ['form-0-image'])
+        self.assertEqual(sorted(rejected_uploads(response.wsgi_request)), ['form-1-image', 'form-2-image'])
+        self.assertEqual(os.listdir(temp_dir), [])
+
+    def test_csrf_is_still_checked(self):
+        self.client.handler.enforce_csrf_checks = True
+        self.assertEqual(self.post(('photo.png', png())).status_code, 403)
+
+    def test_other_uploads_are_not_checked_as_photos(self):
+        avatar = BytesIO()
+        Image.new('RGB', (10, 10)).save(avatar, format='WEBP')
+        response = self.client.post(reverse('edit_profile'), {
+            'username': 'author', 'email': 'author@example.com',
+            'avatar': SimpleUploadedFile('avatar.webp', avatar.getvalue()),
+        })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(CustomUser.objects.get().avatar.name.endswith('.webp'))
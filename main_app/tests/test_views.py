@@ -1,9 +1,18 @@
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from main_app.forms import CustomUserChangeForm, CustomUserCreationForm
 from main_app.models import Comment, CustomUser, Photo, Post, Tag
+from main_app.pagination import encode_cursor
+from main_app.repositories import (FeedRepository, SubscribeRepository,
+                                   TagRepository)
+from main_app.views import SearchResultsView
 
 
 class PostDetailViewTest(TestCase):
@@ -33,6 +42,59 @@ class PostDetailViewTest(TestCase):
         self.assertRedirects(response, expected_redirect_url)
 
 
+class ConstantQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='testuser', password='testpass')
+        cls.author = CustomUser.objects.create_user(username='author', email='author@example.com', password='pass')
+        SubscribeRepository.update_subscribe(cls.user, cls.author)
+        cls.tag = Tag.objects.create(tag='tag')
+
+    def create_posts(self, number):
+        for _ in range(number):
+            post = Post.objects.create(name='Post', author=self.author)
+            Photo.objects.create(post=post, image='path/to/photo.jpg')
+            post.tag.add(self.tag)
+            Comment.objects.create(post=post, author=self.user, text='Comment')
+            FeedRepository.fan_out_post(post)
+
+    def count_queries(self, url):
+        # With cold caches, so every request loads what it renders
+        for backend in caches.all():
+            backend.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assert_constant_queries(self, get_url):
+        self.client.login(username='testuser', password='testpass')
+        self.create_posts(2)
+        few = self.count_queries(get_url())
+        self.create_posts(4)
+        self.assertEqual(self.count_queries(get_url()), few)
+
+    def test_index_view(self):
+        self.assert_constant_queries(lambda: reverse('index'))
+
+    def test_someone_profile_view(self):
+        self.assert_constant_queries(lambda: reverse('someone_profile', args=[self.author.pk]))
+
+    def test_search_results_view(self):
+        self.assert_constant_queries(lambda: reverse('search_view') + '?q=tag')
+
+    def test_post_detail_view(self):
+        self.client.login(username='testuser', password='testpass')
+        post = Post.objects.create(name='Post', author=self.author)
+        Photo.objects.create(post=post, image='path/to/photo.jpg')
+        Comment.objects.create(post=post, author=self.user, text='Comment')
+        few = self.count_queries(reverse('post_detail', args=[post.pk]))
+        for _ in range(3):
+            Photo.objects.create(post=post, image='path/to/photo.jpg')
+            Comment.objects.create(post=post, author=self.author, text='Comment')
+        self.assertEqual(self.count_queries(reverse('post_detail', args=[post.pk])), few)
+
+
 class CreatePostViewTest(TestCase):
 
     @classmethod
@@ -90,6 +152,26 @@ class IndexViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertQuerysetEqual(response.context['posts_with_photo'], [])
 
+    def test_index_view_cursor_pagination(self):
+        user = CustomUser.objects.create_user(username='testuser', password='testpass')
+        for number in range(12):
+            Post.objects.create(name=f'Post {number}', author=user)
+
+        response = self.client.get(reverse('index'))
+        self.assertEqual(len(response.context['posts_with_photo']), 10)
+        self.assertTrue(response.context['page_obj'].has_next())
+
+        response = self.client.get(reverse('index'), {'cursor': response.context['page_obj'].next_cursor})
+        self.assertEqual(len(response.context['posts_with_photo']), 2)
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_index_view_with_invalid_cursor(self):
+        response = self.client.get(reverse('index'), {'cursor': 'broken'})
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.get(reverse('index'), {'cursor': encode_cursor(['abc', 1])})
+        self.assertEqual(response.status_code, 404)
+
 
 class UserProfileTest(TestCase):
     @classmethod
@@ -108,6 +190,9 @@ class UserProfileTest(TestCase):
 
 
 class ExploreViewTest(TestCase):
+    def setUp(self):
+        # The page is cached for anonymous visitors by the previous tests
+        cache.clear()
 
     def test_explore_view_returns_200(self):
         response = self.client.get(reverse('explore'))
@@ -141,6 +226,62 @@ class SearchResultsViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertQuerysetEqual(response.context['posts'], ['Post 1'], transform=str)
 
+    def test_search_results_pages_are_capped(self):
+        with mock.patch('main_app.views.search_max_pages', 2), \
+                mock.patch.object(SearchResultsView, 'paginate_by', 1):
+            last_page = self.client.get(reverse('search_view') + '?q=post&page=2')
+            self.assertEqual(self.client.get(reverse('search_view') + '?q=post&page=3').status_code, 404)
+
+        self.assertEqual(last_page.status_code, 200)
+        self.assertEqual(len(last_page.context['posts']), 1)
+        self.assertFalse(last_page.context['page_obj'].has_next())
+
+
+class TagViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user(username='testuser', password='testpass')
+        for index in range(12):
+            post = Post.objects.create(name=f'Post {index}', author=user)
+            TagRepository.attach_tags(post, ['nature'] if index % 2 else ['nature', 'night'])
+
+    def test_tag_detail_view(self):
+        response = self.client.get(reverse('tag_detail', args=['night']))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'main_app/tag_detail.html')
+        self.assertEqual(response.context['tag'].post_count, 6)
+        self.assertQuerysetEqual(response.context['posts'], ['Post 10', 'Post 8', 'Post 6', 'Post 4', 'Post 2',
+                                                             'Post 0'], transform=str)
+
+    def test_tag_detail_view_is_paginated(self):
+        response = self.client.get(reverse('tag_detail', args=['nature']))
+        self.assertEqual(len(response.context['posts']), 10)
+
+        response = self.client.get(reverse('tag_detail', args=['nature']),
+                                   {'cursor': response.context['page_obj'].next_cursor})
+        self.assertQuerysetEqual(response.context['posts'], ['Post 1', 'Post 0'], transform=str)
+
+    def test_tag_with_a_slash(self):
+        post = Post.objects.first()
+        TagRepository.attach_tags(post, ['ui/ux'])
+        self.client.force_login(post.author)
+
+        self.assertEqual(self.client.get(reverse('post_detail', args=[post.pk])).status_code, 200)
+        response = self.client.get(Tag.objects.get(tag='ui/ux').get_absolute_url())
+        self.assertQuerysetEqual(response.context['posts'], [post.name], transform=str)
+
+    def test_tag_detail_view_unknown_tag(self):
+        response = self.client.get(reverse('tag_detail', args=['unknown']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_tag_autocomplete_view(self):
+        response = self.client.get(reverse('tag_autocomplete'), {'q': 'n'})
+        self.assertEqual(response.json()['tags'], [{'tag': 'nature', 'post_count': 12},
+                                                   {'tag': 'night', 'post_count': 6}])
+
+        response = self.client.get(reverse('tag_autocomplete'), {'q': 'ni'})
+        self.assertEqual(response.json(), {'tags': [{'tag': 'night', 'post_count': 6}]})
+
 
 class SignUpViewTest(TestCase):
 
@@ -236,3 +377,25 @@ class AddCommentToPostViewTest(TestCase):
         self.assertRedirects(response, reverse('login') + '?next=' + url)
 
         self.assertEqual(Comment.objects.count(), 0)
+
+
+class AddLikeDislikeViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='user', email='user@example.com', password='password')
+        author = CustomUser.objects.create_user(username='author', email='author@example.com', password='password')
+        self.post = Post.objects.create(author=author, name='Holidays', summary='Sea')
+        self.draft = Post.objects.create(author=author, name='Draft', summary='Sea', is_published=False)
+        self.client.force_login(self.user)
+
+    def like(self, pk, is_like='true'):
+        return self.client.post(reverse('like-dislike', args=[pk]), {'is_like': is_like})
+
+    def test_like_and_dislike(self):
+        self.assertEqual(self.like(self.post.pk).json(), {'likes_count': 1, 'dislikes_count': 0})
+        self.assertEqual(self.like(self.post.pk, 'false').json(), {'likes_count': 0, 'dislikes_count': 1})
+
+    def test_unpublished_post_of_another_user_and_unknown_post(self):
+        self.assertEqual(self.like(self.draft.pk).status_code, 404)
+        self.assertEqual(self.like(0).status_code, 404)
+        self.assertFalse(self.draft.likes.exists())
@@ -0,0 +1,133 @@
+"""
+Validation of uploaded photos while the request body is received.
+
+ValidatingUploadHandler, installed by CreatePostView for the photos of a new post, streams every uploaded file to
+a temporary file of the staging folder, so staging a photo for the worker is a rename. It rejects a file as soon
+as possible: by its extension before any byte is stored, by its magic bytes and decoded dimensions from the first
+chunk, and by size as the chunks arrive. A rejected file is skipped; its error is kept on the request (see
+rejected_uploads) and shown by the form.
+
+The handler takes every file, so it replaces the handlers of the request: Django would still ask the handlers after
+it for a file rejected once complete.
+"""
+import os
+import tempfile
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import (SkipFile, StopFutureHandlers,
+                                             TemporaryFileUploadHandler)
+from django.http import HttpRequest
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+from main_app.constants import allowed_photos_extensions
+
+# Leading bytes of the allowed image formats
+MAGIC_BYTES = {
+    b'\xff\xd8\xff': 'JPEG',
+    b'\x89PNG\r\n\x1a\n': 'PNG',
+    b'GIF87a': 'GIF',
+    b'GIF89a': 'GIF',
+}
+# Bytes read at most to find the dimensions (a JPEG may start with up to 64 KiB of EXIF data)
+HEADER_LIMIT = 256 * 1024
+
+
+def rejected_uploads(request: HttpRequest) -> Dict[str, str]:
+    """
+    Returns:
+        Dict[str, str]: The error of every file rejected by ValidatingUploadHandler, by form field name.
+    """
+    return getattr(request, '_rejected_uploads', {})
+
+
+class StagedUploadedFile(TemporaryUploadedFile):
+    """
+    A TemporaryUploadedFile created in the staging folder, so FileSystemStorage moves it instead of copying it.
+    """
+
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        os.makedirs(settings.UPLOAD_STAGING_ROOT, exist_ok=True)
+        file = tempfile.NamedTemporaryFile(suffix='.upload' + Path(name).suffix, dir=settings.UPLOAD_STAGING_ROOT)
+        super(TemporaryUploadedFile, self).__init__(file, name, content_type, size, charset, content_type_extra)
+
+
+class ValidatingUploadHandler(TemporaryFileUploadHandler):
+    def __init__(self, request: Optional[HttpRequest] = None):
+        super().__init__(request)
+        self.request_bytes = 0
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super(TemporaryFileUploadHandler, self).new_file(field_name, file_name, content_type, content_length,
+                                                         charset, content_type_extra)
+        self.head = b''
+        self.checked = False
+        # Created first: a skipped upload closes (and so deletes) the file of the handler
+        self.file = StagedUploadedFile(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+        if Path(file_name).suffix.lower() not in allowed_photos_extensions:
+            self.reject('Invalid file extension.')
+        # The handlers after this one would keep a second copy, and deliver the files rejected later
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.request_bytes += len(raw_data)
+        if start + len(raw_data) > settings.PHOTO_UPLOAD_MAX_FILE_SIZE:
+            self.reject(f'The file is larger than {filesizeformat(settings.PHOTO_UPLOAD_MAX_FILE_SIZE)}.')
+        if self.request_bytes > settings.PHOTO_UPLOAD_MAX_POST_SIZE:
+            self.reject(f'The photos of a post are larger than {filesizeformat(settings.PHOTO_UPLOAD_MAX_POST_SIZE)}.')
+        if not self.checked:
+            self.head += raw_data
+            self.check_header(complete=False)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if not self.checked:
+            try:
+                self.check_header(complete=True)
+            except SkipFile:
+                # Django only catches SkipFile while chunks are received; no file object drops the upload
+                self.file.close()
+                return None
+        return super().file_complete(file_size)
+
+    def check_header(self, complete: bool) -> None:
+        """
+        Check the format and the dimensions of the image from the bytes received so far.
+
+        Args:
+            complete (bool): True if the whole file was received.
+        """
+        enough = complete or len(self.head) >= HEADER_LIMIT
+        image_format = next((name for magic, name in MAGIC_BYTES.items() if self.head.startswith(magic)), None)
+        if image_format is None:
+            if enough or len(self.head) >= max(map(len, MAGIC_BYTES)):
+                self.reject('Upload a valid image. The file is not a JPEG, PNG or GIF image.')
+            return
+
+        try:
+            with Image.open(BytesIO(self.head), formats=[image_format]) as image:
+                width, height = image.size
+        except Image.DecompressionBombError:
+            self.reject('The image has too many pixels.')
+        except Exception:
+            # The header is incomplete until enough bytes arrived
+            if enough:
+                self.reject('Upload a valid image. The file is corrupted.')
+            return
+
+        if width * height > settings.PHOTO_UPLOAD_MAX_PIXELS:
+            self.reject(f'The image is {width}x{height} pixels, at most {settings.PHOTO_UPLOAD_MAX_PIXELS} pixels '
+                        f'are allowed.')
+        self.checked = True
+        self.head = b''
+
+    def reject(self, message: str) -> None:
+        if self.request is not None:
+            if not hasattr(self.request, '_rejected_uploads'):
+                self.request._rejected_uploads = {}
+            self.request._rejected_uploads[self.field_name] = f'{self.file_name}: {message}'
+        raise SkipFile(message)
@@ -0,0 +1,165 @@
+"""
+Photo uploads processed off the request thread.
+
+The request only writes the uploaded files to the local staging storage (settings.UPLOAD_STAGING_ROOT) and
+queues a job. The worker strips the metadata of the photos, saves them and their renditions to the default
+storage (Google Cloud Storage in production) concurrently, and publishes the post.
+"""
+import hashlib
+import uuid
+from functools import partial
+from io import BytesIO
+from pathlib import Path
+from typing import IO, Any, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from main_app import blobs, images, jobs, storage_writer
+from main_app.blobs import BlobWriteBatch
+from main_app.helping_func import content_file_path, image_extension
+from main_app.models import Photo, PhotoRendition, Post
+
+EXIF_ORIENTATION = 0x0112
+
+
+def staging_storage() -> FileSystemStorage:
+    return FileSystemStorage(location=settings.UPLOAD_STAGING_ROOT)
+
+
+def stage_photos(uploads: Sequence[UploadedFile]) -> List[Dict[str, str]]:
+    """
+    Write the uploaded photos to the staging storage.
+
+    Args:
+        uploads (Sequence[UploadedFile]): The uploaded files.
+
+    Returns:
+        List[Dict[str, str]]: The staged name and the original name of every photo.
+    """
+    storage = staging_storage()
+    return [{'staged': storage.save(f'{uuid.uuid4()}{Path(upload.name).suffix.lower()}', upload),
+             'name': upload.name} for upload in uploads]
+
+
+def queue_post_photos(post: Post, uploads: Sequence[UploadedFile]) -> None:
+    """
+    Stage the photos of a new post and queue their processing; the post is published when it is done.
+    """
+    jobs.enqueue('main_app.uploads.process_post_photos', {'post_id': post.pk, 'photos': stage_photos(uploads)})
+
+
+def strip_metadata(source: IO[bytes]) -> bytes:
+    """
+    Remove the EXIF data (camera, location, ...) of an image, applying its orientation to the pixels.
+
+    JPEGs without an orientation are saved with their original quantization, so they are not degraded;
+    animated images are kept as uploaded.
+
+    Args:
+        source (IO[bytes]): The image file.
+
+    Returns:
+        bytes: The image without metadata, in its original format.
+    """
+    with Image.open(source) as image:
+        if getattr(image, 'is_animated', False):
+            source.seek(0)
+            return source.read()
+
+        image_format = image.format
+        rotated = image.getexif().get(EXIF_ORIENTATION, 1) != 1
+        cleaned = ImageOps.exif_transpose(image) if rotated else image
+        options: Dict[str, Any] = {}
+        if image.info.get('icc_profile'):
+            options['icc_profile'] = image.info['icc_profile']
+        if image_format == 'JPEG':
+            options.update({'quality': 95} if rotated else {'quality': 'keep', 'subsampling': 'keep'})
+
+        buffer = BytesIO()
+        cleaned.save(buffer, format=image_format, **options)
+        return buffer.getvalue()
+
+
+def prepare_photo(post: Post, staged_name: str, name: str) -> Tuple[Photo, bytes]:
+    """
+    Strip the metadata of a staged photo and name it after the remaining bytes. Runs in a thread, so it does not
+    use the database: the post is loaded with its author.
+
+    Returns:
+        Tuple[Photo, bytes]: The unsaved Photo and the content of its file.
+    """
+    with staging_storage().open(staged_name) as staged:
+        content = strip_metadata(staged)
+    extension = image_extension(BytesIO(content), name)
+    return Photo(post=post, image=str(content_file_path(hashlib.sha256(content).hexdigest(), extension))), content
+
+
+def store_photo(batch: BlobWriteBatch, photo: Photo, content: bytes) -> Optional[List[Dict[str, Any]]]:
+    """
+    Write a prepared photo and its renditions to the storage, unless the same bytes are already stored. Runs in
+    a thread, with the Blob row of the photo locked by the caller (see main_app.blobs).
+
+    Returns:
+        Optional[List[Dict[str, Any]]]: The PhotoRendition fields of the renditions, None if the file was
+            already stored.
+    """
+    if batch.storage.exists(photo.image.name):
+        return None
+    batch.save(photo.image.name, ContentFile(content))
+    return images.store_renditions(photo.image.name, BytesIO(content), save=batch.save)
+
+
+def process_post_photos(payload: Dict[str, Any]) -> None:
+    """
+    Job task: store the staged photos of a post and publish it.
+
+    The photos are written to the storage concurrently and recorded with one bulk_create once all of them are
+    stored; if a write or the insert fails, the written files are deleted and the job is retried. A photo whose
+    bytes are already stored is not written again (see main_app.blobs).
+
+    Args:
+        payload (Dict[str, Any]): `post_id` and the `photos` returned by stage_photos.
+    """
+    from main_app.repositories import PostRepository
+
+    storage = staging_storage()
+    staged = [photo for photo in payload['photos'] if storage.exists(photo['staged'])]
+    post = Post.objects.select_related('author').filter(pk=payload['post_id']).first()
+
+    # A retry after the photos were recorded only has to finish the job
+    if post is not None and not post.photo_set.exists():
+        prepared = storage_writer.run_concurrently(
+            [lambda batch, photo=photo: prepare_photo(post, photo['staged'], photo['name']) for photo in staged])
+        photos = [photo for photo, _ in prepared]
+        batch = BlobWriteBatch()
+        with transaction.atomic():
+            # Counted before the files are checked: their Blob rows stay locked until the commit, so a file found
+            # stored cannot be deleted with the last photo using it meanwhile
+            blobs.add_references([(photo.image.name, len(content)) for photo, content in prepared])
+            try:
+                stored = storage_writer.run_concurrently(
+                    [partial(store_photo, photo=photo, content=content) for photo, content in prepared], batch)
+                # Files stored before share the renditions of their first photo
+                shared = images.stored_renditions([photo.image.name for photo, renditions in zip(photos, stored)
+                                                   if renditions is None])
+                Photo.objects.bulk_create(photos)
+                PhotoRendition.objects.bulk_create([PhotoRendition(photo=photo, **rendition)
+                                                    for photo, renditions in zip(photos, stored)
+                                                    for rendition in (renditions or shared.get(photo.image.name, []))])
+            except BaseException:
+                # Still locked, no other photo can use the written files yet
+                batch.rollback()
+                raise
+        for photo, renditions in zip(photos, stored):
+            if renditions is None and photo.image.name not in shared:
+                images.create_renditions(photo)
+
+    for photo in staged:
+        storage.delete(photo['staged'])
+    if post is not None:
+        PostRepository.publish_post(post)
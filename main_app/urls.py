@@ -1,19 +1,40 @@
-from django.urls import path
+from typing import List
 
-from main_app import views
+from django.conf import settings
+from django.urls import URLPattern, path
 
-urlpatterns = [
-    path('', views.IndexListView.as_view(), name='index'),
-    path('explore/', views.ExploreView.as_view(), name='explore'),
-    path('signup/', views.SignUpView.as_view(), name='signup'),
-    path('self_profile/', views.SelfProfileView.as_view(), name='self_profile'),
-    path('profile/<int:pk>/', views.SomeoneProfileView.as_view(), name='someone_profile'),
-    path('profile/edit/', views.EditProfile.as_view(), name='edit_profile'),
-    path('post_detail/<int:pk>/', views.PostDetailView.as_view(), name='post_detail'),
-    path('post/create/', views.CreatePostView.as_view(), name='post_create'),
-    path('post/<int:post_pk>/comment/', views.AddCommentToPostView.as_view(), name='add_comment_to_post'),
-    path('<int:pk>/like-dislike/', views.AddLikeDislike.as_view(), name='like-dislike'),
-    path('search/', views.SearchResultsView.as_view(), name='search_view'),
-    path('profile/<int:pk>/subscribe/', views.SubscribeView.as_view(), name='subscribe'),
-    path('last_news/', views.IndexListView.as_view(), name='last_news'),
-]
+from main_app import async_views, views
+
+
+def get_urlpatterns(async_views_enabled: bool = False) -> List[URLPattern]:
+    """
+    Args:
+        async_views_enabled (bool): Serve the async variants of the hot views, for the ASGI deployment.
+    """
+    def hot_view(view, async_view):
+        return (async_view if async_views_enabled else view).as_view()
+
+    return [
+        path('', hot_view(views.IndexListView, async_views.AsyncIndexListView), name='index'),
+        path('explore/', views.ExploreView.as_view(), name='explore'),
+        path('signup/', views.SignUpView.as_view(), name='signup'),
+        path('self_profile/', views.SelfProfileView.as_view(), name='self_profile'),
+        path('profile/<int:pk>/', views.SomeoneProfileView.as_view(), name='someone_profile'),
+        path('profile/edit/', views.EditProfile.as_view(), name='edit_profile'),
+        path('post_detail/<int:pk>/', hot_view(views.PostDetailView, async_views.AsyncPostDetailView),
+             name='post_detail'),
+        path('post/create/', views.CreatePostView.as_view(), name='post_create'),
+        path('post/<int:post_pk>/comment/', views.AddCommentToPostView.as_view(), name='add_comment_to_post'),
+        path('post/<int:post_pk>/comments/', views.CommentListView.as_view(), name='post_comments'),
+        path('<int:pk>/like-dislike/', hot_view(views.AddLikeDislike, async_views.AsyncAddLikeDislike),
+             name='like-dislike'),
+        path('search/', hot_view(views.SearchResultsView, async_views.AsyncSearchResultsView), name='search_view'),
+        path('tags/autocomplete/', views.TagAutocompleteView.as_view(), name='tag_autocomplete'),
+        path('tags/<path:tag>/', views.TagDetailView.as_view(), name='tag_detail'),
+        path('profile/<int:pk>/subscribe/', hot_view(views.SubscribeView, async_views.AsyncSubscribeView),
+             name='subscribe'),
+        path('last_news/', hot_view(views.IndexListView, async_views.AsyncIndexListView), name='last_news'),
+    ]
+
+
+urlpatterns = get_urlpatterns(settings.ASYNC_VIEWS)
@@ -1,114 +1,238 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Sequence
 
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.db.models import QuerySet
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
 from django.views import View
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.views.decorators.http import require_POST
 from django.views.generic import DetailView, ListView
 from django.views.generic.edit import CreateView, UpdateView
 
+from main_app.constants import comments_per_page, search_max_pages
 from main_app.forms import (CommentForm, CreatePostForm, CustomUserChangeForm,
                             CustomUserCreationForm, PhotoFormSet, TagForm)
-from main_app.models import CustomUser, Photo, Post
+from main_app.fragments import render_post_cards
+from main_app.models import Comment, CustomUser, Photo, Post, Tag
+from main_app.page_cache import AnonymousPageCacheMixin
+from main_app.pagination import (InvalidCursor, KeysetPage,
+                                 KeysetPaginationMixin)
+from main_app.profiles import UserProfile, get_profile, get_profiles
 from main_app.repositories import (CommentRepository, LikeRepository,
-                                   PhotoRepository, PostCreationRepository,
-                                   PostRepository, SearchRepository,
-                                   SubscribeRepository)
+                                   PostCreationRepository, PostRepository,
+                                   SearchRepository, SubscribeRepository,
+                                   TagRepository)
+from main_app.upload_handlers import ValidatingUploadHandler, rejected_uploads
 
 
-class IndexListView(ListView):
+class IndexListView(AnonymousPageCacheMixin, KeysetPaginationMixin, ListView):
     model = Post
     template_name = 'index.html'
     paginate_by = 10
 
+    def get_queryset(self):
+        # Only what the cached cards are looked up with; the photos are loaded for the cards not cached
+        return PostRepository.get_all_posts().card_versions()
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        posts = PostRepository.get_all_posts()
-        posts_with_photos: List[Dict[str, Any]] = []
-
-        for post in posts:
-            photos = PhotoRepository.get_photos_for_post(post)
-            posts_with_photos.append({'post': post, 'photos': photos})
-        context["posts_with_photo"] = posts_with_photos
-
-        posts_from_subscribe = PostRepository.get_last_posts_from_subscribe(self.request)
-        posts_with_photos_from_subscribe: List[Dict[str, Any]] = []
+        context["posts_with_photo"] = self.post_cards(context['object_list'], 'list')
 
-        for post in posts_from_subscribe:
-            for p in post:
-                photos = PhotoRepository.get_photos_for_post(p)
-                posts_with_photos_from_subscribe.append({'post': p, 'photos': photos})
-        context["posts_from_subscribe"] = posts_with_photos_from_subscribe
+        try:
+            feed_page = PostRepository.get_last_posts_from_subscribe(
+                self.request, per_page=self.paginate_by, cursor=self.request.GET.get('feed_cursor'),
+                queryset=Post.objects.card_versions())
+        except InvalidCursor:
+            raise Http404('Invalid cursor.')
+        context["posts_from_subscribe"] = self.post_cards(feed_page, 'feed')
+        context["feed_page_obj"] = feed_page
 
         return context
 
+    @staticmethod
+    def post_cards(posts: Sequence[Post], variant: str) -> List[Dict[str, Any]]:
+        cards = render_post_cards(posts, variant, PostRepository.get_posts_for_cards)
+        return [{'post': post, 'card': cards[post.pk]} for post in posts if post.pk in cards]
+
 
-class SelfProfileView(LoginRequiredMixin, ListView):
+class SelfProfileView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Post
     template_name = 'main_app/self_profile.html'
     context_object_name = 'posts'
+    paginate_by = 10
 
     def get_queryset(self) -> List[Post]:
-        return PostRepository.get_posts_by_author(self.request.user)
+        return PostRepository.get_posts_by_author(self.request.user, include_unpublished=True)
 
 
-class SomeoneProfileView(LoginRequiredMixin, DetailView):
+class SomeoneProfileView(LoginRequiredMixin, KeysetPaginationMixin, DetailView):
     model = CustomUser
     template_name = 'main_app/someone_profile.html'
     context_object_name = 'other_user'
+    paginate_by = 10
+
+    def get_object(self, queryset=None) -> UserProfile:
+        # The cached profile; the posts and the subscription only need the pk of the user
+        profile = get_profile(self.kwargs[self.pk_url_kwarg])
+        if profile is None:
+            raise Http404('No user found matching the query')
+        return profile
 
     def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
         context = super().get_context_data(**kwargs)
-        posts = PostRepository.get_posts_by_author(self.object)
-        user = self.request.user
-        subscribed_to = CustomUser.objects.get(pk=self.object.pk)
+        page = self.paginate_keyset(PostRepository.get_posts_by_author(self.object.pk), self.paginate_by)
 
-        subscribe = user.my_subscribes_dict.get(str(subscribed_to.pk))
-        context['posts'] = posts
+        subscribe = SubscribeRepository.is_subscribed(self.request.user, self.object.pk)
+        context['posts'] = page.object_list
+        context['page_obj'] = page
         context['subscribe'] = subscribe
         return context
 
 
-class ExploreView(View):
+class ExploreView(AnonymousPageCacheMixin, View):
+    page_shows_posts = False
+
     def get(self, request: HttpRequest) -> HttpResponse:
         return render(request, 'main_app/explore.html')
 
 
-class SearchResultsView(ListView):
+class SearchResultsView(AnonymousPageCacheMixin, ListView):
     model = Post
     template_name = 'main_app/search_results.html'
     context_object_name = 'posts'
+    paginate_by = 10
 
     def get_queryset(self) -> List[Post]:
-        query = self.request.GET.get('q')
-        if query:
-            return SearchRepository.search_posts(query)
-        return Post.objects.none()
+        return self.search_results(self.request.GET.get('q'), self.paginate_by)
+
+    @staticmethod
+    def search_results(query: Optional[str], per_page: int) -> QuerySet:
+        if not query:
+            return Post.objects.none()
+        # Ordered by a rank computed for every match, which no index can skip to: the pages are numbered, and
+        # capped so that OFFSET never sorts more than search_max_pages pages of matches
+        return SearchRepository.search_posts(query)[:search_max_pages * per_page]
 
 
-class PostDetailView(LoginRequiredMixin, DetailView):
+class TagDetailView(KeysetPaginationMixin, ListView):
+    model = Post
+    template_name = 'main_app/tag_detail.html'
+    context_object_name = 'posts'
+    paginate_by = 10
+
+    def get_queryset(self) -> List[Post]:
+        try:
+            self.tag = TagRepository.get_tag(self.kwargs['tag'])
+        except Tag.DoesNotExist:
+            raise Http404('No tag found matching the query')
+        return TagRepository.get_posts_by_tag(self.tag).with_author()
+
+    def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        context['tag'] = self.tag
+        return context
+
+
+class TagAutocompleteView(View):
+    limit = 10
+
+    def get(self, request: HttpRequest) -> JsonResponse:
+        tags = TagRepository.autocomplete(request.GET.get('q', '').strip(), limit=self.limit)
+        return JsonResponse({'tags': [{'tag': tag.tag, 'post_count': tag.post_count} for tag in tags]})
+
+
+def check_post_visible(post: Post, user: CustomUser) -> None:
+    # A post is only shown to its author until the worker publishes it
+    if not post.is_published and post.author_id != user.pk:
+        raise Http404('No post found matching the query')
+
+
+def attach_author_profiles(comments: List[Comment]) -> List[Comment]:
+    # The authors of the comments come from the profile cache instead of a join per page
+    authors = get_profiles(comment.author_id for comment in comments)
+    for comment in comments:
+        comment.author_profile = authors.get(comment.author_id)
+    return comments
+
+
+class PostDetailView(LoginRequiredMixin, KeysetPaginationMixin, DetailView):
     model = Post
     template_name = 'main_app/post_detail.html'
     context_object_name = 'post'
+    comments_paginate_by = comments_per_page
+
+    def get_object(self, queryset=None):
+        try:
+            self.details = PostRepository.get_post_with_details(self.kwargs[self.pk_url_kwarg])
+        except Post.DoesNotExist:
+            raise Http404('No post found matching the query')
+        check_post_visible(self.details['post'], self.request.user)
+        return self.details['post']
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        post_id = self.object.pk
-        context.update(PostRepository.get_post_with_details(post_id))
+        context.update(self.details)
+        # The first page of the comments; the next ones and the replies are loaded from CommentListView
+        page = self.paginate_keyset(self.details['comments'], self.comments_paginate_by, param='comments_cursor')
+        context.update(self.comments_context(page))
         return context
 
+    @staticmethod
+    def comments_context(page: KeysetPage) -> Dict[str, Any]:
+        return {'comments': attach_author_profiles(page.object_list), 'comments_page': page, 'form': CommentForm()}
 
+
+class CommentListView(LoginRequiredMixin, KeysetPaginationMixin, View):
+    """
+    A page of the top-level comments of a post, or of the replies to one (`parent`), as JSON.
+    """
+    per_page = comments_per_page
+
+    def get(self, request: HttpRequest, post_pk: int) -> JsonResponse:
+        post = get_object_or_404(Post.objects.only('author_id', 'is_published'), pk=post_pk)
+        check_post_visible(post, request.user)
+        parent = request.GET.get('parent')
+        if parent is not None and not parent.isdigit():
+            raise Http404('No comment found matching the query')
+
+        page = self.paginate_keyset(CommentRepository.get_comments(post.pk, parent_id=parent), self.per_page)
+        return JsonResponse({'comments': [self.comment_json(comment)
+                                          for comment in attach_author_profiles(page.object_list)],
+                             'next_cursor': page.next_cursor})
+
+    @staticmethod
+    def comment_json(comment: Comment) -> Dict[str, Any]:
+        author = comment.author_profile
+        return {
+            'id': comment.pk,
+            'parent': comment.parent_id,
+            'text': comment.text,
+            'publish_date': comment.publish_date.isoformat(),
+            'author': author and {'id': author.pk, 'username': author.username, 'url': author.get_absolute_url()},
+            'replies_count': getattr(comment, 'replies_count', 0),
+        }
+
+
+@method_decorator(csrf_exempt, name='dispatch')
 class CreatePostView(LoginRequiredMixin, CreateView):
     template_name = 'main_app/create_post.html'
     form_class = CreatePostForm
 
+    def dispatch(self, request, *args, **kwargs):
+        # The photos are checked while they are received (see main_app.upload_handlers). The handler must be
+        # installed before the body is read, which the CSRF check does, so the check runs after it
+        request.upload_handlers = [ValidatingUploadHandler(request)]
+        return csrf_protect(super().dispatch)(request, *args, **kwargs)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         if self.request.POST:
             context['post_form'] = self.form_class(self.request.POST)
-            context['photo_formset'] = PhotoFormSet(self.request.POST, self.request.FILES)
+            context['photo_formset'] = PhotoFormSet(self.request.POST, self.request.FILES,
+                                                    rejected_uploads=rejected_uploads(self.request))
             context['tag_form'] = TagForm(self.request.POST)
         else:
             context['post_form'] = self.form_class()
@@ -159,12 +283,14 @@ class AddCommentToPostView(LoginRequiredMixin, View):
 
     def get(self, request: HttpRequest, post_pk: int):
         post = get_object_or_404(Post, pk=post_pk)
+        check_post_visible(post, request.user)
         form = CommentForm()
         return self.render_form(request, form, post)
 
     def post(self, request: HttpRequest, post_pk: int):
         post = get_object_or_404(Post, pk=post_pk)
-        form = CommentForm(request.POST)
+        check_post_visible(post, request.user)
+        form = CommentForm(request.POST, post=post)
         if form.is_valid():
             CommentRepository.add_comment(request.user, post, form.cleaned_data)
             return redirect('post_detail', pk=post.pk)
@@ -178,28 +304,19 @@ class AddLikeDislike(LoginRequiredMixin, View):
     @staticmethod
     @require_POST
     def post(request: HttpRequest, pk: int):
-        post = Post.objects.get(pk=pk)
-        is_like = request.POST.get('is_like') == 'true'
-
-        if is_like:
-            LikeRepository.toggle_like(request, post, is_like=True)
-        else:
-            LikeRepository.toggle_like(request, post, is_like=False)
+        post = get_object_or_404(Post.objects.only('author_id', 'is_published', 'likes_count', 'dislikes_count'),
+                                 pk=pk)
+        check_post_visible(post, request.user)
+        LikeRepository.toggle_like(request, post, is_like=request.POST.get('is_like') == 'true')
 
-        likes_count = post.likes.count()
-        dislikes_count = post.dislikes.count()
-
-        return JsonResponse({'likes_count': likes_count, 'dislikes_count': dislikes_count})
+        return JsonResponse({'likes_count': post.likes_count, 'dislikes_count': post.dislikes_count})
 
 
 class SubscribeView(LoginRequiredMixin, View):
     @staticmethod
     @require_POST
     def post(request: HttpRequest, pk: int):
-        user = request.user
-        subscribed_to = CustomUser.objects.get(pk=pk)
-        SubscribeRepository.update_subscribe(user, subscribed_to)
-
-        is_subscribed = SubscribeRepository.is_subscribed(user, subscribed_to)
+        subscribed_to = get_object_or_404(CustomUser, pk=pk)
+        is_subscribed = SubscribeRepository.update_subscribe(request.user, subscribed_to)
 
         return JsonResponse({'is_subscribed': is_subscribed})